@@ -0,0 +1,257 @@
+import os
+
+import numpy as np
+
+
+def _kmeans(data, k, iters=10, seed=0):
+    """Plain Lloyd k-means on float32 rows. Returns (k, d) centroids."""
+    rng = np.random.default_rng(seed)
+    k = max(1, min(k, len(data)))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    data_sq = np.einsum('ij,ij->i', data, data)
+    for _ in range(iters):
+        cent_sq = np.einsum('ij,ij->i', centroids, centroids)
+        assign = np.argmin(data_sq[:, None] + cent_sq[None, :] - 2.0 * (data @ centroids.T), axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed empty clusters from random points so nlist stays usable
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+    return centroids
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour index for large face galleries (pure NumPy).
+
+    Encodings are partitioned into nlist inverted lists by k-means coarse
+    centroids; a query only scans the nprobe lists whose centroids are
+    closest. nprobe is the recall/speed knob: nprobe == nlist is exact.
+
+    Exposes the same match / best_match / identify API as face_gallery.Gallery,
+    so the recognition loop can use either one.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids = None
+        self.identities = []
+        self._identity_index = {}
+        # Slots of removed identities, reused by add so the list does not grow
+        self._free = []
+        # Per inverted list: float32 matrix, squared norms, identity ids
+        self._vectors = [np.zeros((0, 128), dtype=np.float32)]
+        self._sq_norms = [np.zeros(0, dtype=np.float32)]
+        self._ids = [np.zeros(0, dtype=np.int64)]
+
+    @classmethod
+    def build(cls, encodings, names, nlist=None, nprobe=8, seed=0):
+        """Train coarse centroids on the given encodings and add them all."""
+        index = cls(nlist=nlist, nprobe=nprobe, seed=seed)
+        index.train(encodings)
+        index.add(encodings, names)
+        return index
+
+    def __len__(self):
+        return int(sum(len(ids) for ids in self._ids))
+
+    @property
+    def num_identities(self):
+        return sum(1 for name in self.identities if name is not None)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def _all_rows(self):
+        return np.concatenate(self._vectors), np.concatenate(self._ids)
+
+    def train(self, encodings=None, iters=10):
+        """
+        Fit coarse centroids and re-bucket any rows already in the index.
+        Uses the current contents when encodings is None.
+        """
+        vectors, ids = self._all_rows()
+        sample = vectors if encodings is None else np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+        if len(sample) == 0:
+            return
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(sample))))
+        self.centroids = _kmeans(sample, nlist, iters=iters, seed=self.seed)
+        self.nlist = len(self.centroids)
+        self._vectors = [np.zeros((0, 128), dtype=np.float32) for _ in range(self.nlist)]
+        self._sq_norms = [np.zeros(0, dtype=np.float32) for _ in range(self.nlist)]
+        self._ids = [np.zeros(0, dtype=np.int64) for _ in range(self.nlist)]
+        if len(vectors):
+            self._insert(vectors, ids)
+
+    def _assign(self, vectors):
+        if not self.is_trained:
+            return np.zeros(len(vectors), dtype=np.int64)
+        cent_sq = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        return np.argmin(cent_sq[None, :] - 2.0 * (vectors @ self.centroids.T), axis=1)
+
+    def _insert(self, vectors, ids):
+        lists = self._assign(vectors)
+        for c in np.unique(lists):
+            mask = lists == c
+            new_vectors = vectors[mask]
+            self._vectors[c] = np.concatenate([self._vectors[c], new_vectors])
+            self._sq_norms[c] = np.concatenate([self._sq_norms[c],
+                                                np.einsum('ij,ij->i', new_vectors, new_vectors)])
+            self._ids[c] = np.concatenate([self._ids[c], ids[mask]])
+
+    def add(self, encodings, names):
+        """Insert encodings incrementally; an untrained index keeps a single flat list."""
+        vectors = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+        if len(vectors) != len(names):
+            raise ValueError("encodings and names must have the same length")
+        ids = []
+        for name in names:
+            if name not in self._identity_index:
+                if self._free:
+                    # No rows carry a freed slot's id any more
+                    slot = self._free.pop()
+                    self.identities[slot] = name
+                else:
+                    slot = len(self.identities)
+                    self.identities.append(name)
+                self._identity_index[name] = slot
+            ids.append(self._identity_index[name])
+        self._insert(vectors, np.array(ids, dtype=np.int64))
+
+    def copy(self):
+        """
+        Cheap copy for copy-on-write updates: add/remove replace the per-list
+        arrays instead of writing into them, so only the containers are copied.
+        """
+        other = IVFIndex(nlist=self.nlist, nprobe=self.nprobe, seed=self.seed)
+        other.centroids = self.centroids
+        other.identities = list(self.identities)
+        other._identity_index = dict(self._identity_index)
+        other._free = list(self._free)
+        other._vectors = list(self._vectors)
+        other._sq_norms = list(self._sq_norms)
+        other._ids = list(self._ids)
+        return other
+
+    def remove(self, name):
+        """Delete every encoding of an identity. Returns the number of rows removed."""
+        ident = self._identity_index.pop(name, None)
+        if ident is None:
+            return 0
+        # Keep the slot so existing ids stay valid; it is skipped on save
+        # and handed to the next new identity
+        self.identities[ident] = None
+        self._free.append(ident)
+        removed = 0
+        for c in range(len(self._ids)):
+            keep = self._ids[c] != ident
+            removed += int((~keep).sum())
+            if not keep.all():
+                self._vectors[c] = self._vectors[c][keep]
+                self._sq_norms[c] = self._sq_norms[c][keep]
+                self._ids[c] = self._ids[c][keep]
+        return removed
+
+    def _search_one(self, probe, probe_sq, cent_order, k):
+        vectors = [self._vectors[c] for c in cent_order]
+        if sum(len(v) for v in vectors) == 0:
+            return []
+        matrix = np.concatenate(vectors)
+        sq_norms = np.concatenate([self._sq_norms[c] for c in cent_order])
+        ids = np.concatenate([self._ids[c] for c in cent_order])
+        sq = probe_sq + sq_norms - 2.0 * (matrix @ probe)
+        dists = np.sqrt(np.maximum(sq, 0.0))
+        # Per-identity min: sort by (id, distance) and keep the first row of each id
+        order = np.lexsort((dists, ids))
+        first = np.r_[True, ids[order][1:] != ids[order][:-1]]
+        best_rows = order[first]
+        best_rows = best_rows[np.argsort(dists[best_rows], kind='stable')[:k]]
+        return [(self.identities[ids[r]], float(dists[r])) for r in best_rows]
+
+    def match(self, probes, k=1):
+        """
+        Approximate version of Gallery.match.
+
+        returns: list (one per probe) of [(name, distance), ...] sorted by distance
+        """
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, 128)
+        probe_sq = np.einsum('ij,ij->i', probes, probes)
+        if self.is_trained:
+            nprobe = max(1, min(self.nprobe, self.nlist))
+            cent_sq = np.einsum('ij,ij->i', self.centroids, self.centroids)
+            cent_dist = cent_sq[None, :] - 2.0 * (probes @ self.centroids.T)
+            if nprobe < self.nlist:
+                nearest = np.argpartition(cent_dist, nprobe - 1, axis=1)[:, :nprobe]
+            else:
+                nearest = np.tile(np.arange(self.nlist), (len(probes), 1))
+        else:
+            nearest = np.zeros((len(probes), 1), dtype=np.int64)
+        return [self._search_one(p, p_sq, lists, k)
+                for p, p_sq, lists in zip(probes, probe_sq, nearest)]
+
+    def best_match(self, probe, threshold=0.4):
+        """Return (name, distance); name is None when nothing is below threshold."""
+        matches = self.match(probe, k=1)[0]
+        if not matches:
+            return None, float('inf')
+        name, distance = matches[0]
+        if distance < threshold:
+            return name, distance
+        return None, distance
+
+    def identify(self, probes, threshold=0.4):
+        """Batch version of best_match: list of (name or None, distance) per probe."""
+        output = []
+        for matches in self.match(probes, k=1):
+            if not matches:
+                output.append((None, float('inf')))
+                continue
+            name, distance = matches[0]
+            output.append((name if distance < threshold else None, distance))
+        return output
+
+    def save(self, file_path):
+        """Write the index to a single .npz file (atomic replace)."""
+        vectors, ids = self._all_rows()
+        # Compact identities so deleted slots are not persisted
+        live = [name for name in self.identities if name is not None]
+        remap = np.full(max(len(self.identities), 1), -1, dtype=np.int64)
+        for new_id, name in enumerate(live):
+            remap[self._identity_index[name]] = new_id
+        tmp_path = file_path + '.tmp.npz'
+        np.savez(
+            tmp_path,
+            vectors=vectors,
+            ids=remap[ids] if len(ids) else ids,
+            identities=np.array(live, dtype=str),
+            centroids=self.centroids if self.is_trained else np.zeros((0, 128), dtype=np.float32),
+            params=np.array([self.nprobe, self.seed], dtype=np.int64),
+        )
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path):
+        """Read an index written by save()."""
+        with np.load(file_path, allow_pickle=False) as data:
+            nprobe, seed = (int(v) for v in data['params'])
+            index = cls(nprobe=nprobe, seed=seed)
+            identities = [str(name) for name in data['identities']]
+            index.identities = identities
+            index._identity_index = {name: i for i, name in enumerate(identities)}
+            centroids = data['centroids']
+            if len(centroids):
+                index.centroids = centroids.astype(np.float32)
+                index.nlist = len(centroids)
+                index._vectors = [np.zeros((0, 128), dtype=np.float32) for _ in range(index.nlist)]
+                index._sq_norms = [np.zeros(0, dtype=np.float32) for _ in range(index.nlist)]
+                index._ids = [np.zeros(0, dtype=np.int64) for _ in range(index.nlist)]
+            vectors = data['vectors'].astype(np.float32)
+            if len(vectors):
+                index._insert(vectors, data['ids'].astype(np.int64))
+        return index
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .database import AttendanceDB
@@ -21,13 +22,15 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 def get_user(username: str) -> Optional[UserInDB]:
+    # Pooled per-thread connection: it stays open for the next request
     conn = db.get_connection()
     c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE username = ?', (username,))
+    c.execute('SELECT username, full_name, hashed_password, role, shift, is_active '
+              'FROM users WHERE username = ?', (username,))
     user = c.fetchone()
-    conn.close()
     
-    if user:
+    # Users carried over from app.py's old table have no hashed password yet
+    if user and user[2]:
         return UserInDB(
             username=user[0],
             full_name=user[1],
@@ -71,7 +74,8 @@ async def get_current_user(token: str) -> UserInDB:
     except JWTError:
         raise credentials_exception
     
-    user = get_user(username=token_data.username)
+    # SQLite read: keep it off the event loop
+    user = await run_in_threadpool(get_user, token_data.username)
     if user is None:
         raise credentials_exception
     return user
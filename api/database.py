@@ -1,9 +1,16 @@
 import pandas as pd
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 import os
 from pathlib import Path
-import sqlite3
 from typing import List, Optional, Tuple
+import sys
+
+# The shared shift schedule lives in the project root next to main.py
+_ROOT_DIR = str(Path(__file__).parent.parent)
+if _ROOT_DIR not in sys.path:
+    sys.path.append(_ROOT_DIR)
+from shift_schedule import get_schedule
+from storage import SCHEMA, get_storage
 
 class AttendanceDB:
     def __init__(self):
@@ -11,53 +18,17 @@ class AttendanceDB:
         self.root_dir = Path(__file__).parent.parent
         self.attendance_path = self.root_dir / "Attendance_Entry"
         self.users_path = self.root_dir / "Attendance_data"
-        self.db_path = self.root_dir / "attendance.db"
-        self.init_db()
+        # Pooled connections and the shared schema (storage.py, also used by app.py)
+        self.storage = get_storage()
+        self.db_path = Path(self.storage.path)
         
     def init_db(self):
         """Initialize database with required tables"""
-        conn = sqlite3.connect(str(self.db_path))
-        c = conn.cursor()
-        
-        # Create users table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                username TEXT PRIMARY KEY,
-                full_name TEXT,
-                hashed_password TEXT,
-                role TEXT,
-                shift TEXT,
-                is_active BOOLEAN
-            )
-        ''')
-        
-        # Create attendance table with shift support
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS attendance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_name TEXT,
-                date DATE,
-                check_in TIME,
-                check_out TIME,
-                shift TEXT,
-                status TEXT,
-                device_id TEXT
-            )
-        ''')
-        
-        # Create devices table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS devices (
-                device_id TEXT PRIMARY KEY,
-                name TEXT,
-                location TEXT,
-                last_active TIMESTAMP,
-                status TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        self.storage.connection().executescript(SCHEMA)
+
+    def get_connection(self):
+        """This thread's pooled connection (kept open between calls; do not close it)"""
+        return self.storage.connection()
 
     def _safe_read_csv(self, csv_path):
         """Try reading a CSV robustly. Attempts multiple parsers and separators,
@@ -105,68 +76,48 @@ class AttendanceDB:
         
     def validate_shift_time(self, check_time: time, employee_name: str) -> Tuple[str, str]:
         """Validate check time and return shift and status based on employee's registered shift"""
-        morning_start = time(8, 0)
-        morning_end = time(16, 0)
-        night_start = time(16, 0)
-        night_end = time(22, 0)
-        
         # Get employee's registered shift
-        conn = sqlite3.connect(str(self.db_path))
-        c = conn.cursor()
-        c.execute('SELECT shift FROM users WHERE username = ?', (employee_name,))
-        result = c.fetchone()
-        conn.close()
+        rows = self.storage.query('SELECT shift FROM users WHERE username = ?', (employee_name,))
+        result = rows[0] if rows else None
         
         registered_shift = result[0] if result else None
+        schedule = get_schedule()
+        if registered_shift not in schedule.shifts:
+            # Fallback if shift not registered: whichever shift is running
+            registered_shift = schedule.shift_at(check_time, early=True)
+            if registered_shift is None:
+                return "unknown", "invalid"
         
-        if registered_shift == 'morning':
-            if morning_start <= check_time < morning_end:
-                if check_time > time(8, 15):  # 15 minutes tolerance
-                    return "morning", "late"
-                return "morning", "on_time"
-            return "morning", "invalid"  # Wrong time for morning shift
+        if not schedule.in_shift(registered_shift, check_time, early=True):
+            return registered_shift, "invalid"  # Wrong time for this shift
+        if schedule.status(registered_shift, check_time) in ("early", "on_time"):
+            return registered_shift, "on_time"
+        return registered_shift, "late"
         
-        elif registered_shift == 'night':
-            if night_start <= check_time < night_end:
-                if check_time > time(16, 15):  # 15 minutes tolerance
-                    return "night", "late"
-                return "night", "on_time"
-            return "night", "invalid"  # Wrong time for night shift
+    def mark_attendance(self, employee_name: str, device_id: str, when: Optional[datetime] = None):
+        """Mark attendance with shift validation"""
+        with self.storage.transaction() as c:
+            record = self._record_attendance(c, employee_name, device_id, when or datetime.now())
         
-        else:
-            # Fallback if shift not registered
-            if morning_start <= check_time < morning_end:
-                shift = "morning"
-                if check_time > time(8, 15):
-                    status = "late"
-                else:
-                    status = "on_time"
-            elif night_start <= check_time < night_end:
-                shift = "night"
-                if check_time > time(16, 15):
-                    status = "late"
-                else:
-                    status = "on_time"
-            else:
-                shift = "unknown"
-                status = "invalid"
-            return shift, status
+        # Update device status
+        self.update_device_status(device_id, "active")
         
-    def mark_attendance(self, employee_name: str, device_id: str):
-        """Mark attendance with shift validation"""
-        now = datetime.now()
+        return record
+
+    def _record_attendance(self, c, employee_name: str, device_id: str, now: datetime):
+        """Check in, or check out an open check-in, on cursor c (the caller commits)"""
         current_time = now.time()
+        # Bind strings: sqlite3's default date adapters are deprecated (3.12)
+        time_str = current_time.strftime("%H:%M:%S")
+        day = now.date().isoformat()
         
-        shift, status = self.validate_shift_time(current_time)
-        
-        conn = sqlite3.connect(str(self.db_path))
-        c = conn.cursor()
+        shift, status = self.validate_shift_time(current_time, employee_name)
         
         # Check if already checked in today
         c.execute('''
             SELECT check_in, check_out FROM attendance 
             WHERE employee_name = ? AND date = ? AND shift = ?
-        ''', (employee_name, now.date(), shift))
+        ''', (employee_name, day, shift))
         
         existing = c.fetchone()
         
@@ -177,7 +128,7 @@ class AttendanceDB:
                     UPDATE attendance 
                     SET check_out = ? 
                     WHERE employee_name = ? AND date = ? AND shift = ?
-                ''', (current_time, employee_name, now.date(), shift))
+                ''', (time_str, employee_name, day, shift))
             else:
                 status = "invalid"  # Already checked out
         else:
@@ -185,24 +136,57 @@ class AttendanceDB:
             c.execute('''
                 INSERT INTO attendance (employee_name, date, check_in, shift, status, device_id)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (employee_name, now.date(), current_time, shift, status, device_id))
-        
-        conn.commit()
-        
-        # Update device status
-        self.update_device_status(device_id, "active")
-        
-        conn.close()
+            ''', (employee_name, day, time_str, shift, status, device_id))
         
         return {
             "employee_name": employee_name,
-            "date": now.date().isoformat(),
+            "date": day,
             "check_in": current_time.isoformat() if not existing else None,
             "check_out": current_time.isoformat() if existing else None,
             "shift": shift,
             "status": status,
             "device_id": device_id
         }
+
+    @staticmethod
+    def _event_time(payload: dict, created: Optional[float]) -> datetime:
+        """When a journaled recognizer event happened (its own timestamp, else when it was journaled)"""
+        try:
+            if payload.get("check_in"):
+                return datetime.fromisoformat(payload["check_in"])
+            if payload.get("date") and payload.get("time"):
+                return datetime.strptime(f"{payload['date']} {payload['time']}", "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            pass
+        return datetime.fromtimestamp(created) if created else datetime.now()
+
+    def ingest_events(self, events: List[dict], device_id: str) -> dict:
+        """
+        Store a batch of journaled attendance events from a recognizer.
+
+        Each event is recorded at most once: its event_id is kept in
+        attendance_events in the same transaction as the attendance row, so a
+        batch resent after a timeout or a crash only counts as duplicates.
+        """
+        accepted = duplicates = 0
+        with self.storage.transaction() as c:
+            for event in events:
+                payload = event.get("payload") or {}
+                name = payload.get("employee_name") or payload.get("name")
+                when = self._event_time(payload, event.get("created"))
+                c.execute('''
+                    INSERT OR IGNORE INTO attendance_events (event_id, device_id, employee_name, event_time, received)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (event["event_id"], device_id, name, when.isoformat(), datetime.now().isoformat()))
+                if c.rowcount == 0:
+                    duplicates += 1
+                    continue
+                if name:
+                    self._record_attendance(c, name, device_id, when)
+                accepted += 1
+        if accepted:
+            self.update_device_status(device_id, "active")
+        return {"accepted": accepted, "duplicates": duplicates}
         
     def get_attendance_by_date(self, date=None):
         """Get attendance records for a specific date"""
@@ -218,17 +202,15 @@ class AttendanceDB:
                     except ValueError:
                         return []
 
-            # First try SQLite database
-            conn = sqlite3.connect(str(self.db_path))
-            c = conn.cursor()
-            
-            c.execute('''
+            # First try SQLite database (a range on the ISO date text, so the
+            # attendance_by_date index applies)
+            rows = self.storage.query('''
                 SELECT employee_name, date, check_in, check_out, shift, status, device_id 
-                FROM attendance WHERE date(date) = date(?)
-            ''', (date.strftime('%Y-%m-%d'),))
+                FROM attendance WHERE date >= ? AND date < ?
+            ''', (date.strftime('%Y-%m-%d'), (date + timedelta(days=1)).strftime('%Y-%m-%d')))
             
             records = []
-            for row in c.fetchall():
+            for row in rows:
                 records.append({
                     "name": row[0],
                     "date": str(row[1]),
@@ -237,8 +219,6 @@ class AttendanceDB:
                     "status": row[5] if row[5] else "unknown",
                     "device_id": row[6] if row[6] else ""
                 })
-            
-            conn.close()
 
             # If no records in SQLite, try CSV files
             if not records:
@@ -267,17 +247,13 @@ class AttendanceDB:
         """Determine shift based on time"""
         try:
             time_obj = datetime.strptime(time_str, "%H:%M:%S").time()
-            if time(8, 0) <= time_obj < time(16, 0):
-                return "morning"
-            elif time(16, 0) <= time_obj < time(22, 0):
-                return "night"
-            return "unknown"
+            return get_schedule().shift_at(time_obj) or "unknown"
         except:
             return "unknown"
     
     def get_monthly_report(self, year: int, month: int) -> pd.DataFrame:
         """Get monthly attendance report"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self.storage.connection()
         
         query = '''
             SELECT 
@@ -293,30 +269,23 @@ class AttendanceDB:
         '''
         
         df = pd.read_sql_query(query, conn, params=(str(year), f"{month:02d}"))
-        conn.close()
         return df
     
     def update_device_status(self, device_id: str, status: str):
         """Update device status and last active time"""
-        conn = sqlite3.connect(str(self.db_path))
-        c = conn.cursor()
-        
-        now = datetime.now()
-        
-        c.execute('''
-            INSERT INTO devices (device_id, status, last_active)
-            VALUES (?, ?, ?)
-            ON CONFLICT(device_id) DO UPDATE SET
-                status = ?,
-                last_active = ?
-        ''', (device_id, status, now, status, now))
+        now = datetime.now().isoformat()
         
-        conn.commit()
-        
-        c.execute('SELECT * FROM devices WHERE device_id = ?', (device_id,))
-        device = c.fetchone()
-        
-        conn.close()
+        with self.storage.transaction() as c:
+            c.execute('''
+                INSERT INTO devices (device_id, status, last_active)
+                VALUES (?, ?, ?)
+                ON CONFLICT(device_id) DO UPDATE SET
+                    status = ?,
+                    last_active = ?
+            ''', (device_id, status, now, status, now))
+            
+            c.execute('SELECT * FROM devices WHERE device_id = ?', (device_id,))
+            device = c.fetchone()
         
         return {
             "device_id": device[0],
@@ -332,15 +301,13 @@ class AttendanceDB:
             records = []
             
             # Get from SQLite
-            conn = sqlite3.connect(str(self.db_path))
-            c = conn.cursor()
-            c.execute('''
+            rows = self.storage.query('''
                 SELECT employee_name, date, check_in, check_out, shift, status, device_id 
                 FROM attendance 
                 ORDER BY date DESC, check_in DESC
             ''')
             
-            for row in c.fetchall():
+            for row in rows:
                 records.append({
                     "name": row[0],
                     "date": str(row[1]),
@@ -350,8 +317,6 @@ class AttendanceDB:
                     "device_id": row[6] if row[6] else ""
                 })
             
-            conn.close()
-            
             # Get from CSV files if needed
             if not records and self.attendance_path.exists():
                 for csv_file in self.attendance_path.glob("Attendance_*.csv"):
@@ -448,19 +413,15 @@ class AttendanceDB:
     def get_users_from_database(self):
         """Get all users from the database"""
         try:
-            conn = sqlite3.connect(str(self.db_path))
             query = '''
                 SELECT username, full_name, role, shift, is_active 
                 FROM users
             '''
-            df = pd.read_sql_query(query, conn)
+            df = pd.read_sql_query(query, self.storage.connection())
             return df.to_dict(orient="records")
         except Exception as e:
             print(f"Error getting users from database: {e}")
             return []
-        finally:
-            if 'conn' in locals():
-                conn.close()
                 
     def delete_user(self, username: str):
         """
@@ -472,21 +433,16 @@ class AttendanceDB:
         """
         try:
             # 1. Delete from database
-            conn = sqlite3.connect(str(self.db_path))
-            c = conn.cursor()
-            
-            # Delete from users table
-            c.execute('DELETE FROM users WHERE username = ?', (username,))
-            
-            # Mark attendance records as inactive
-            c.execute('''
-                UPDATE attendance
-                SET status = 'user_deleted'
-                WHERE employee_name = ?
-            ''', (username,))
-            
-            conn.commit()
-            conn.close()
+            with self.storage.transaction() as c:
+                # Delete from users table
+                c.execute('DELETE FROM users WHERE username = ?', (username,))
+                
+                # Mark attendance records as inactive
+                c.execute('''
+                    UPDATE attendance
+                    SET status = 'user_deleted'
+                    WHERE employee_name = ?
+                ''', (username,))
             
             # 2. Delete user images
             # This is actually handled by the client side function delete_user_completely
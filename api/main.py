@@ -15,7 +15,7 @@ import logging
 # modules using absolute package names so both invocation styles work.
 try:
     from .database import AttendanceDB
-    from .models import User, UserInDB, Token, TokenData, AttendanceRecord, DeviceInfo
+    from .models import User, UserInDB, Token, TokenData, AttendanceRecord, DeviceInfo, EventBatch
     from .auth import authenticate_user, create_access_token, get_current_active_user
 except Exception:
     import sys
@@ -27,7 +27,7 @@ except Exception:
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
     from api.database import AttendanceDB
-    from api.models import User, UserInDB, Token, TokenData, AttendanceRecord, DeviceInfo
+    from api.models import User, UserInDB, Token, TokenData, AttendanceRecord, DeviceInfo, EventBatch
     from api.auth import authenticate_user, create_access_token, get_current_active_user
 
 # Configure logging
@@ -47,6 +47,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Endpoints that touch the database are plain def: FastAPI runs them on its
+# thread pool, where each worker thread keeps its pooled connection (storage.py)
 db = AttendanceDB()
 
 @app.get("/")
@@ -62,7 +64,7 @@ async def root():
     }
 
 @app.get("/attendance/today")
-async def get_today_attendance():
+def get_today_attendance():
     try:
         logger.info("Fetching today's attendance")
         data = db.get_attendance_by_date(datetime.now())
@@ -72,7 +74,7 @@ async def get_today_attendance():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/attendance/all")
-async def get_all_attendance():
+def get_all_attendance():
     try:
         logger.info("Fetching all attendance records")
         data = db.get_all_attendance()
@@ -82,7 +84,7 @@ async def get_all_attendance():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/users")
-async def get_users():
+def get_users():
     """Get all registered users from images directory"""
     try:
         logger.info("Fetching registered users from images")
@@ -96,7 +98,7 @@ async def get_users():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/users/database")
-async def get_database_users():
+def get_database_users():
     """Get all users from database"""
     try:
         logger.info("Fetching users from database")
@@ -110,7 +112,7 @@ async def get_database_users():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/devices/")
-async def get_devices():
+def get_devices():
     try:
         logger.info("Fetching devices")
         data = db.get_all_devices()
@@ -120,7 +122,7 @@ async def get_devices():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/attendance/today")
-async def get_today_attendance():
+def get_today_attendance():
     try:
         logger.info("Fetching today's attendance")
         today = datetime.now().strftime("%y_%m_%d")
@@ -133,7 +135,7 @@ async def get_today_attendance():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/attendance/all")
-async def get_all_attendance():
+def get_all_attendance():
     try:
         logger.info("Fetching all attendance records")
         df = db.get_all_attendance()
@@ -144,9 +146,21 @@ async def get_all_attendance():
         logger.error(f"Error getting all attendance: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/attendance/events")
+def ingest_attendance_events(batch: EventBatch):
+    """Bulk replay of recognizer journals; events already stored are ignored"""
+    try:
+        result = db.ingest_events([event.dict() for event in batch.events], batch.device_id)
+        logger.info(f"Ingested {result['accepted']} events from {batch.device_id} "
+                    f"({result['duplicates']} duplicates)")
+        return result
+    except Exception as e:
+        logger.error(f"Error ingesting attendance events: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # User management endpoints (admin only)
 @app.post("/users/add", response_model=User)
-async def create_user(user: User, current_user: User = Depends(get_current_active_user)):
+def create_user(user: User, current_user: User = Depends(get_current_active_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     try:
@@ -156,7 +170,7 @@ async def create_user(user: User, current_user: User = Depends(get_current_activ
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/users/{username}", response_model=User)
-async def update_user(
+def update_user(
     username: str,
     user_update: User,
     current_user: User = Depends(get_current_active_user)
@@ -170,7 +184,7 @@ async def update_user(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/users/{username}")
-async def delete_user(
+def delete_user(
     username: str,
     current_user: User = Depends(get_current_active_user)
 ):
@@ -184,7 +198,7 @@ async def delete_user(
 
 # Device management endpoints
 @app.post("/devices/status", response_model=DeviceInfo)
-async def update_device_status(
+def update_device_status(
     device_id: str,
     status: str,
     current_user: User = Depends(get_current_active_user)
@@ -196,7 +210,7 @@ async def update_device_status(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/devices/", response_model=List[DeviceInfo])
-async def get_devices(current_user: User = Depends(get_current_active_user)):
+def get_devices(current_user: User = Depends(get_current_active_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     try:
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 class User(BaseModel):
     username: str
@@ -33,4 +33,14 @@ class DeviceInfo(BaseModel):
     name: str
     location: str
     last_active: datetime
-    status: str  # 'active' or 'inactive'
\ No newline at end of file
+    status: str  # 'active' or 'inactive'
+
+class JournalEvent(BaseModel):
+    event_id: str
+    path: str
+    payload: Dict[str, Any]
+    created: float  # epoch seconds when the recognizer journaled it
+
+class EventBatch(BaseModel):
+    device_id: str
+    events: List[JournalEvent]
@@ -7,9 +7,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import subprocess
-import sqlite3
 from typing import List
 from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+
+from recognition_daemon import DaemonClient
+from storage import get_storage
 
 # Initialize FastAPI app
 app = FastAPI(title="SIMSLIFE Face Recognition API", version="1.0.0")
@@ -45,26 +48,9 @@ class AttendanceRecord(BaseModel):
     timestamp: datetime
     status: str
 
-# Database Setup (DEFINISI HANYA SEKALI)
-def init_db():
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users
-        (username TEXT PRIMARY KEY, password TEXT)
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS attendance
-        (id INTEGER PRIMARY KEY AUTOINCREMENT,
-         employee_name TEXT,
-         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-         status TEXT)
-    ''')
-    conn.commit()
-    conn.close()
-
-# Initialize database
-init_db()
+# Database Setup: the same attendance.db schema the API in api/ uses, through
+# pooled per-thread connections (storage.py)
+storage = get_storage()
 
 # Authentication Functions
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -103,6 +89,7 @@ async def root():
             "token": "/token",
             "capture": "/capture/{name}",
             "attendance": "/attendance",
+            "recognition_status": "/recognition/status",
             "all_attendance": "/attendance/all"
         }
     }
@@ -161,66 +148,66 @@ async def capture_face(name: str, current_user: str = Depends(get_current_user))
 @app.post("/attendance")
 async def mark_attendance(current_user: str = Depends(get_current_user)):
     try:
-        # Get root directory and script path
-        root_dir = Path(__file__).parent
-        script_path = root_dir / "main.py"
-        
-        if not script_path.exists():
+        # Recognition runs in the long-lived daemon, which keeps dlib and the
+        # gallery loaded; only the first request after boot has to start it
+        client = DaemonClient()
+        if not await run_in_threadpool(client.ensure_running):
+            raise HTTPException(status_code=503, detail="Recognition daemon is not available")
+        result = await run_in_threadpool(client.recognize_once, 10.0)
+        if result.get('error'):
             raise HTTPException(
                 status_code=500,
-                detail=f"Main script not found at: {script_path}"
-            )
-        
-        # Run the main recognition script with explicit working directory
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True,
-            cwd=str(root_dir),
-            timeout=60  # Add timeout
-        )
-        
-        if result.returncode == 0:
-            # Save attendance record
-            conn = sqlite3.connect('attendance.db')
-            c = conn.cursor()
-            employee_name = result.stdout.strip() or "Unknown"
-            c.execute(
-                "INSERT INTO attendance (employee_name, status) VALUES (?, ?)",
-                (employee_name, "present")
+                detail=f"Attendance marking failed: {result.get('message')}"
             )
-            conn.commit()
-            conn.close()
-            return {
-                "message": "Attendance marked successfully",
-                "employee": employee_name
-            }
-        else:
+
+        if not result.get('faces'):
+            # Nobody recognized: nothing to record
             raise HTTPException(
-                status_code=500,
-                detail=f"Attendance marking failed: {result.stderr}"
+                status_code=404,
+                detail=result.get('message') or "No registered face recognized"
             )
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=500, detail="Attendance recognition timeout")
+
+        # The daemon's tracker records real marks itself: they go through the
+        # event journal to /attendance/events and into the same attendance.db,
+        # so nothing is inserted here
+        marks = [f for f in result['faces'] if (f.get('status') or '').startswith("\u2713")]
+        marked = bool(marks)
+        face = marks[0] if marks else result['faces'][0]
+        return {
+            "message": "Attendance marked successfully" if marked
+                       else f"Attendance not marked: {face.get('status') or 'not allowed now'}",
+            "marked": marked,
+            "employee": face['name'],
+            "faces": result.get('faces', []),
+            "elapsed_ms": result.get('elapsed_ms')
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/recognition/status")
+async def recognition_status(current_user: str = Depends(get_current_user)):
+    client = DaemonClient()
+    try:
+        return await run_in_threadpool(client.status)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Recognition daemon is not available: {e}")
+
 @app.get("/attendance/all")
-async def get_all_attendance(current_user: str = Depends(get_current_user)):
+def get_all_attendance(current_user: str = Depends(get_current_user)):
     try:
-        conn = sqlite3.connect('attendance.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM attendance ORDER BY timestamp DESC")
-        records = c.fetchall()
-        conn.close()
+        records = storage.query(
+            "SELECT id, employee_name, date, check_in, status FROM attendance ORDER BY date DESC, check_in DESC"
+        )
         
         attendance_records = []
         for record in records:
             attendance_records.append({
                 "id": record[0],
                 "employee_name": record[1],
-                "timestamp": record[2],
-                "status": record[3]
+                "timestamp": f"{record[2]} {record[3]}" if record[3] else record[2],
+                "status": record[4]
             })
         return attendance_records
     except Exception as e:
@@ -0,0 +1,238 @@
+"""
+Shared writer for the daily Attendance_Entry/Attendance_YY_MM_DD.csv files.
+
+Every writer of attendance rows (both AttendanceTrackers, the dashboard's
+attendance page and the OpenCV window) goes through one AttendanceCSVWriter
+per process instead of checking for, opening and closing the day's file on
+every mark:
+- the current day's file stays open in append mode
+- rows are buffered and group-committed every flush_interval seconds (or on
+  flush()), optionally followed by an fsync
+- each row goes to the file of its own date, so a process that runs past
+  midnight switches files at the first row of the new day
+- new files get the SCHEMA header; files created by older versions with a
+  shorter header keep receiving only the columns they have
+- with a WriteIndex, a row whose (person, day, shift, event type) was
+  already written is refused, so repeated recognitions do not pile up
+  duplicate rows; its key is confirmed only once the row is in the file
+- rows a flush could not write (disk full, permissions, a failed rotation)
+  stay queued for the next flush
+"""
+import atexit
+import csv
+import io
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from tracker_state import get_write_index
+
+SCHEMA = ("Name", "Time", "Date", "Shift", "Status")
+ATTENDANCE_DIR = Path(os.environ.get(
+    'ATTENDANCE_DIR', Path(os.path.dirname(os.path.abspath(__file__))) / 'Attendance_Entry'))
+FLUSH_INTERVAL = float(os.environ.get('ATTENDANCE_CSV_FLUSH_INTERVAL', '0.5'))
+FSYNC = os.environ.get('ATTENDANCE_CSV_FSYNC', '0') == '1'
+
+
+def attendance_path(day=None, directory=None):
+    """Path of the attendance CSV for day (a date or datetime, default today)."""
+    day = day or datetime.now()
+    return Path(directory or ATTENDANCE_DIR) / f"Attendance_{day.strftime('%y_%m_%d')}.csv"
+
+
+class AttendanceCSVWriter:
+    """
+    Buffered, day-rotating appender of attendance rows.
+
+    args:
+    directory: folder of the daily files (default ATTENDANCE_DIR)
+    flush_interval: seconds rows may wait in memory; 0 writes through on every row
+    fsync: fsync after every group commit, for kiosks that lose power
+    index: tracker_state.WriteIndex that refuses duplicate rows (None writes everything)
+    """
+
+    def __init__(self, directory=None, flush_interval=FLUSH_INTERVAL, fsync=FSYNC, index=None):
+        self.directory = Path(directory or ATTENDANCE_DIR)
+        self.index = index
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.rows_written = 0
+        self.commits = 0
+        self._lock = threading.Lock()
+        self._pending = []
+        self._day = None
+        self._file = None
+        self._writer = None
+        self._columns = SCHEMA
+        self._closed = threading.Event()
+        self._thread = None
+
+    def claim(self, name, when, shift='', event='checkin'):
+        """
+        Reserve a row's deduplication key ahead of write(..., claimed=True),
+        for callers that must know the row is new before recording anything else.
+
+        returns: False when the row would be a duplicate
+        """
+        return self.index is None or self.index.claim(name, when.date(), shift, event)
+
+    def release(self, name, when, shift='', event='checkin'):
+        """Give back a key from claim() whose row will not be written."""
+        if self.index is not None:
+            self.index.release(name, when.date(), shift, event)
+
+    def write(self, name, when=None, shift='', status='', event='checkin', claimed=False):
+        """
+        Queue one attendance row; it reaches the file within flush_interval.
+
+        args:
+        event: event type for deduplication ('checkin', 'checkout', or e.g. a
+               rejection status that should be recorded once)
+        claimed: the caller already holds the key from claim()
+        returns: False when the index refused the row as a duplicate
+        """
+        when = when or datetime.now()
+        if not claimed and not self.claim(name, when, shift, event):
+            return False
+        row = {'Name': name, 'Time': when.strftime('%H:%M:%S'), 'Date': when.strftime('%Y-%m-%d'),
+               'Shift': shift or '', 'Status': status or ''}
+        key = (name, when.date(), shift, event) if self.index is not None else None
+        with self._lock:
+            self._pending.append((when.date(), row, key))
+        if self.flush_interval <= 0:
+            self.flush()
+        elif self._thread is None:
+            self._start()
+        return True
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='attendance-csv', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing attendance CSV: {e}")
+
+    def flush(self):
+        """
+        Write all queued rows now as one group commit. Rows that could not be
+        written stay queued (the error is raised) and their keys unconfirmed.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            done = 0
+            try:
+                if self._file is not None and not os.path.exists(self._file.name):
+                    # Deleted or moved away (e.g. from the dashboard): start a new file
+                    self._day = None
+                while done < len(pending):
+                    day = pending[done][0]
+                    end = done
+                    while end < len(pending) and pending[end][0] == day:
+                        end += 1
+                    if day != self._day:
+                        self._rotate(day)
+                    # One write per day's run of rows, rendered up front so a
+                    # failure cannot leave half of them in the file's buffer
+                    text = io.StringIO()
+                    writer = csv.writer(text)
+                    for _, row, _ in pending[done:end]:
+                        writer.writerow([row.get(column, '') for column in self._columns])
+                    self._file.write(text.getvalue())
+                    self._file.flush()
+                    if self.fsync:
+                        os.fsync(self._file.fileno())
+                    done = end
+            except Exception:
+                self._pending[:0] = pending[done:]
+                self._reset_file()
+                raise
+            finally:
+                if done:
+                    if self.index is not None:
+                        self.index.confirm([key for _, _, key in pending[:done] if key is not None])
+                    self.rows_written += done
+                    self.commits += 1
+
+    def _reset_file(self):
+        """Drop the open file after a failed write; the next flush reopens it."""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+        self._file = None
+        self._writer = None
+        self._day = None
+
+    def ensure_today(self):
+        """Create today's file (with header) if needed and return its path."""
+        with self._lock:
+            today = datetime.now().date()
+            if today != self._day:
+                self._rotate(today)
+                self._file.flush()
+        return attendance_path(today, self.directory)
+
+    def _rotate(self, day):
+        """Switch the open file to day's (caller holds the lock)."""
+        if self._file is not None:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = attendance_path(day, self.directory)
+        columns = None
+        if path.exists() and path.stat().st_size > 0:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                columns = next(csv.reader(f), None)
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if columns:
+            self._columns = tuple(columns)
+        else:
+            self._columns = SCHEMA
+            self._writer.writerow(SCHEMA)
+        self._day = day
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error writing attendance CSV: {e}")
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._day = None
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """The process-wide AttendanceCSVWriter (with the shared WriteIndex), created on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AttendanceCSVWriter(index=get_write_index())
+        return _writer
+
+
+@atexit.register
+def _close_writer():
+    if _writer is not None:
+        _writer.close()
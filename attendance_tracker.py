@@ -1,45 +1,41 @@
 import time
 from datetime import datetime
-import requests
-import csv
-import os
 from pathlib import Path
 
+from attendance_csv import get_writer
+from event_sink import get_sink
+from shift_schedule import get_schedule
+from tracker_state import get_tracker_state
+
 class AttendanceTracker:
     def __init__(self):
-        self.last_attendance = {}  # Store last attendance time for each person
-        self.marked_shifts = {}  # Track which shifts have been marked for each person today
         self.cooldown = 3600  # 1 hour in seconds
+        # Last marks and marked shifts persist in SQLite and are shared with
+        # every other recognizer process on this machine
+        self.state = get_tracker_state('main')
         self._user_data_cache = None
         self._user_data_mtime = 0.0
         
-        # Define shift times (24-hour format)
-        self.morning_shift = {
-            'start': '08:00',
-            'end': '17:00'
-        }
-        self.night_shift = {
-            'start': '16:00',
-            'end': '22:00'
-        }
+        # Shift windows come from the shared, precompiled schedule
+        self.schedule = get_schedule()
+        # API notifications are sent in the background so the camera loop never waits on them
+        self.sink = get_sink()
+        self.csv_writer = get_writer()
     
-    def _get_current_shift(self):
-        """Determine which shift the current time falls into"""
-        current_time = datetime.now().strftime('%H:%M')
-        
-        if self._is_time_between(current_time, self.morning_shift['start'], self.morning_shift['end']):
-            return 'morning'
-        elif self._is_time_between(current_time, self.night_shift['start'], self.night_shift['end']):
-            return 'night'
-        return None
-    
-    def _is_time_between(self, current, start, end):
-        """Check if current time is between start and end times"""
-        current = datetime.strptime(current, '%H:%M').time()
-        start = datetime.strptime(start, '%H:%M').time()
-        end = datetime.strptime(end, '%H:%M').time()
-        
-        return start <= current <= end
+    def _get_current_shift(self, name=None):
+        """
+        Determine which shift the current time falls into. A shift counts until
+        the end of its checkout window; for name, their assigned shift wins
+        while it is still running (e.g. a morning checkout after night has started).
+        """
+        shifts = self.schedule.shifts_at(checkout=True)
+        if not shifts:
+            return None
+        if name is not None:
+            assigned = self._get_assigned_shift(name)
+            if assigned in shifts:
+                return assigned
+        return shifts[0]
 
     def _load_user_data(self):
         """Load user_data.json from project root or dashboard directory with basic caching."""
@@ -72,7 +68,7 @@ class AttendanceTracker:
             self._user_data_mtime = 0.0
 
     def _get_assigned_shift(self, name: str):
-        """Return the assigned shift for a user ('morning'/'night') if available."""
+        """Return the assigned shift for a user (a schedule shift name) if available."""
         self._load_user_data()
         data = self._user_data_cache or {}
         meta = data.get(name) or data.get(name.lower()) or data.get(name.title())
@@ -81,13 +77,13 @@ class AttendanceTracker:
         shift = meta.get('shift')
         if isinstance(shift, str):
             s = shift.strip().lower()
-            if s in ('morning', 'night'):
+            if s in self.schedule.shifts:
                 return s
         return None
 
     def has_valid_shift(self, name: str) -> bool:
         """Check if the user's assigned shift matches the current shift window."""
-        current_shift = self._get_current_shift()
+        current_shift = self._get_current_shift(name)
         if not current_shift:
             return False
         assigned = self._get_assigned_shift(name)
@@ -96,17 +92,23 @@ class AttendanceTracker:
             return True
         return assigned == current_shift
     
-    def _reset_daily_records(self, name):
-        """Reset daily records if it's a new day"""
-        current_date = datetime.now().date()
-        if name in self.marked_shifts:
-            last_date = datetime.fromtimestamp(self.last_attendance.get(name, 0)).date()
-            if current_date != last_date:
-                self.marked_shifts[name] = set()
-    
+    @property
+    def last_attendance(self):
+        """name -> epoch seconds of the last mark (cached view of the shared state)"""
+        return self.state.last_marks
+
+    def already_marked(self, name, shift):
+        """Whether name has been marked for shift today"""
+        return shift in self.state.marked_shifts(name)
+
+    def in_cooldown(self, name):
+        """Check (without side effects) whether name was marked less than cooldown seconds ago"""
+        last = self.state.last_mark(name)
+        return last is not None and time.time() - last < self.cooldown
+
     def can_mark_attendance(self, name):
         """Check if attendance can be marked based on shift times and hourly cooldown"""
-        current_shift = self._get_current_shift()
+        current_shift = self._get_current_shift(name)
         
         # If not within any shift time window
         if not current_shift:
@@ -116,17 +118,11 @@ class AttendanceTracker:
         if not self.has_valid_shift(name):
             return False
         
-        # Reset records if it's a new day
-        self._reset_daily_records(name)
-        
-        # Initialize marked shifts for new names
-        if name not in self.marked_shifts:
-            self.marked_shifts[name] = set()
-            
         # Check cooldown period (one detection per hour)
         current_time = time.time()
-        if name in self.last_attendance:
-            time_diff = current_time - self.last_attendance[name]
+        last = self.state.last_mark(name)
+        if last is not None:
+            time_diff = current_time - last
             if time_diff < self.cooldown:
                 # Calculate remaining cooldown time in minutes
                 remaining_minutes = int((self.cooldown - time_diff) / 60)
@@ -136,57 +132,42 @@ class AttendanceTracker:
         return True
         
     def mark_attendance(self, name):
-        """Mark attendance and notify API if within shift hours and not already marked"""
+        """Mark attendance and queue an API notification if within shift hours and not already marked"""
         if not self.can_mark_attendance(name):
             return False
             
-        current_time = time.time()
-        self.last_attendance[name] = current_time
-        
-        # Get current shift and mark it as recorded
-        current_shift = self._get_current_shift()
-        if current_shift:
-            self.marked_shifts.setdefault(name, set()).add(current_shift)
-        
-        # Get current date and time
         now = datetime.now()
+        current_shift = self._get_current_shift(name)
+        
         time_str = now.strftime('%H:%M:%S')
         date_str = now.strftime('%Y-%m-%d')
         
-        # Ensure the directory exists
-        os.makedirs("Attendance_Entry", exist_ok=True)
+        # Marks after the first check-in of a shift are only written again as a
+        # checkout. Claim the row first: a duplicate must not record a mark,
+        # or it would restart the cooldown with nothing written
+        event = 'checkout' if self.schedule.status(current_shift, now) == 'checkout' else 'checkin'
+        if not self.csv_writer.claim(name, now, current_shift, event):
+            print(f"{name} already has a {event} for the {current_shift} shift today")
+            return False
         
-        # Create the CSV file for today
-        current_date = now.strftime("%y_%m_%d")
-        attendance_file = f'Attendance_Entry/Attendance_{current_date}.csv'
+        # Check and record the mark in one step, so another recognizer that
+        # saw the same person at the same moment cannot mark them too
+        if not self.state.try_mark(name, current_shift, now, cooldown=self.cooldown):
+            self.csv_writer.release(name, now, current_shift, event)
+            return False
         
         try:
-            # Create file with headers if it doesn't exist
-            if not os.path.exists(attendance_file):
-                with open(attendance_file, 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["Name", "Time", "Date"])
+            # Buffered append to today's CSV (the shared writer group-commits and rotates)
+            self.csv_writer.write(name, now, shift=current_shift, event=event, claimed=True)
             
-            # Record the attendance
-            with open(attendance_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([name, time_str, date_str])
-            
-            # Notify the API
-            try:
-                response = requests.post(
-                    "http://localhost:8000/attendance",
-                    json={
-                        "name": name,
-                        "time": time_str,
-                        "date": date_str
-                    }
-                )
-                if response.status_code == 200:
-                    print(f"Attendance marked for {name} at {time_str}")
-            except requests.RequestException:
-                # Silently continue if API is not available
-                pass
+            print(f"Attendance marked for {name} at {time_str}")
+
+            # Notify the API (queued, never blocks)
+            self.sink.submit('/attendance', {
+                "name": name,
+                "time": time_str,
+                "date": date_str
+            })
             
             return True
             
@@ -0,0 +1,89 @@
+"""
+Compare IVFIndex against brute-force Gallery on synthetic 128-d encodings.
+
+Reports recall@1 (does the ANN top-1 identity match the exact top-1 identity)
+and per-query latency for a range of nprobe settings.
+
+Usage:
+    python benchmarks/ann_benchmark.py --identities 20000 --poses 3 --queries 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Benchmarks run from the project root or from inside benchmarks/
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from ann_index import IVFIndex
+from face_gallery import Gallery
+
+
+def synthetic_gallery(identities, poses, seed=0):
+    """
+    Random identity centers spread so different people sit ~1.0 apart and
+    each pose sits ~0.25 from its center, roughly like dlib encodings.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0.0, 1.0 / np.sqrt(2 * 128), size=(identities, 128)).astype(np.float32)
+    encodings = np.repeat(centers, poses, axis=0)
+    encodings += rng.normal(0.0, 0.25 / np.sqrt(2 * 128), size=encodings.shape).astype(np.float32)
+    names = [f"person_{i}" for i in range(identities) for _ in range(poses)]
+    return centers, encodings, names
+
+
+def timed_queries(matcher, queries):
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(matcher.match(q, k=1)[0])
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return results, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF vs brute-force gallery benchmark")
+    parser.add_argument("--identities", type=int, default=10000)
+    parser.add_argument("--poses", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--nlist", type=int, default=None, help="Coarse centroids (default 4*sqrt(N))")
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32", help="Comma-separated nprobe values")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    centers, encodings, names = synthetic_gallery(args.identities, args.poses, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(args.identities, size=args.queries)
+    queries = centers[picks] + rng.normal(0.0, 0.25 / np.sqrt(2 * 128),
+                                          size=(args.queries, 128)).astype(np.float32)
+
+    print(f"Gallery: {args.identities} identities x {args.poses} poses = {len(encodings)} encodings")
+
+    start = time.perf_counter()
+    gallery = Gallery(encodings, names)
+    print(f"Brute force build: {time.perf_counter() - start:.2f}s")
+    exact, exact_lat = timed_queries(gallery, queries)
+    exact_top1 = [m[0][0] for m in exact]
+    print(f"{'method':<16}{'recall@1':>10}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>10}")
+    print(f"{'brute force':<16}{1.0:>10.3f}{np.percentile(exact_lat, 50):>10.3f}"
+          f"{np.percentile(exact_lat, 95):>10.3f}{1.0:>10.1f}")
+
+    start = time.perf_counter()
+    index = IVFIndex.build(encodings, names, nlist=args.nlist, seed=args.seed)
+    print(f"IVF build (nlist={index.nlist}): {time.perf_counter() - start:.2f}s")
+    for nprobe in [int(v) for v in args.nprobe.split(",")]:
+        index.nprobe = nprobe
+        approx, lat = timed_queries(index, queries)
+        recall = np.mean([bool(m) and m[0][0] == e for m, e in zip(approx, exact_top1)])
+        speedup = np.percentile(exact_lat, 50) / max(np.percentile(lat, 50), 1e-9)
+        print(f"{'ivf nprobe=' + str(nprobe):<16}{recall:>10.3f}{np.percentile(lat, 50):>10.3f}"
+              f"{np.percentile(lat, 95):>10.3f}{speedup:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Per-stage latency benchmark for the recognition pipeline in main.py.
+
+Stages:
+- detect:        _detect_faces on sample images / recorded frames
+- encode:        face_recognition.face_encodings for the detected boxes
+- detect[P] / encode[P] / enroll[P]: the same per recognition profile P with
+                 --profiles, plus enrollment (encode_still) on the sample images;
+                 the frames where each profile found a face are reported too
+- match[N]:      Gallery.identify against synthetic galleries of N encodings
+- shift_checks:  _get_current_shift + has_valid_shift + can_mark_attendance
+- csv_write:     AttendanceCSVWriter.write as called by mark_attendance
+- csv_flush:     its group commit, every 10 rows
+
+Each stage reports count, mean, p50, p95 and p99 in milliseconds. Results are
+written as JSON so runs can be compared across commits; pass --baseline to
+flag stages whose p50 or p95 got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py --output bench.json
+    python benchmarks/pipeline_benchmark.py --source recordings/door.mp4 --baseline bench.json
+    python benchmarks/pipeline_benchmark.py --source recordings/door.mp4 --profiles fast,balanced,accurate
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Benchmarks run from the project root or from inside benchmarks/
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from face_gallery import Gallery
+from encoding_store import list_gallery_images
+
+
+class LatencyRecorder:
+    """Collects raw samples per stage and summarizes them as percentiles."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples.setdefault(stage, []).append((time.perf_counter() - start) * 1000.0)
+        return result
+
+    def summary(self):
+        out = {}
+        for stage, values in self.samples.items():
+            arr = np.array(values)
+            out[stage] = {
+                'count': int(arr.size),
+                'mean_ms': round(float(arr.mean()), 4),
+                'p50_ms': round(float(np.percentile(arr, 50)), 4),
+                'p95_ms': round(float(np.percentile(arr, 95)), 4),
+                'p99_ms': round(float(np.percentile(arr, 99)), 4),
+            }
+        return out
+
+
+def synthetic_encodings(n, poses=3, seed=0):
+    """n encodings spread over n // poses identities, roughly like dlib output."""
+    rng = np.random.default_rng(seed)
+    identities = max(1, n // poses)
+    centers = rng.normal(0.0, 1.0 / np.sqrt(2 * 128), size=(identities, 128))
+    encodings = np.repeat(centers, poses, axis=0)[:n]
+    encodings = encodings + rng.normal(0.0, 0.25 / np.sqrt(2 * 128), size=encodings.shape)
+    names = [f"person_{i // poses}" for i in range(len(encodings))]
+    return encodings.astype(np.float32), names, centers
+
+
+def bench_matching(recorder, sizes, queries, batch):
+    for size in sizes:
+        encodings, names, centers = synthetic_encodings(size)
+        gallery = Gallery(encodings, names)
+        rng = np.random.default_rng(size)
+        for _ in range(queries):
+            probes = centers[rng.integers(0, len(centers), size=batch)]
+            recorder.time(f"match[{size}]", gallery.identify, probes, 0.4)
+
+
+def bench_shift_checks(recorder, iterations):
+    try:
+        from attendance_tracker import AttendanceTracker
+    except ImportError as e:
+        print(f"Skipping shift_checks stage: {e}")
+        return
+
+    tracker = AttendanceTracker()
+    name = "benchmark_user"
+
+    def checks():
+        tracker._get_current_shift()
+        tracker.has_valid_shift(name)
+        tracker.can_mark_attendance(name)
+
+    for _ in range(iterations):
+        recorder.time("shift_checks", checks)
+
+
+def bench_csv_write(recorder, iterations):
+    from attendance_csv import AttendanceCSVWriter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Same writer AttendanceTracker.mark_attendance uses; write() only
+        # buffers, the group commit is timed separately as csv_flush
+        writer = AttendanceCSVWriter(tmp, flush_interval=3600)
+        for i in range(iterations):
+            recorder.time("csv_write", writer.write, "benchmark_user", datetime.now(), "morning")
+            if i % 10 == 9:
+                recorder.time("csv_flush", writer.flush)
+        writer.close()
+
+
+def load_frames(source, images_dir, max_frames):
+    """Frames from a recorded source, else the gallery pose images."""
+    import cv2
+
+    frames = []
+    if source:
+        from video_sources import open_source
+        cap = open_source(source)
+        while len(frames) < max_frames:
+            success, frame = cap.read()
+            if not success:
+                break
+            frames.append(frame)
+        cap.release()
+    else:
+        for _, image_path in list_gallery_images(images_dir)[:max_frames]:
+            frame = cv2.imread(image_path)
+            if frame is not None:
+                frames.append(frame)
+    return frames
+
+
+def bench_detect_encode(recorder, source, images_dir, max_frames, repeats, min_face=None,
+                        profile=None):
+    """
+    Time detection and encoding on recorded frames. With a profile name the
+    stages are suffixed with it, main.PROFILE is switched for the run and the
+    sample images are also timed through enrollment.
+
+    returns: {'frames', 'frames_with_faces', 'faces'} from the last pass, or None when skipped
+    """
+    try:
+        import face_recognition
+        import main
+        from scale_controller import encode_still
+    except ImportError as e:
+        print(f"Skipping detect/encode stages: {e}")
+        return None
+    frames = load_frames(source, images_dir, max_frames)
+    if not frames:
+        print("Skipping detect/encode stages: no frames")
+        return None
+    suffix = ""
+    if profile is not None:
+        main.PROFILE = main.get_profile(profile)
+        suffix = f"[{profile}]"
+    # With min_face the ScaleController picks the detection resolution per frame
+    scaler = main.ScaleController(min_face=min_face) if min_face else None
+    for _ in range(repeats):
+        counts = {'frames': len(frames), 'frames_with_faces': 0, 'faces': 0}
+        for frame in frames:
+            rgb_small, boxes, _ = recorder.time("detect" + suffix, main._detect_faces, frame,
+                                                None, None, scaler)
+            if boxes:
+                counts['frames_with_faces'] += 1
+                counts['faces'] += len(boxes)
+                recorder.time("encode" + suffix, face_recognition.face_encodings, rgb_small, boxes,
+                              main.PROFILE.num_jitters, main.PROFILE.landmarks)
+    if profile is not None:
+        for image in load_frames(None, images_dir, max_frames):
+            recorder.time("enroll" + suffix, encode_still, image, main.PROFILE)
+    return counts
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against a baseline result file."""
+    regressions = []
+    for stage, stats in results['stages'].items():
+        base = baseline.get('stages', {}).get(stage)
+        if not base:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            if base[key] > 0 and stats[key] > base[key] * (1.0 + tolerance):
+                regressions.append(f"{stage} {key}: {base[key]:.3f} -> {stats[key]:.3f} "
+                                   f"(+{100.0 * (stats[key] / base[key] - 1.0):.0f}%)")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage recognition pipeline benchmark")
+    parser.add_argument("--gallery-sizes", default="10,100,1000,10000,100000",
+                        help="Comma-separated synthetic gallery sizes for the match stage")
+    parser.add_argument("--queries", type=int, default=200, help="Match queries per gallery size")
+    parser.add_argument("--batch", type=int, default=1, help="Probes per match query (faces per frame)")
+    parser.add_argument("--iterations", type=int, default=500, help="Iterations for shift/CSV stages")
+    parser.add_argument("--source", default=None, help="Recorded video / image folder for detect and encode")
+    parser.add_argument("--images", default=os.path.join(ROOT_DIR, "Attendance_data"),
+                        help="Sample face images when no --source is given")
+    parser.add_argument("--max-frames", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the frames for detect/encode")
+    parser.add_argument("--min-face", type=int, default=None,
+                        help="Detect with the adaptive scale controller targeting this face height (pixels)")
+    parser.add_argument("--profiles", default=None,
+                        help="Comma-separated recognition profiles to compare (e.g. fast,balanced,accurate)")
+    parser.add_argument("--skip-detect", action="store_true", help="Only run the pure-Python stages")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    recorder = LatencyRecorder()
+    bench_matching(recorder, [int(v) for v in args.gallery_sizes.split(",")], args.queries, args.batch)
+    bench_shift_checks(recorder, args.iterations)
+    bench_csv_write(recorder, args.iterations)
+    detections = {}
+    if not args.skip_detect:
+        for profile in (args.profiles.split(",") if args.profiles else [None]):
+            counts = bench_detect_encode(recorder, args.source, args.images, args.max_frames,
+                                         args.repeats, args.min_face, profile)
+            if counts is not None:
+                detections[profile or 'default'] = counts
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'numpy': np.__version__,
+        },
+        'stages': recorder.summary(),
+        'detections': detections,
+    }
+
+    print(f"{'stage':<20}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for stage, stats in results['stages'].items():
+        print(f"{stage:<20}{stats['count']:>8}{stats['mean_ms']:>10.3f}{stats['p50_ms']:>10.3f}"
+              f"{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+    for profile, counts in detections.items():
+        print(f"faces found [{profile}]: {counts['frames_with_faces']}/{counts['frames']} frames, "
+              f"{counts['faces']} faces")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions vs {args.baseline} (commit {baseline.get('meta', {}).get('commit')}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
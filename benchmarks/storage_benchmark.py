@@ -0,0 +1,104 @@
+"""
+Concurrent request throughput of the API's storage layer (api/database.py).
+
+Each client thread plays a FastAPI worker issuing a mix of the calls behind
+the API endpoints against a scratch copy of the schema:
+- 50% get_attendance_by_date (today's attendance page)
+- 20% validate_shift_time (shift check for a recognized person)
+- 20% mark_attendance (check-in / check-out)
+- 10% update_device_status (device heartbeat)
+
+Reports requests per second and per-request p50/p95/p99 latency for each
+client count, as JSON with --output.
+
+Usage:
+    python benchmarks/storage_benchmark.py --clients 1,4,16 --seconds 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def run_clients(db, clients, seconds, people):
+    """Run clients threads for seconds; returns (requests, latencies in ms)."""
+    latencies = []
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def client(seed):
+        rng = random.Random(seed)
+        local = []
+        while time.perf_counter() < stop:
+            name = f"person_{rng.randrange(people)}"
+            op = rng.random()
+            start = time.perf_counter()
+            if op < 0.5:
+                db.get_attendance_by_date(datetime.now())
+            elif op < 0.7:
+                db.validate_shift_time(datetime.now().time(), name)
+            elif op < 0.9:
+                db.mark_attendance(name, f"device_{seed}")
+            else:
+                db.update_device_status(f"device_{seed}", "active")
+            local.append((time.perf_counter() - start) * 1000.0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage layer throughput under concurrent clients")
+    parser.add_argument("--clients", default="1,4,16", help="Comma-separated client thread counts")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration per client count")
+    parser.add_argument("--people", type=int, default=200, help="Distinct employees in the request mix")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Point the storage layer at a scratch database before the API imports it
+        os.environ['ATTENDANCE_DB'] = os.path.join(tmp, "attendance.db")
+        from api.database import AttendanceDB
+
+        db = AttendanceDB()
+        results = {}
+        print(f"{'clients':>8}{'req/s':>12}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+        for clients in [int(v) for v in args.clients.split(",")]:
+            count, latencies = run_clients(db, clients, args.seconds, args.people)
+            arr = np.array(latencies) if latencies else np.zeros(1)
+            results[clients] = {
+                'requests': count,
+                'requests_per_second': round(count / args.seconds, 1),
+                'p50_ms': round(float(np.percentile(arr, 50)), 4),
+                'p95_ms': round(float(np.percentile(arr, 95)), 4),
+                'p99_ms': round(float(np.percentile(arr, 99)), 4),
+            }
+            r = results[clients]
+            print(f"{clients:>8}{r['requests_per_second']:>12.1f}{r['p50_ms']:>10.3f}"
+                  f"{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Build or refresh the on-disk encoding store for Attendance_data in parallel.
+
+Image decoding and encoding are fanned out over a process pool in bounded
+chunks. The store is saved after every chunk, so an interrupted run picks up
+where it stopped: images that are already encoded and unchanged are skipped.
+
+Usage:
+    python build_gallery.py                 # encode new/changed images
+    python build_gallery.py --rebuild       # re-encode everything
+    python build_gallery.py --workers 8 --chunk-size 64
+    python build_gallery.py --profile accurate  # must match main.py's profile
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Suppress pkg_resources deprecation warning
+warnings.filterwarnings('ignore', category=UserWarning, module='pkg_resources')
+warnings.filterwarnings('ignore', message='pkg_resources is deprecated as an API')
+
+from encoding_store import EncodingStore, list_gallery_images
+from recognition_profiles import PROFILES, get_profile, store_model
+
+
+def _encode_image_file(task):
+    """
+    Process pool worker: decode and encode one image the same way
+    main._encode_face does on CPU.
+
+    returns: (name, image_path, encoding or None, error or None)
+    """
+    name, image_path, profile_name = task
+    try:
+        import cv2
+        from scale_controller import encode_still
+
+        img = cv2.imread(image_path)
+        if img is None:
+            return name, image_path, None, "could not read image"
+        encoding = encode_still(img, get_profile(profile_name))
+        if encoding is None:
+            return name, image_path, None, "no face detected"
+        return name, image_path, encoding, None
+    except Exception as e:
+        return name, image_path, None, f"{type(e).__name__}: {e}"
+
+
+def build_gallery(path='Attendance_data', store_dir='encoding_cache', profile=None,
+                  workers=None, chunk_size=None, rebuild=False):
+    """
+    Encode every new or changed image under path into the EncodingStore,
+    with the given recognition profile (default: RECOGNITION_PROFILE).
+
+    returns: dict with counts and a list of (image_path, reason) failures
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or workers * 8
+
+    profile = get_profile(profile)
+    store = EncodingStore(store_dir, model=store_model(profile), scale=profile.scale)
+    if not rebuild:
+        store.load()
+    items = list_gallery_images(path)
+    removed = store.prune(image_path for _, image_path in items)
+    todo = store.pending(items)
+    print(f"Found {len(items)} images, {len(items) - len(todo)} up to date, "
+          f"{len(todo)} to encode with {workers} workers")
+
+    failures = []
+    done = 0
+    started = time.time()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for offset in range(0, len(todo), chunk_size):
+                chunk = todo[offset:offset + chunk_size]
+                futures = [executor.submit(_encode_image_file, (name, image_path, profile.name))
+                           for name, image_path in chunk]
+                for future in as_completed(futures):
+                    name, image_path, encoding, error = future.result()
+                    done += 1
+                    if error is None:
+                        store.put(name, image_path, encoding)
+                        continue
+                    failures.append((image_path, error))
+                    if error == "no face detected":
+                        # Cache the negative result so it is not retried every run;
+                        # unreadable images stay uncached so the next run retries them
+                        store.put(name, image_path, None)
+                # Persist after every chunk so an interrupted build can resume
+                store.save()
+                elapsed = max(time.time() - started, 1e-6)
+                print(f"[{done}/{len(todo)}] {100.0 * done / max(len(todo), 1):.0f}% "
+                      f"{done / elapsed:.1f} img/s, {len(failures)} failed")
+    except KeyboardInterrupt:
+        print("\nInterrupted, saving progress...")
+        store.save()
+        raise
+
+    if removed or not todo:
+        store.save()
+
+    encoded = sum(1 for meta in store.entries.values() if meta.get('encoding') is not None)
+    return {
+        'images': len(items),
+        'processed': done,
+        'removed': removed,
+        'encoded_total': encoded,
+        'failures': failures,
+        'seconds': time.time() - started,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the face encoding store in parallel")
+    parser.add_argument("--path", default="Attendance_data", help="Gallery folder with one folder per person")
+    parser.add_argument("--store", default="encoding_cache", help="Encoding store directory")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                        help="Recognition profile (must match main.py; env RECOGNITION_PROFILE, default balanced)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Images per chunk between saves")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the existing store and re-encode everything")
+    args = parser.parse_args()
+
+    try:
+        summary = build_gallery(args.path, args.store, args.profile,
+                                args.workers, args.chunk_size, args.rebuild)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    for image_path, reason in summary['failures']:
+        print(f"Failed: {image_path}: {reason}")
+    print(f"Done in {summary['seconds']:.1f}s: {summary['processed']} processed, "
+          f"{summary['removed']} removed, {len(summary['failures'])} failed, "
+          f"{summary['encoded_total']} encodings in store")
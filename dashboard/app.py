@@ -11,15 +11,36 @@ import subprocess
 import shutil
 import json
 from utils import sound
+
+# Shared recognition modules (face_gallery, ...) live in the project root next
+# to main.py. Append rather than insert so dashboard-local modules keep priority.
+_ROOT_DIR = str(Path(__file__).parent.parent)
+if _ROOT_DIR not in sys.path:
+    sys.path.append(_ROOT_DIR)
+from face_gallery import Gallery
+from shared_gallery import SharedGallery, publish_gallery
+from scale_controller import encode_still
+from recognition_profiles import get_profile
+from shift_schedule import get_schedule
 import cv2
 import numpy as np
-import face_recognition
 from attendance_tracker import AttendanceTracker
 from typing import Tuple
 
 # Initialize face recognition system
 def initialize_face_recognition():
     if 'face_recognition_initialized' not in st.session_state:
+        # Map the gallery published by main.py / the recognition daemon: no
+        # decoding or encoding per session, and one copy in memory for all of them
+        shared = SharedGallery.open()
+        if shared is not None and len(shared) > 0:
+            st.session_state.classNames = shared.names
+            st.session_state.encodeListKnown = shared.matrix
+            st.session_state.gallery = shared
+            st.session_state.face_recognition_initialized = True
+            st.session_state.attendance_tracker = AttendanceTracker()
+            return
+
         path = Path(__file__).parent.parent / 'Attendance_data'
         images = []
         classNames = []
@@ -39,19 +60,25 @@ def initialize_face_recognition():
                         images.append(curImg)
                         classNames.append(person_folder)
         
-        # Encode faces
+        # Encode faces; names are collected alongside so they stay aligned
+        # with the encodings when an image has no detectable face
         encodeListKnown = []
+        knownNames = []
         for img, name in zip(images, classNames):
-            img = cv2.cvtColor(cv2.resize(img, (0,0), fx=0.25, fy=0.25), cv2.COLOR_BGR2RGB)
-            encodings = face_recognition.face_encodings(img)
-            if len(encodings) > 0:
-                encodeListKnown.append(encodings[0])
-            else:
-                classNames.remove(name)
-                continue
+            encoding = encode_still(img, get_profile())
+            if encoding is not None:
+                encodeListKnown.append(encoding)
+                knownNames.append(name)
+        classNames = knownNames
         
         st.session_state.classNames = classNames
         st.session_state.encodeListKnown = encodeListKnown
+        st.session_state.gallery = Gallery(encodeListKnown, classNames)
+        try:
+            # Let the next sessions map this instead of encoding again
+            publish_gallery(st.session_state.gallery, None, profile=get_profile().name)
+        except Exception as e:
+            print(f"Warning: Could not publish shared gallery: {e}")
         st.session_state.face_recognition_initialized = True
         st.session_state.attendance_tracker = AttendanceTracker()
 
@@ -105,51 +132,24 @@ def is_checkout_time(time, assigned_shift):
     Check if the given time is a checkout time for the shift
     Returns: bool
     """
-    hour = time.hour
-    minute = time.minute
-    
-    if assigned_shift == 'morning':
-        # Morning shift ends at 17:00
-        return hour == 17 and minute <= 15
-    else:
-        # Night shift ends at 22:00
-        return hour == 22 and minute <= 15
+    return get_schedule().status(assigned_shift, time) == 'checkout'
 
 def get_attendance_status(check_in_time, assigned_shift):
     """
     Determine attendance status based on check-in time and assigned shift
     Returns: status (on_time, late, checkout)
     """
-    hour = check_in_time.hour
-    minute = check_in_time.minute
-    total_minutes = hour * 60 + minute
-    
-    if assigned_shift == 'morning':
-        # Morning shift: 08:00 - 17:00, toleransi 15 menit
-        shift_start_minutes = 8 * 60  # 08:00
-        tolerance_limit = shift_start_minutes + 15  # 08:15
-        
-        if hour == 17 and minute <= 15:
-            return 'checkout'  # Checkout time for morning shift
-        
-        return 'on_time' if total_minutes <= tolerance_limit else 'late'
-    else:
-        # Night shift: 17:00 - 22:00, toleransi 15 menit
-        shift_start_minutes = 17 * 60  # 17:00
-        tolerance_limit = shift_start_minutes + 15  # 17:15
-        
-        if hour == 22 and minute <= 15:
-            return 'checkout'  # Checkout time for night shift
-            
-        return 'on_time' if total_minutes <= tolerance_limit else 'late'
+    status = get_schedule().status(assigned_shift, check_in_time)
+    if status == 'checkout':
+        return 'checkout'
+    return 'on_time' if status in ('early', 'on_time') else 'late'
 
 def determine_actual_shift(check_in_time):
     """
     Determine the actual shift based on check-in time
-    Returns: actual_shift (morning or night)
+    Returns: actual_shift (a schedule shift name; night outside all shifts)
     """
-    hour = check_in_time.hour
-    return 'morning' if 8 <= hour < 17 else 'night'
+    return get_schedule().shift_at(check_in_time, early=True) or 'night'
 
 def get_today_attendance():
     try:
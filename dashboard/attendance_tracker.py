@@ -1,27 +1,31 @@
 import datetime
-import requests
-import os
+import sys
 from pathlib import Path
 
+# The shared shift schedule lives in the project root next to main.py
+_ROOT_DIR = str(Path(__file__).parent.parent)
+if _ROOT_DIR not in sys.path:
+    sys.path.append(_ROOT_DIR)
+from attendance_csv import get_writer
+from event_sink import get_sink
+from shift_schedule import get_schedule
+from tracker_state import get_tracker_state
+
 class AttendanceTracker:
     def __init__(self):
         self.cooldown_period = 300  # 5 minutes in seconds
-        self.marked_shifts = {}  # Store marked attendance by shift
-        self.last_detection = {}  # Store last detection times
+        # Marked shifts and last detections persist in SQLite, shared by all dashboard sessions
+        self.state = get_tracker_state('dashboard')
         
-        # Create Attendance_Entry directory if it doesn't exist
-        self.attendance_dir = Path(__file__).parent.parent / "Attendance_Entry"
-        os.makedirs(self.attendance_dir, exist_ok=True)
+        # Rows go to the shared Attendance_Entry writer of the project root
+        self.csv_writer = get_writer()
+        self.attendance_dir = self.csv_writer.directory
+        self.schedule = get_schedule()
+        self.sink = get_sink()
 
     def _get_current_shift(self):
-        """Determine current shift based on time"""
-        current_hour = datetime.datetime.now().hour
-        
-        if 8 <= current_hour < 17:
-            return 'morning'
-        elif 16 <= current_hour < 22:  # 4 PM to 10 PM
-            return 'night'
-        return None  # Outside shift hours
+        """Determine current shift based on time (None outside shift hours)"""
+        return self.schedule.shift_at()
 
     def can_mark_attendance(self, name):
         """Check if attendance can be marked based on cooldown and shift"""
@@ -32,12 +36,13 @@ class AttendanceTracker:
             return False
         
         # Check if already marked for current shift
-        if name in self.marked_shifts and current_shift in self.marked_shifts[name]:
+        if current_shift in self.state.marked_shifts(name):
             return False
         
         # Check cooldown period
-        if name in self.last_detection:
-            time_diff = (current_time - self.last_detection[name]).total_seconds()
+        last = self.state.last_mark(name)
+        if last is not None:
+            time_diff = current_time.timestamp() - last
             if time_diff < self.cooldown_period:
                 return False
         
@@ -54,37 +59,23 @@ class AttendanceTracker:
         if not current_shift:
             return False
             
-        try:
-            # Update attendance file
-            date_str = current_time.strftime("%y_%m_%d")
-            file_path = self.attendance_dir / f"Attendance_{date_str}.csv"
-            
-            # Create file with headers if it doesn't exist
-            if not file_path.exists():
-                with open(file_path, "w", newline='') as f:
-                    f.write("Name,Time,Date\n")
+        # Claim the CSV row before recording the mark: a check-in another
+        # recognizer already wrote must not restart the cooldown
+        if not self.csv_writer.claim(name, current_time, current_shift):
+            return False
             
-            # Append attendance
-            with open(file_path, "a", newline='') as f:
-                time_str = current_time.strftime("%H:%M:%S")
-                date_str = current_time.strftime("%Y-%m-%d")
-                f.write(f"{name},{time_str},{date_str}\n")
+        # Check and record in one step, so concurrent sessions cannot both mark
+        if not self.state.try_mark(name, current_shift, current_time, cooldown=self.cooldown_period,
+                                   once_per_shift=True):
+            self.csv_writer.release(name, current_time, current_shift)
+            return False
             
-            # Update tracking
-            self.last_detection[name] = current_time
-            if name not in self.marked_shifts:
-                self.marked_shifts[name] = set()
-            self.marked_shifts[name].add(current_shift)
+        try:
+            # Buffered append to today's CSV (the shared writer group-commits and rotates)
+            self.csv_writer.write(name, current_time, shift=current_shift, claimed=True)
             
-            # Try to send to API
-            try:
-                requests.post(
-                    "http://localhost:8000/attendance/mark",
-                    json={"employee_name": name, "check_in": current_time.isoformat()}
-                )
-            except:
-                # Continue even if API call fails
-                pass
+            # Queue for the API; delivery and retries happen in the background
+            self.sink.submit('/attendance/mark', {"employee_name": name, "check_in": current_time.isoformat()})
                 
             return True
             
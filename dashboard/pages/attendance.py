@@ -1,6 +1,5 @@
 import streamlit as st
 from pathlib import Path
-import subprocess
 import time
 import sys
 import os
@@ -20,6 +19,37 @@ def get_current_root_dir():
     """Get the root directory where main.py is located"""
     return Path(__file__).parent.parent.parent
 
+def _daemon_client():
+    """Client for the recognition daemon (recognition_daemon.py next to main.py)"""
+    root = str(get_current_root_dir())
+    if root not in sys.path:
+        sys.path.append(root)
+    from recognition_daemon import DaemonClient
+    return DaemonClient()
+
+def _shift_schedule():
+    """The shift schedule shared with main.py and the API (shift_schedule.py)"""
+    root = str(get_current_root_dir())
+    if root not in sys.path:
+        sys.path.append(root)
+    from shift_schedule import get_schedule
+    return get_schedule()
+
+def _csv_writer():
+    """The attendance CSV writer shared with main.py (attendance_csv.py)"""
+    root = str(get_current_root_dir())
+    if root not in sys.path:
+        sys.path.append(root)
+    from attendance_csv import get_writer
+    return get_writer()
+
+def _attendance_running():
+    """True when the daemon is up and its camera loop is running"""
+    try:
+        return bool(_daemon_client().status().get('camera_running'))
+    except Exception:
+        return False
+
 def safe_read_attendance_csv(csv_path, verbose=False):
     """
     Safely read attendance CSV with aggressive error recovery.
@@ -159,6 +189,7 @@ def validate_attendance_dataframe(df):
 def get_current_attendance():
     """Get today's attendance records"""
     try:
+        _csv_writer().flush()
         current_date = datetime.now().strftime("%y_%m_%d")
         attendance_file = get_current_root_dir() / "Attendance_Entry" / f"Attendance_{current_date}.csv"
         
@@ -201,24 +232,10 @@ def get_shift_status(recognized_name):
     Returns: (assigned_shift, current_shift, status, is_checkout)
     """
     now = datetime.now()
-    current_hour = now.hour
+    schedule = _shift_schedule()
     
-    # Define shift times
-    morning_start = 8    # 08:00
-    morning_end = 17     # 17:00
-    night_start = 17     # 17:00
-    night_end = 22      # 22:00
-    
-    # Toleransi untuk shift malam yang datang lebih awal
-    night_early_start = 16  # Boleh datang 1 jam sebelum shift
-    
-    # Determine current shift
-    if morning_start <= current_hour < morning_end:
-        current_shift = "morning"
-    elif night_early_start <= current_hour <= night_end:  # Diperluas untuk toleransi
-        current_shift = "night"
-    else:
-        current_shift = "outside_hours"  # Di luar jam kerja
+    # Determine current shift from the shared schedule
+    current_shift = schedule.shift_at(now) or "outside_hours"  # Di luar jam kerja
     
     # Get user's assigned shift from registration data
     root_dir = get_current_root_dir()
@@ -234,15 +251,13 @@ def get_shift_status(recognized_name):
         assigned_shift = 'morning'  # default to morning if file not found
         
     # Check if this is checkout time based on shift
-    is_checkout = False
-    if current_shift == "morning" and current_hour >= 16:  # Bisa checkout mulai 16:00
-        is_checkout = True
-    elif current_shift == "night" and current_hour >= 21:  # Bisa checkout mulai 21:00
-        is_checkout = True
+    is_checkout = schedule.status(current_shift, now) == "checkout"
     
     # Check if already checked in today
     has_checked_in = False
     try:
+        # Rows this process recorded may still be buffered
+        _csv_writer().flush()
         attendance_file = get_current_root_dir() / "Attendance_Entry" / f"Attendance_{now.strftime('%y_%m_%d')}.csv"
         df = safe_read_attendance_csv(attendance_file)
         if df is not None:
@@ -272,20 +287,26 @@ def get_shift_status(recognized_name):
                 status = "wrong_shift"  # User shift malam mencoba absen di pagi hari
             elif current_shift == "night" and assigned_shift == "morning":
                 # Toleransi khusus untuk shift pagi yang lembur/overlap ke shift malam
-                if current_hour < night_start:  # Sebelum jam 17:00
+                if schedule.status("morning", now) == "checkout":  # Masih jendela checkout pagi
                     status = "overtime_checkin"
                 else:
                     status = "wrong_shift"
             else:
                 # Normal check-in sesuai shift
-                if current_shift == "morning":
-                    status = "on_time" if current_hour <= 8 else "late"
-                else:  # night shift
-                    # Toleransi untuk shift malam yang datang lebih awal
-                    status = "on_time" if current_hour <= 17 else "late"
+                status = "on_time" if schedule.status(current_shift, now) in ("early", "on_time") else "late"
         
     return assigned_shift, current_shift, status, is_checkout
 
+# Attendance event recorded for each get_shift_status status; the others
+# (outside_hours, wrong_shift, no_checkin) are recorded once per shift as themselves
+_EVENT_TYPES = {
+    "on_time": "checkin",
+    "late": "checkin",
+    "overtime_checkin": "checkin",
+    "already_checkedin": "checkin",
+    "checkout": "checkout",
+}
+
 def process_recognized_face(recognized_name):
     """
     Process a recognized face and record attendance
@@ -300,26 +321,11 @@ def process_recognized_face(recognized_name):
         # Get shift status
         assigned_shift, current_shift, status, is_checkout = get_shift_status(recognized_name)
         
-        # Record attendance
-        now = datetime.now()
-        attendance_file = get_current_root_dir() / "Attendance_Entry" / f"Attendance_{now.strftime('%y_%m_%d')}.csv"
-        
-        # Ensure directory exists
-        attendance_file.parent.mkdir(exist_ok=True)
-        
-        # Create or append to CSV dengan struktur yang konsisten
-        file_exists = attendance_file.exists()
-        with open(attendance_file, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(["Name", "Time", "Date", "Shift", "Status"])
-            writer.writerow([
-                recognized_name,
-                now.strftime('%H:%M:%S'),
-                now.strftime('%Y-%m-%d'),
-                current_shift,
-                status
-            ])
+        # Record attendance (buffered append through the shared writer). Repeat
+        # recognitions map onto the event already written and are refused by
+        # the writer's index instead of adding a row per frame
+        _csv_writer().write(recognized_name, datetime.now(), shift=current_shift, status=status,
+                            event=_EVENT_TYPES.get(status, status))
         
         # Prepare status message based on attendance type and status
         message = ""
@@ -379,34 +385,31 @@ def show_attendance():
     """Show attendance capture page"""
     st.header("✅ Face Recognition Attendance")
     
-    # Helper to manage external attendance window (main.py)
+    # Helpers to manage the attendance window run by the recognition daemon
     def _start_external_attendance():
-        root = get_current_root_dir()
-        if 'attendance_proc' in st.session_state and st.session_state['attendance_proc'] is not None:
+        if _attendance_running():
             return False, "Attendance window is already running"
         try:
-            # Launch main.py in a separate process so it can open its own OpenCV window
-            proc = subprocess.Popen([sys.executable, str(root / "main.py")], cwd=str(root))
-            st.session_state['attendance_proc'] = proc
-            return True, "Started external attendance window (OpenCV)"
+            # The daemon keeps the models and gallery loaded between clicks;
+            # it is only started once, on the first click after boot
+            client = _daemon_client()
+            if not client.ensure_running():
+                return False, "Recognition daemon did not start"
+            result = client.start_camera(window=True)
+            if not result.get('ok'):
+                return False, result.get('message', "Failed to start camera")
+            return True, "Started attendance window (OpenCV)"
         except Exception as e:
-            return False, f"Failed to start main.py: {e}"
+            return False, f"Failed to start recognition daemon: {e}"
 
     def _stop_external_attendance():
-        proc = st.session_state.get('attendance_proc')
-        if proc is None:
-            return False, "No attendance window process to stop"
         try:
-            # Try graceful termination first
-            proc.terminate()
-            try:
-                proc.wait(timeout=3)
-            except Exception:
-                proc.kill()
-            st.session_state['attendance_proc'] = None
-            return True, "Stopped external attendance window"
+            result = _daemon_client().stop_camera()
         except Exception as e:
             return False, f"Failed to stop attendance window: {e}"
+        if not result.get('ok'):
+            return False, "No attendance window to stop"
+        return True, "Stopped attendance window"
     
     # Check if users are registered
     if not check_registration():
@@ -422,8 +425,7 @@ def show_attendance():
     with tab1:
 
         # Process status
-        proc = st.session_state.get('attendance_proc')
-        running = proc is not None and (proc.poll() is None)
+        running = _attendance_running()
         status_text = "Running" if running else "Stopped"
         st.metric("External Attendance Status", status_text)
 
@@ -471,6 +473,7 @@ def show_attendance():
         # Format date for filename
         date_str = selected_date.strftime("%y_%m_%d")
         attendance_file = get_current_root_dir() / "Attendance_Entry" / f"Attendance_{date_str}.csv"
+        _csv_writer().flush()
         
         if attendance_file.exists():
             try:
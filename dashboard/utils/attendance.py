@@ -1,15 +1,20 @@
+import sys
 from datetime import datetime, time
+from pathlib import Path
 from typing import Tuple
 
+# The shared shift schedule lives in the project root next to main.py
+_ROOT_DIR = str(Path(__file__).parent.parent.parent)
+if _ROOT_DIR not in sys.path:
+    sys.path.append(_ROOT_DIR)
+from shift_schedule import get_schedule
+
+# Schedule statuses in this module's vocabulary
+_STATUS_NAMES = {'early': 'early', 'on_time': 'ontime', 'late': 'late', 'checkout': 'late'}
+
 def is_within_shift_hours(current_time: datetime, shift: str) -> bool:
     """Check if current time is within shift hours"""
-    current_hour = current_time.hour
-    
-    if shift == "morning":
-        return 8 <= current_hour < 17
-    elif shift == "night":
-        return 17 <= current_hour < 22
-    return False
+    return get_schedule().in_shift(shift, current_time)
 
 def get_shift_status(checkin_time: datetime, current_time: datetime = None) -> Tuple[str, str]:
     """
@@ -17,31 +22,14 @@ def get_shift_status(checkin_time: datetime, current_time: datetime = None) -> T
     
     Returns:
         Tuple[str, str]: (shift_type, status)
-        shift_type: "morning" or "night"
+        shift_type: a schedule shift name ("morning", "night") or "unknown"
         status: "early", "ontime", "late", or "wrong_shift"
     """
-    if current_time is None:
-        current_time = datetime.now()
-        
-    checkin_hour = checkin_time.hour
-    
-    # Morning shift (8:00 - 17:00)
-    if 5 <= checkin_hour < 17:
-        if checkin_hour < 8:
-            return "morning", "early"
-        elif checkin_hour == 8:
-            return "morning", "ontime"
-        else:
-            return "morning", "late"
-            
-    # Night shift (17:00 - 22:00)
-    elif 17 <= checkin_hour < 22:
-        if checkin_hour == 17:
-            return "morning", "ontime"
-        else:
-            return "night", "late"
-            
-    return "unknown", "wrong_shift"
+    schedule = get_schedule()
+    shift = schedule.shift_at(checkin_time, early=True)
+    if shift is None:
+        return "unknown", "wrong_shift"
+    return shift, _STATUS_NAMES.get(schedule.status(shift, checkin_time), "wrong_shift")
 
 def should_auto_checkout(checkin_time: datetime, current_time: datetime = None) -> bool:
     """
@@ -51,13 +39,7 @@ def should_auto_checkout(checkin_time: datetime, current_time: datetime = None)
         current_time = datetime.now()
         
     shift, _ = get_shift_status(checkin_time)
-    
-    if shift == "morning":
-        shift_end = time(17, 0)  # 17:00
-    elif shift == "night":
-        shift_end = time(22, 0)  # 22:00
-    else:
+    shift_end = get_schedule().shift_end(shift, checkin_time)
+    if shift_end is None:
         return False
-        
-    current_time_only = current_time.time()
-    return current_time_only >= shift_end
\ No newline at end of file
+    return current_time >= shift_end
\ No newline at end of file
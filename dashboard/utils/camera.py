@@ -1,12 +1,22 @@
 import streamlit as st
 import cv2
-import numpy as np
 import face_recognition
 import time
 from pathlib import Path
 import os
+import sys
 from typing import Tuple
 
+# Shared recognition modules (face_gallery, ...) live in the project root next
+# to main.py. Append rather than insert so dashboard-local modules keep priority.
+_ROOT_DIR = str(Path(__file__).parent.parent.parent)
+if _ROOT_DIR not in sys.path:
+    sys.path.append(_ROOT_DIR)
+from face_gallery import Gallery
+from shared_gallery import SharedGallery
+from scale_controller import locate_faces, still_scales, encode_still
+from recognition_profiles import get_profile
+
 def get_camera_feed():
     """
     Creates a Streamlit camera component that can be used in the dashboard.
@@ -17,7 +27,8 @@ def get_camera_feed():
     
     return camera_image
 
-def analyze_face_image(image, known_face_encodings=None, known_face_names=None):
+def analyze_face_image(image, known_face_encodings=None, known_face_names=None, gallery=None,
+                       profile=None):
     """
     Analyzes a face in an image and compares it with known faces.
     
@@ -25,48 +36,54 @@ def analyze_face_image(image, known_face_encodings=None, known_face_names=None):
         image: The image captured from the camera
         known_face_encodings: List of known face encodings
         known_face_names: List of names corresponding to the encodings
+        gallery: Prebuilt Gallery; preferred over the two lists above when given
+        profile: RecognitionProfile to detect, encode and match with (default:
+            the one the shared gallery was published with, else RECOGNITION_PROFILE)
     
     Returns:
-        Dict with detection results including face locations, names, etc.
+        Dict with detection results including face locations (in image
+        coordinates), names, etc.
     """
     if image is None:
         return None
     
-    # Convert the image from BGR to RGB format
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    
-    # Resize for faster face recognition processing
-    small_frame = cv2.resize(image_rgb, (0, 0), fx=0.25, fy=0.25)
+    if profile is None:
+        profile = get_profile(getattr(gallery, 'profile', None))
     
-    # Find all faces in the current frame
-    face_locations = face_recognition.face_locations(small_frame)
+    # Find all faces, at the profile's scale first and at higher resolution
+    # only when a face is too small to be found there
+    small_frame, face_locations, scale = locate_faces(image, still_scales(profile.scale),
+                                                      model=profile.detector,
+                                                      upsample=profile.upsample)
     
     result = {
         "face_detected": len(face_locations) > 0,
         "multiple_faces": len(face_locations) > 1,
-        "face_locations": face_locations,
+        "face_locations": [tuple(int(c / scale) for c in loc) for loc in face_locations],
         "recognized_name": None,
         "match_confidence": None,
         "face_encoding": None
     }
     
+    if gallery is None and known_face_encodings is not None and known_face_names is not None:
+        gallery = Gallery(known_face_encodings, known_face_names)
+    
     # If faces are found and we have reference encodings, try to identify them
-    if face_locations and known_face_encodings is not None and known_face_names is not None:
-        face_encodings = face_recognition.face_encodings(small_frame, face_locations)
+    if face_locations and gallery is not None:
+        face_encodings = face_recognition.face_encodings(small_frame, face_locations,
+                                                         num_jitters=profile.num_jitters,
+                                                         model=profile.landmarks)
         
         if face_encodings:
             result["face_encoding"] = face_encodings[0]
             
             # Compare the detected face with our known faces
-            face_distances = face_recognition.face_distance(known_face_encodings, face_encodings[0])
-            if len(face_distances) > 0:
-                best_match_index = np.argmin(face_distances)
-                match_confidence = 1 - face_distances[best_match_index]
-                
-                # If the face is a close match
-                if match_confidence > 0.6:  # Threshold for recognition
-                    result["recognized_name"] = known_face_names[best_match_index]
-                    result["match_confidence"] = match_confidence
+            if len(gallery) > 0:
+                # Match within the recognition profile's distance threshold
+                name, distance = gallery.best_match(face_encodings[0], threshold=profile.threshold)
+                if name is not None:
+                    result["recognized_name"] = name
+                    result["match_confidence"] = 1 - distance
     
     return result
 
@@ -127,6 +144,11 @@ def load_face_encodings():
     Returns:
         Tuple: (encodings, names)
     """
+    # Prefer the memory-mapped gallery published by the recognizer
+    shared = SharedGallery.open()
+    if shared is not None and len(shared) > 0:
+        return list(shared.matrix), list(shared.names)
+
     root_dir = Path(__file__).parent.parent.parent
     attendance_dir = root_dir / "Attendance_data"
     
@@ -148,12 +170,11 @@ def load_face_encodings():
             try:
                 # Load the image
                 img = cv2.imread(str(center_img_path))
-                rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
                 
                 # Get encodings
-                face_encodings = face_recognition.face_encodings(rgb_img)
-                if face_encodings:
-                    encodings.append(face_encodings[0])
+                encoding = encode_still(img, get_profile())
+                if encoding is not None:
+                    encodings.append(encoding)
                     names.append(person)
             except Exception as e:
                 st.warning(f"Could not load encoding for {person}: {str(e)}")
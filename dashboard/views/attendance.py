@@ -1,6 +1,5 @@
 import streamlit as st
 from pathlib import Path
-import subprocess
 import time
 import sys
 import os
@@ -18,6 +17,21 @@ def get_current_root_dir():
     """Get the root directory where main.py is located"""
     return Path(__file__).parent.parent.parent
 
+def _daemon_client():
+    """Client for the recognition daemon (recognition_daemon.py next to main.py)"""
+    root = str(get_current_root_dir())
+    if root not in sys.path:
+        sys.path.append(root)
+    from recognition_daemon import DaemonClient
+    return DaemonClient()
+
+def _attendance_running():
+    """True when the daemon is up and its camera loop is running"""
+    try:
+        return bool(_daemon_client().status().get('camera_running'))
+    except Exception:
+        return False
+
 def safe_read_attendance_csv(csv_path, verbose=False):
     """
     Safely read attendance CSV with aggressive error recovery.
@@ -183,30 +197,29 @@ def show_attendance():
     st.header("✅ Face Recognition Attendance")
     
     def _start_external_attendance():
-        root = get_current_root_dir()
-        if 'attendance_proc' in st.session_state and st.session_state['attendance_proc'] is not None:
+        if _attendance_running():
             return False, "Attendance window is already running"
         try:
-            proc = subprocess.Popen([sys.executable, str(root / "main.py")], cwd=str(root))
-            st.session_state['attendance_proc'] = proc
-            return True, "Started external attendance window (OpenCV)"
+            # The daemon keeps the models and gallery loaded between clicks;
+            # it is only started once, on the first click after boot
+            client = _daemon_client()
+            if not client.ensure_running():
+                return False, "Recognition daemon did not start"
+            result = client.start_camera(window=True)
+            if not result.get('ok'):
+                return False, result.get('message', "Failed to start camera")
+            return True, "Started attendance window (OpenCV)"
         except Exception as e:
-            return False, f"Failed to start main.py: {e}"
+            return False, f"Failed to start recognition daemon: {e}"
 
     def _stop_external_attendance():
-        proc = st.session_state.get('attendance_proc')
-        if proc is None:
-            return False, "No attendance window process to stop"
         try:
-            proc.terminate()
-            try:
-                proc.wait(timeout=3)
-            except Exception:
-                proc.kill()
-            st.session_state['attendance_proc'] = None
-            return True, "Stopped external attendance window"
+            result = _daemon_client().stop_camera()
         except Exception as e:
             return False, f"Failed to stop attendance window: {e}"
+        if not result.get('ok'):
+            return False, "No attendance window to stop"
+        return True, "Stopped attendance window"
     
     if not check_registration():
         st.warning("⚠️ Belum ada user yang terdaftar. Silakan registrasi user terlebih dahulu di menu Register New User.")
@@ -218,8 +231,7 @@ def show_attendance():
     tab1, tab2 = st.tabs(["Absensi", "Riwayat Absensi"])
     
     with tab1:
-        proc = st.session_state.get('attendance_proc')
-        running = proc is not None and (proc.poll() is None)
+        running = _attendance_running()
         status_text = "Running" if running else "Stopped"
         st.metric("External Attendance Status", status_text)
 
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+POSES = ['center.png', 'left.png', 'right.png']
+
+
+def _file_sha1(file_path):
+    """Return the SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_gallery_images(path='Attendance_data'):
+    """
+    List (person, image_path) pairs for every pose image in the gallery folder,
+    in the same order _load_known_faces walks them.
+    """
+    items = []
+    if not os.path.isdir(path):
+        return items
+    for person_folder in sorted(os.listdir(path)):
+        person_path = os.path.join(path, person_folder)
+        if person_folder.startswith('.') or not os.path.isdir(person_path):
+            continue
+        for pose in POSES:
+            pose_path = os.path.join(person_path, pose)
+            if os.path.exists(pose_path):
+                items.append((person_folder, pose_path))
+    return items
+
+
+class EncodingStore:
+    """
+    Persistent on-disk cache of face encodings for the Attendance_data gallery.
+
+    The store is one file in store_dir, encodings.npz, holding:
+    - encodings: an (N, 128) float64 matrix of encodings
+    - manifest: JSON with one entry per image path with its mtime, size,
+      SHA-1, owner name and row in the matrix (None when no face was found)
+    Keeping both in one file means a single os.replace swaps them together.
+
+    The whole cache is invalidated when the model name, scale factor or
+    store version changes. Individual entries are only recomputed when
+    the image content actually changed, so startup cost is proportional
+    to the number of new or modified images.
+    """
+
+    # 2: images without a face at the store scale are retried at higher resolution
+    # 3: manifest stored inside encodings.npz
+    VERSION = 3
+
+    def __init__(self, store_dir='encoding_cache', model='hog', scale=0.25):
+        self.store_dir = store_dir
+        self.model = model
+        self.scale = scale
+        self.encodings_path = os.path.join(store_dir, 'encodings.npz')
+        self.entries = {}
+        # Entries changed since the last load/save (e.g. a refreshed mtime)
+        self.dirty = False
+        self.stats = {'reused': 0, 'encoded': 0, 'removed': 0}
+
+    def _compatible(self, manifest):
+        return (manifest.get('version') == self.VERSION and
+                manifest.get('model') == self.model and
+                float(manifest.get('scale', -1)) == float(self.scale))
+
+    def load(self):
+        """Load the manifest and encodings from disk. Returns number of cached entries."""
+        self.entries = {}
+        self.dirty = False
+        if not os.path.exists(self.encodings_path):
+            return 0
+        try:
+            with np.load(self.encodings_path) as data:
+                if 'manifest' not in data.files:
+                    print("Encoding store has an older layout, rebuilding")
+                    return 0
+                manifest = json.loads(str(data['manifest']))
+                if not self._compatible(manifest):
+                    print("Encoding store was built with different settings, rebuilding")
+                    return 0
+                matrix = data['encodings']
+            for image_path, meta in manifest.get('entries', {}).items():
+                row = meta.get('row')
+                encoding = matrix[row].copy() if row is not None else None
+                self.entries[image_path] = dict(meta, encoding=encoding)
+        except Exception as e:
+            print(f"Warning: Could not read encoding store ({e}), rebuilding")
+            self.entries = {}
+        return len(self.entries)
+
+    def save(self):
+        """Atomically write the manifest and encodings to disk."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        rows = []
+        manifest_entries = {}
+        for image_path, meta in self.entries.items():
+            record = {k: v for k, v in meta.items() if k != 'encoding'}
+            if meta.get('encoding') is not None:
+                record['row'] = len(rows)
+                rows.append(meta['encoding'])
+            else:
+                record['row'] = None
+            manifest_entries[image_path] = record
+        matrix = np.array(rows, dtype=np.float64).reshape(-1, 128)
+
+        manifest = json.dumps({
+            'version': self.VERSION,
+            'model': self.model,
+            'scale': self.scale,
+            'entries': manifest_entries,
+        })
+        # Matrix and manifest go into one file under a temporary name, then a
+        # single swap: a crash leaves either the old pair or the new one
+        tmp_encodings = self.encodings_path + '.tmp.npz'
+        np.savez(tmp_encodings, encodings=matrix, manifest=np.array(manifest))
+        os.replace(tmp_encodings, self.encodings_path)
+        self.dirty = False
+
+    def is_fresh(self, image_path):
+        """Check whether the cached entry for image_path still matches the file on disk."""
+        meta = self.entries.get(image_path)
+        if meta is None:
+            return False
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return False
+        if meta.get('mtime') == st.st_mtime_ns and meta.get('size') == st.st_size:
+            return True
+        # mtime/size changed (copy, touch, restore) - only the content hash decides
+        if meta.get('size') == st.st_size and meta.get('sha1') == _file_sha1(image_path):
+            meta['mtime'] = st.st_mtime_ns
+            # Save the new mtime, or every start would hash the file again
+            self.dirty = True
+            return True
+        return False
+
+    def put(self, name, image_path, encoding):
+        """Record the encoding (or None when no face was found) for an image."""
+        st = os.stat(image_path)
+        self.entries[image_path] = {
+            'name': name,
+            'mtime': st.st_mtime_ns,
+            'size': st.st_size,
+            'sha1': _file_sha1(image_path),
+            'encoding': None if encoding is None else np.asarray(encoding, dtype=np.float64),
+        }
+
+    def pending(self, items):
+        """The (name, image_path) pairs whose cached entry is missing or out of date."""
+        return [(name, image_path) for name, image_path in items
+                if not (self.is_fresh(image_path) and self.entries[image_path].get('name') == name)]
+
+    def prune(self, image_paths):
+        """Drop entries whose image is not in image_paths. Returns number removed."""
+        keep = set(image_paths)
+        removed = [p for p in self.entries if p not in keep]
+        for image_path in removed:
+            del self.entries[image_path]
+        return len(removed)
+
+    def sync(self, items, encode_fn):
+        """
+        Bring the store in line with the given (name, image_path) pairs.
+
+        args:
+        items: list of (name, image_path) tuples, e.g. from list_gallery_images
+        encode_fn: callable(image_path) -> 128-d encoding or None
+        returns: (encodeList, classNames) for images with a detected face
+        """
+        self.load()
+        self.stats = {'reused': 0, 'encoded': 0, 'removed': 0}
+        changed = False
+
+        todo = self.pending(items)
+        self.stats['reused'] = len(items) - len(todo)
+        for name, image_path in todo:
+            encoding = encode_fn(image_path)
+            if encoding is None:
+                print(f"Warning: No face detected in image for {name} ({image_path})")
+            self.put(name, image_path, encoding)
+            self.stats['encoded'] += 1
+            changed = True
+
+        self.stats['removed'] = self.prune(image_path for _, image_path in items)
+        changed = changed or self.stats['removed'] > 0
+
+        if changed or self.dirty or not os.path.exists(self.encodings_path):
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Warning: Could not save encoding store: {e}")
+
+        encodeList = []
+        classNames = []
+        for name, image_path in items:
+            encoding = self.entries[image_path].get('encoding')
+            if encoding is not None:
+                encodeList.append(encoding)
+                classNames.append(name)
+        return encodeList, classNames
@@ -0,0 +1,124 @@
+"""
+Append-only local journal of attendance events.
+
+Every event is written here before anything tries to send it, so an API
+outage or a restart loses nothing. The journal is a SQLite table in WAL
+mode: appends are one small transaction without waiting for an fsync, and
+readers (the replayer, another process on the same kiosk) never block the
+writer. Each event gets a unique event_id that the server uses to ignore
+replays of events it has already stored.
+
+Consumers keep a persisted checkpoint (the last seq they have delivered),
+so the replayer resumes where it stopped after a crash or a reboot.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOURNAL_PATH = os.environ.get(
+    'ATTENDANCE_JOURNAL',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'attendance_journal.db'))
+# Delivered events older than this are pruned
+RETENTION_DAYS = float(os.environ.get('ATTENDANCE_JOURNAL_RETENTION_DAYS', '30'))
+
+
+class EventJournal:
+    """
+    Durable FIFO of events with per-consumer checkpoints.
+
+    args:
+    path: SQLite file (created on first use)
+    """
+
+    def __init__(self, path=None):
+        self.path = path or JOURNAL_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL survives process crashes; only a power cut can lose
+        # the last few commits
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT UNIQUE NOT NULL,
+                path TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                consumer TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                updated REAL NOT NULL
+            )
+        ''')
+
+    def append(self, path, payload):
+        """
+        Store one event for delivery to the API endpoint path.
+
+        returns: the event's event_id
+        """
+        event_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO events (event_id, path, payload, created) VALUES (?, ?, ?, ?)',
+                (event_id, path, json.dumps(payload), time.time()))
+        return event_id
+
+    def read(self, after, limit=200):
+        """Events with seq > after, oldest first, as dicts."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT seq, event_id, path, payload, created FROM events '
+                'WHERE seq > ? ORDER BY seq LIMIT ?', (after, limit)).fetchall()
+        return [{'seq': seq, 'event_id': event_id, 'path': path,
+                 'payload': json.loads(payload), 'created': created}
+                for seq, event_id, path, payload, created in rows]
+
+    def checkpoint(self, consumer):
+        """Last seq delivered by consumer (0 before its first delivery)."""
+        with self._lock:
+            row = self._conn.execute('SELECT seq FROM checkpoints WHERE consumer = ?',
+                                     (consumer,)).fetchone()
+        return row[0] if row else 0
+
+    def commit(self, consumer, seq):
+        """Persist that consumer has delivered every event up to seq."""
+        with self._lock:
+            now = time.time()
+            # MAX keeps a slower replayer in another process from moving it backwards
+            self._conn.execute('INSERT INTO checkpoints (consumer, seq, updated) VALUES (?, ?, ?) '
+                               'ON CONFLICT(consumer) DO UPDATE SET '
+                               'seq = MAX(seq, excluded.seq), updated = excluded.updated',
+                               (consumer, seq, now))
+
+    def lag(self, consumer):
+        """
+        How far consumer is behind.
+
+        returns: {'events': undelivered count, 'seconds': age of the oldest undelivered event}
+        """
+        after = self.checkpoint(consumer)
+        with self._lock:
+            count, oldest = self._conn.execute(
+                'SELECT COUNT(*), MIN(created) FROM events WHERE seq > ?', (after,)).fetchone()
+        return {'events': count, 'seconds': (time.time() - oldest) if oldest else 0.0}
+
+    def prune(self, consumer, retention_days=RETENTION_DAYS):
+        """Delete events consumer has delivered that are older than retention_days."""
+        cutoff = time.time() - retention_days * 86400.0
+        after = self.checkpoint(consumer)
+        with self._lock:
+            return self._conn.execute('DELETE FROM events WHERE seq <= ? AND created < ?',
+                                      (after, cutoff)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
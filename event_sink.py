@@ -0,0 +1,241 @@
+"""
+Background delivery of attendance events to the API.
+
+mark_attendance runs inside the camera loop, so it must not wait on the
+network. EventSink.submit writes the event to the local EventJournal and
+returns; a sender thread replays the journal to the API in bulk batches
+over one pooled keep-alive session with connect/read timeouts, backing off
+exponentially while the API is unreachable. The journal checkpoint only
+moves once the server has acknowledged a batch, so events survive API
+outages and restarts, and the server's event_id check makes resending a
+batch after a crash harmless.
+
+Usage:
+    python event_sink.py --status     # journal lag as JSON
+    python event_sink.py --drain      # send everything pending, then exit
+"""
+import argparse
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from event_journal import EventJournal
+
+API_URL = os.environ.get('ATTENDANCE_API_URL', 'http://localhost:8000').rstrip('/')
+# Endpoint that accepts a batch of journal events (api/main.py)
+BULK_PATH = '/attendance/events'
+DEVICE_ID = os.environ.get('DEVICE_ID', socket.gethostname())
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (float(os.environ.get('ATTENDANCE_API_CONNECT_TIMEOUT', '1.0')),
+                   float(os.environ.get('ATTENDANCE_API_TIMEOUT', '3.0')))
+
+
+class EventSink:
+    """
+    Non-blocking, journal-backed sender of JSON events to the API.
+
+    args:
+    journal: EventJournal every event goes to first
+    base_url: API root; events name their own endpoint path
+    consumer: checkpoint name in the journal
+    batch_size: events per bulk request
+    timeout: requests timeout, seconds or (connect, read)
+    backoff: first retry delay in seconds, doubled per failure up to max_backoff
+    poll_interval: seconds between journal checks when idle (picks up events
+                   journaled by other processes)
+    """
+
+    def __init__(self, journal, base_url=API_URL, consumer='api', batch_size=200,
+                 timeout=DEFAULT_TIMEOUT, backoff=0.5, max_backoff=30.0, poll_interval=5.0):
+        self.journal = journal
+        self.base_url = base_url
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Servers without the bulk endpoint get one request per event instead
+        self.bulk = True
+        self.stats = {'sent': 0, 'rejected': 0, 'batches': 0, 'failures': 0,
+                      'last_error': None, 'last_sent': None}
+        self._recent = deque()  # (time, events) of recent deliveries
+        self._wake = threading.Event()
+        self._closing = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='event-sink', daemon=True)
+                    self._thread.start()
+
+    def submit(self, path, payload):
+        """
+        Journal payload for delivery to API endpoint path and return immediately.
+
+        returns: the event_id
+        """
+        self.start()
+        event_id = self.journal.append(path, payload)
+        self._wake.set()
+        return event_id
+
+    def lag(self):
+        """{'events', 'seconds'} still waiting to be delivered."""
+        return self.journal.lag(self.consumer)
+
+    def throughput(self, window=60.0):
+        """Events delivered per second over the last window seconds."""
+        cutoff = time.time() - window
+        return sum(n for t, n in list(self._recent) if t >= cutoff) / window
+
+    def _run(self):
+        try:
+            pruned = self.journal.prune(self.consumer)
+            if pruned:
+                print(f"Pruned {pruned} delivered events from the attendance journal")
+        except Exception as e:
+            print(f"Warning: Could not prune the attendance journal: {e}")
+        self.drain(stop=self._closing, idle=True)
+        self.session.close()
+
+    def drain(self, stop=None, idle=False):
+        """
+        Deliver journaled events until none are left (or, with idle, until
+        stop is set, waiting for new ones in between).
+
+        returns: True when everything journaled so far was delivered
+        """
+        stop = stop or threading.Event()
+        delay = self.backoff
+        while True:
+            events = self.journal.read(self.journal.checkpoint(self.consumer), self.batch_size)
+            if not events:
+                if not idle or stop.is_set():
+                    return True
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            delivered = self._deliver(events)
+            if delivered:
+                self.journal.commit(self.consumer, events[delivered - 1]['seq'])
+                now = time.time()
+                self.stats['sent'] += delivered
+                self.stats['last_sent'] = now
+                self._recent.append((now, delivered))
+                while self._recent and self._recent[0][0] < now - 300.0:
+                    self._recent.popleft()
+            if delivered < len(events):
+                self.stats['failures'] += 1
+                if stop.is_set():
+                    return False
+                stop.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+            else:
+                delay = self.backoff
+
+    def _deliver(self, events):
+        """Send events in order; returns how many leading events are done with."""
+        self.stats['batches'] += 1
+        if self.bulk:
+            body = {'device_id': DEVICE_ID,
+                    'events': [{key: event[key] for key in ('event_id', 'path', 'payload', 'created')}
+                               for event in events]}
+            try:
+                response = self.session.post(self.base_url + BULK_PATH, json=body, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.stats['last_error'] = str(e)
+                return 0
+            if response.status_code < 300:
+                return len(events)
+            if response.status_code >= 500 or response.status_code == 429:
+                self.stats['last_error'] = f"HTTP {response.status_code}"
+                return 0
+            if response.status_code in (404, 405):
+                print(f"{self.base_url}{BULK_PATH} not available, sending events one by one")
+                self.bulk = False
+            # Otherwise the batch was refused as a whole: send it one by one so
+            # only the offending events are rejected
+
+        for i, event in enumerate(events):
+            payload = dict(event['payload'], event_id=event['event_id'])
+            try:
+                response = self.session.post(self.base_url + event['path'], json=payload,
+                                             timeout=self.timeout)
+            except requests.RequestException as e:
+                self.stats['last_error'] = str(e)
+                return i
+            if response.status_code >= 500 or response.status_code == 429:
+                self.stats['last_error'] = f"HTTP {response.status_code}"
+                return i
+            if response.status_code >= 300:
+                # The server refused this event; resending it will not help
+                self.stats['rejected'] += 1
+        return len(events)
+
+    def close(self, timeout=2.0):
+        """Send what the API takes within timeout and stop; the rest stays journaled."""
+        self._closing.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    """The process-wide EventSink over the default journal, created on first use."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = EventSink(EventJournal())
+        return _sink
+
+
+@atexit.register
+def _close_sink():
+    if _sink is not None:
+        _sink.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attendance event journal status and replay")
+    parser.add_argument("--status", action="store_true", help="Print the journal lag as JSON")
+    parser.add_argument("--drain", action="store_true", help="Send all pending events, then exit")
+    args = parser.parse_args()
+
+    sink = EventSink(EventJournal())
+    if args.drain:
+        start = time.time()
+        # A set stop event: give up at the first failed batch instead of backing off
+        stop = threading.Event()
+        stop.set()
+        done = sink.drain(stop=stop)
+        elapsed = time.time() - start
+        print(f"Sent {sink.stats['sent']} events in {elapsed:.1f}s "
+              f"({sink.stats['sent'] / max(elapsed, 1e-6):.0f} events/s)")
+        if not done:
+            print(f"Stopped early: {sink.stats['last_error']}")
+    status = dict(sink.lag(), journal=sink.journal.path, checkpoint=sink.journal.checkpoint(sink.consumer))
+    if args.status or not args.drain:
+        print(json.dumps(status, indent=2))
+
+
+if __name__ == "__main__":
+    main()
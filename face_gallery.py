@@ -0,0 +1,139 @@
+import numpy as np
+
+
+class Gallery:
+    """
+    Vectorized gallery of known face encodings.
+
+    Keeps a contiguous float32 (N, 128) matrix with precomputed squared norms
+    and an identity id per row, so M probes are scored against all N entries
+    with a single matrix product instead of rebuilding an array from a Python
+    list on every frame. Rows are grouped by identity so the center/left/right
+    poses of one person collapse to a single min-distance with reduceat.
+    """
+
+    def __init__(self, encodings=None, names=None):
+        encodings = [] if encodings is None else encodings
+        names = [] if names is None else list(names)
+        if len(encodings) != len(names):
+            raise ValueError("encodings and names must have the same length")
+
+        # Identity names in first-seen order, and one id per row
+        self.identities = list(dict.fromkeys(names))
+        index = {name: i for i, name in enumerate(self.identities)}
+        ids = np.array([index[name] for name in names], dtype=np.int64)
+
+        # Group rows by identity (stable, so pose order is kept)
+        order = np.argsort(ids, kind='stable')
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+        self._set_rows(np.ascontiguousarray(matrix[order]), ids[order])
+
+    def _set_rows(self, matrix, ids, sq_norms=None):
+        self.matrix = matrix
+        self.ids = ids
+        self.names = [self.identities[i] for i in ids]
+        self.sq_norms = np.einsum('ij,ij->i', matrix, matrix) if sq_norms is None else sq_norms
+
+        # Start offset of each identity's block of rows
+        if len(self.ids):
+            self._starts = np.flatnonzero(np.r_[True, self.ids[1:] != self.ids[:-1]])
+        else:
+            self._starts = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_grouped(cls, matrix, ids, identities, sq_norms=None):
+        """
+        Wrap rows that are already grouped by identity without copying them,
+        e.g. read-only memory maps published by shared_gallery.
+
+        args:
+        matrix: (N, 128) float32 array, rows of one identity adjacent
+        ids: (N,) index into identities for every row, non-decreasing
+        identities: identity names
+        sq_norms: precomputed squared row norms (computed when None)
+        """
+        if len(matrix) != len(ids):
+            raise ValueError("matrix and ids must have the same length")
+        if len(ids) > 1 and np.any(np.diff(ids) < 0):
+            raise ValueError("rows must be grouped by identity")
+        gallery = cls.__new__(cls)
+        gallery.identities = list(identities)
+        gallery._set_rows(matrix, np.asarray(ids), sq_norms)
+        return gallery
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def num_identities(self):
+        return len(self.identities)
+
+    def distances(self, probes):
+        """
+        Euclidean distances between probes and every gallery row.
+
+        args:
+        probes: a single 128-d encoding or an (M, 128) array
+        returns: (M, N) float32 array
+        """
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, 128)
+        if len(self) == 0:
+            return np.zeros((len(probes), 0), dtype=np.float32)
+        probe_sq = np.einsum('ij,ij->i', probes, probes)
+        sq = probe_sq[:, None] + self.sq_norms[None, :] - 2.0 * (probes @ self.matrix.T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def identity_distances(self, probes):
+        """Per-identity min distance across poses, shape (M, num_identities)."""
+        dists = self.distances(probes)
+        if dists.shape[1] == 0:
+            return np.zeros((dists.shape[0], 0), dtype=np.float32)
+        return np.minimum.reduceat(dists, self._starts, axis=1)
+
+    def match(self, probes, k=1):
+        """
+        Score M probes against the gallery in one matrix product.
+
+        args:
+        probes: a single 128-d encoding or an (M, 128) array
+        k: number of best identities to return per probe
+        returns: list (one per probe) of [(name, distance), ...] sorted by distance
+        """
+        ident = self.identity_distances(probes)
+        results = []
+        if ident.shape[1] == 0:
+            return [[] for _ in range(ident.shape[0])]
+        k = min(k, ident.shape[1])
+        if k < ident.shape[1]:
+            top = np.argpartition(ident, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(ident.shape[1]), (ident.shape[0], 1))
+        for row, cand in zip(ident, top):
+            cand = cand[np.argsort(row[cand], kind='stable')]
+            results.append([(self.identities[i], float(row[i])) for i in cand])
+        return results
+
+    def best_match(self, probe, threshold=0.4):
+        """
+        Return (name, distance) of the closest identity, with name None when
+        the gallery is empty or the distance is not below threshold.
+        """
+        matches = self.match(probe, k=1)[0]
+        if not matches:
+            return None, float('inf')
+        name, distance = matches[0]
+        if distance < threshold:
+            return name, distance
+        return None, distance
+
+    def identify(self, probes, threshold=0.4):
+        """Batch version of best_match: list of (name or None, distance) per probe."""
+        output = []
+        for matches in self.match(probes, k=1):
+            if not matches:
+                output.append((None, float('inf')))
+                continue
+            name, distance = matches[0]
+            output.append((name if distance < threshold else None, distance))
+        return output
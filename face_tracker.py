@@ -0,0 +1,209 @@
+import itertools
+import threading
+import time
+
+from identity_voting import EvidenceAccumulator
+
+
+def box_iou(a, b):
+    """IoU of two (top, right, bottom, left) boxes."""
+    top = max(a[0], b[0])
+    right = min(a[1], b[1])
+    bottom = min(a[2], b[2])
+    left = max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+def _centroid_distance(a, b):
+    """Distance between box centers relative to the mean box width."""
+    ax, ay = (a[1] + a[3]) / 2.0, (a[0] + a[2]) / 2.0
+    bx, by = (b[1] + b[3]) / 2.0, (b[0] + b[2]) / 2.0
+    width = max(1.0, ((a[1] - a[3]) + (b[1] - b[3])) / 2.0)
+    return (((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5) / width
+
+
+class Track:
+    """One face followed across frames, with its cached identity."""
+
+    def __init__(self, track_id, box, now):
+        self.track_id = track_id
+        self.box = box
+        self.name = None
+        self.distance = None
+        self.status = None
+        self.created = now
+        self.last_seen = now
+        self.last_encoded = None
+        self.hits = 1
+        self.missed = 0
+        # Multi-frame voting: evidence so far and whether it reached a decision
+        self.evidence = None
+        self.decided = False
+
+
+class FaceTracker:
+    """
+    Lightweight IoU/centroid tracker so faces are encoded once per track
+    instead of once per frame.
+
+    A track is (re-)encoded only when:
+    - it was just born and has no identity yet
+    - its last encode is older than reverify_interval seconds
+    - its last match distance is above low_confidence
+    - it is still unknown and unknown_retry seconds have passed
+    and never while skip_fn(name) says the person is still within the
+    attendance cooldown.
+
+    With voting (a dict of EvidenceAccumulator settings), a track instead
+    keeps being encoded until its accumulated evidence reaches a decision
+    (see observe); a known decision is final for the life of the track and
+    an unknown one is retried after unknown_retry seconds.
+
+    One tracker may be shared by several pipeline workers: tracks and stats
+    only change under its lock.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_centroid_shift=0.5, max_missed=5,
+                 reverify_interval=3.0, low_confidence=0.35, unknown_retry=1.0,
+                 voting=None):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_shift = max_centroid_shift
+        self.max_missed = max_missed
+        self.reverify_interval = reverify_interval
+        self.low_confidence = low_confidence
+        self.unknown_retry = unknown_retry
+        self.voting = voting
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {'frames': 0, 'tracks_created': 0, 'encodes': 0,
+                      'cached': 0, 'cooldown_skips': 0}
+        if voting is not None:
+            self.stats.update({'decisions': 0, 'decided_known': 0, 'decided_unknown': 0,
+                               'frames_to_decision': 0, 'frames_to_decision_hist': {}})
+
+    def update(self, boxes, now=None):
+        """
+        Associate detected boxes with existing tracks (greedy, best IoU first,
+        centroid distance as a fallback for fast motion). Unmatched boxes start
+        new tracks; tracks unseen for max_missed frames are dropped.
+
+        returns: list of Track, one per input box, in the same order
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.stats['frames'] += 1
+            pairs = []
+            for ti, track in enumerate(self.tracks):
+                for bi, box in enumerate(boxes):
+                    iou = box_iou(track.box, box)
+                    if iou >= self.iou_threshold:
+                        pairs.append((1.0 + iou, ti, bi))
+                    else:
+                        shift = _centroid_distance(track.box, box)
+                        if shift <= self.max_centroid_shift:
+                            pairs.append((1.0 - shift, ti, bi))
+            pairs.sort(reverse=True)
+
+            assigned = [None] * len(boxes)
+            used_tracks = set()
+            for _, ti, bi in pairs:
+                if ti in used_tracks or assigned[bi] is not None:
+                    continue
+                track = self.tracks[ti]
+                track.box = boxes[bi]
+                track.last_seen = now
+                track.hits += 1
+                track.missed = 0
+                assigned[bi] = track
+                used_tracks.add(ti)
+
+            for ti, track in enumerate(self.tracks):
+                if ti not in used_tracks:
+                    track.missed += 1
+            self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+            for bi, box in enumerate(boxes):
+                if assigned[bi] is None:
+                    track = Track(next(self._ids), box, now)
+                    self.tracks.append(track)
+                    self.stats['tracks_created'] += 1
+                    assigned[bi] = track
+            return assigned
+
+    def needs_encoding(self, track, now=None, skip_fn=None):
+        """Decide whether a track has to be run through the encoder this frame."""
+        now = time.time() if now is None else now
+        # skip_fn may hit the tracker state store: call it outside the lock
+        name = track.name
+        skip = name is not None and skip_fn is not None and skip_fn(name)
+        with self._lock:
+            if skip:
+                self.stats['cooldown_skips'] += 1
+                return False
+            if track.last_encoded is None:
+                return True
+            age = now - track.last_encoded
+            if self.voting is not None:
+                if not track.decided:
+                    return True
+                if track.name is None and age >= self.unknown_retry:
+                    # Unknown decisions are not final: collect fresh evidence
+                    track.decided = False
+                    track.evidence.reset()
+                    return True
+                self.stats['cached'] += 1
+                return False
+            if age >= self.reverify_interval:
+                return True
+            if track.name is None:
+                if age >= self.unknown_retry:
+                    return True
+            elif track.distance is None or track.distance > self.low_confidence:
+                return True
+            self.stats['cached'] += 1
+            return False
+
+    def assign(self, track, name, distance, now=None):
+        """Store the result of an encode + match for a track."""
+        with self._lock:
+            track.name = name
+            track.distance = distance
+            track.last_encoded = time.time() if now is None else now
+            self.stats['encodes'] += 1
+
+    def observe(self, track, candidates, now=None):
+        """
+        Voting mode: add one encode's top-k (name, distance) candidates to the
+        track's evidence. track.name / track.distance are only set once a
+        decision is reached.
+
+        returns: True when this observation produced the decision
+        """
+        with self._lock:
+            track.last_encoded = time.time() if now is None else now
+            self.stats['encodes'] += 1
+            if track.evidence is None:
+                track.evidence = EvidenceAccumulator(**self.voting)
+            if track.decided:
+                # Another worker's observation already decided this track
+                return False
+            track.evidence.add(candidates)
+            decided, name, distance = track.evidence.decision()
+            if not decided:
+                return False
+            track.decided = True
+            track.name = name
+            track.distance = distance
+            frames = track.evidence.frames
+            self.stats['decisions'] += 1
+            self.stats['decided_known' if name is not None else 'decided_unknown'] += 1
+            self.stats['frames_to_decision'] += frames
+            hist = self.stats['frames_to_decision_hist']
+            hist[frames] = hist.get(frames, 0) + 1
+        return True
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+
+from encoding_store import list_gallery_images
+from ann_index import IVFIndex
+
+
+def _snapshot(items):
+    """{person: ((image_path, mtime_ns, size), ...)} for the given gallery items."""
+    snapshot = {}
+    for name, image_path in items:
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            continue
+        snapshot.setdefault(name, []).append((image_path, st.st_mtime_ns, st.st_size))
+    return {name: tuple(entries) for name, entries in snapshot.items()}
+
+
+class LiveGallery:
+    """
+    Gallery that follows Attendance_data while recognition keeps running.
+
+    Polls the folder's image mtimes and sizes; when a person's images were
+    added, removed or replaced, only that person is re-encoded (through the
+    EncodingStore, so unchanged poses are reused) and a new matcher is built
+    next to the current one and swapped in. Recognition threads read
+    self.matcher without locking and always see a complete gallery, old or new.
+
+    Exposes the same match / best_match / identify API as Gallery and IVFIndex.
+
+    args:
+    path: gallery folder (Attendance_data)
+    store: EncodingStore holding the cached encodings
+    encode_fn: callable(image_path) -> 128-d encoding or None
+    build_fn: callable(encodings, names) -> Gallery or IVFIndex
+    publish_fn: callable(encodings, names), called after incremental IVF
+        updates that bypass build_fn (e.g. to refresh the shared gallery)
+    """
+
+    def __init__(self, path, store, encode_fn, build_fn, publish_fn=None):
+        self.path = path
+        self.store = store
+        self.encode_fn = encode_fn
+        self.build_fn = build_fn
+        self.publish_fn = publish_fn
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = {'polls': 0, 'updates': 0, 'added': 0, 'removed': 0, 'replaced': 0,
+                      'encoded': 0, 'last_update_ms': 0.0}
+
+        items = list_gallery_images(path)
+        print("Found persons:", sorted({name for name, _ in items}))
+        encodings, names = store.sync(items, encode_fn)
+        print(f"Encoding store: {store.stats['reused']} reused, "
+              f"{store.stats['encoded']} encoded, {store.stats['removed']} removed")
+        self._snapshot = _snapshot(items)
+        self._people = {}
+        for name, encoding in zip(names, encodings):
+            self._people.setdefault(name, []).append(encoding)
+        self.matcher = build_fn(encodings, names)
+
+    # -- matcher API ----------------------------------------------------
+
+    def __len__(self):
+        return len(self.matcher)
+
+    @property
+    def num_identities(self):
+        return self.matcher.num_identities
+
+    def match(self, probes, k=1):
+        return self.matcher.match(probes, k)
+
+    def best_match(self, probe, threshold=0.4):
+        return self.matcher.best_match(probe, threshold)
+
+    def identify(self, probes, threshold=0.4):
+        return self.matcher.identify(probes, threshold)
+
+    # -- updates --------------------------------------------------------
+
+    def _encode_person(self, name, person_items):
+        """Bring one person's store entries up to date. Returns their encodings."""
+        for _, image_path in self.store.pending(person_items):
+            encoding = self.encode_fn(image_path)
+            if encoding is None:
+                print(f"Warning: No face detected in image for {name} ({image_path})")
+            self.store.put(name, image_path, encoding)
+            self.stats['encoded'] += 1
+        current = {image_path for _, image_path in person_items}
+        for image_path in [p for p, meta in self.store.entries.items()
+                           if meta.get('name') == name and p not in current]:
+            del self.store.entries[image_path]
+        return [self.store.entries[p]['encoding'] for _, p in person_items
+                if self.store.entries[p].get('encoding') is not None]
+
+    def _rebuild(self, people, changed):
+        """New matcher for people with the changed ones swapped out; the current one is left untouched."""
+        current = self.matcher
+        names = [name for name, encodings in people.items() for _ in encodings]
+        encodings = [e for person_encodings in people.values() for e in person_encodings]
+        if isinstance(current, IVFIndex):
+            # Keep the trained centroids: copy, then update just these identities
+            # (a re-added person gets their freed identity slot back)
+            matcher = current.copy()
+            for name in changed:
+                matcher.remove(name)
+                if people.get(name):
+                    matcher.add(people[name], [name] * len(people[name]))
+            if self.publish_fn is not None:
+                self.publish_fn(encodings, names)
+            return matcher
+        return self.build_fn(encodings, names)
+
+    def refresh(self):
+        """
+        Apply any changes in the gallery folder.
+
+        returns: {'added': [...], 'removed': [...], 'replaced': [...]} (empty lists when unchanged)
+        """
+        self.stats['polls'] += 1
+        items = list_gallery_images(self.path)
+        snapshot = _snapshot(items)
+        changes = {'added': [], 'removed': [], 'replaced': []}
+        with self._lock:
+            changed = sorted(name for name in set(snapshot) | set(self._snapshot)
+                             if snapshot.get(name) != self._snapshot.get(name))
+            if not changed:
+                return changes
+            started = time.perf_counter()
+            by_person = {}
+            for name, image_path in items:
+                by_person.setdefault(name, []).append((name, image_path))
+            # Built aside and committed with the matcher, so an encode error
+            # partway through leaves the current gallery as it was
+            people = dict(self._people)
+            for name in changed:
+                if name not in snapshot:
+                    changes['removed'].append(name)
+                elif name not in self._snapshot:
+                    changes['added'].append(name)
+                else:
+                    changes['replaced'].append(name)
+                encodings = self._encode_person(name, by_person.get(name, []))
+                if encodings:
+                    people[name] = encodings
+                else:
+                    people.pop(name, None)
+            matcher = self._rebuild(people, changed)
+            self._people, self.matcher, self._snapshot = people, matcher, snapshot
+            try:
+                self.store.save()
+            except Exception as e:
+                print(f"Warning: Could not save encoding store: {e}")
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self.stats['updates'] += 1
+            self.stats['last_update_ms'] = round(elapsed, 1)
+            for kind in ('added', 'removed', 'replaced'):
+                self.stats[kind] += len(changes[kind])
+        print(f"Gallery updated in {elapsed:.0f} ms: "
+              + ", ".join(f"{kind} {names}" for kind, names in changes.items() if names))
+        return changes
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Warning: Gallery refresh failed: {e}")
+
+    def start(self, interval=2.0):
+        """Poll the gallery folder every interval seconds on a daemon thread."""
+        if self._thread is not None or not interval:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(interval,),
+                                        name='gallery-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
@@ -0,0 +1,84 @@
+from collections import deque
+
+import numpy as np
+
+
+class EvidenceAccumulator:
+    """
+    Fuses per-frame match distances of one track before committing to an identity.
+
+    Every observation is the top-k candidate list of one encode
+    ([(name, distance), ...] from Gallery.match). For each candidate the
+    distances over the last `window` observations are averaged; a candidate
+    missing from a frame's top-k counts as at least max(threshold, the
+    frame's worst listed distance), which only ever makes it look worse.
+
+    With n observations, mean distance m and spread s (floored at sigma),
+    the bound is z * s / sqrt(n):
+    - accept the best candidate once n >= min_frames and m + bound < threshold
+    - decide "unknown" once n >= min_frames and m - bound >= threshold
+    - otherwise decide on the plain mean when the window is full
+
+    args:
+    window: K, the most observations used before deciding anyway
+    min_frames: never decide on fewer observations than this
+    threshold: distance below which a face matches (same meaning as 0.4 in main.py)
+    z: width of the confidence bound in standard errors (1.64 ~ 95% one-sided)
+    sigma: lower bound on the per-frame distance spread, so two identical
+           distances do not count as certainty
+    """
+
+    def __init__(self, window=5, min_frames=2, threshold=0.4, z=1.64, sigma=0.05):
+        self.window = window
+        self.min_frames = max(1, min(min_frames, window))
+        self.threshold = threshold
+        self.z = z
+        self.sigma = sigma
+        self._frames = deque(maxlen=window)
+        self.frames = 0  # observations since the accumulator was created or reset
+
+    def reset(self):
+        self._frames.clear()
+        self.frames = 0
+
+    def add(self, candidates):
+        """Record the top-k (name, distance) candidates of one encode."""
+        self._frames.append({name: distance for name, distance in candidates})
+        self.frames += 1
+
+    def scores(self):
+        """{name: (mean_distance, bound)} over the observations in the window."""
+        names = set()
+        for frame in self._frames:
+            names.update(frame)
+        n = len(self._frames)
+        scores = {}
+        for name in names:
+            distances = np.array([
+                frame[name] if name in frame else max([self.threshold] + list(frame.values()))
+                for frame in self._frames
+            ])
+            spread = max(float(distances.std()), self.sigma)
+            scores[name] = (float(distances.mean()), self.z * spread / np.sqrt(n))
+        return scores
+
+    def decision(self):
+        """
+        returns: (decided, name, mean_distance); name is None for an unknown
+                 face or while no decision has been reached
+        """
+        n = len(self._frames)
+        scores = self.scores()
+        if n == 0 or not scores:
+            # Nothing in the gallery to compare against
+            return n >= self.min_frames, None, float('inf')
+        name = min(scores, key=lambda candidate: scores[candidate][0])
+        mean, bound = scores[name]
+        if n >= self.min_frames:
+            if mean + bound < self.threshold:
+                return True, name, mean
+            if mean - bound >= self.threshold:
+                return True, None, mean
+        if n >= self.window:
+            return True, (name if mean < self.threshold else None), mean
+        return False, None, mean
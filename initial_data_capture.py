@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 import os
+import time
 import warnings
 
 # Suppress pkg_resources deprecation warning
@@ -8,6 +9,7 @@ warnings.filterwarnings('ignore', category=UserWarning, module='pkg_resources')
 warnings.filterwarnings('ignore', message='pkg_resources is deprecated as an API')
 
 import face_recognition
+from scale_controller import ScaleController
 
 def calculate_eye_aspect_ratio(eye_landmarks):
     """
@@ -144,8 +146,11 @@ def Intial_data_capture(name=None, camera_id=None, run_main=True):
     
     # Variables to store the locked face position
     locked_face = None
-    face_lock_threshold = 50  # pixels
+    face_lock_threshold = 200  # pixels, full resolution
     face_landmarks = []
+    # Detection resolution follows the face size; never below 0.25 so the
+    # landmarks used for head pose keep their detail
+    scaler = ScaleController(min_scale=0.25)
     
     while True:
         ret, image = camera.read()
@@ -153,9 +158,15 @@ def Intial_data_capture(name=None, camera_id=None, run_main=True):
             print("Failed to grab frame")
             break
             
-        small_frame = cv2.resize(image, (0,0), fx=0.25, fy=0.25)
+        scale, upsample = scaler.choose(image.shape)
+        detect_start = time.perf_counter()
+        small_frame = cv2.resize(image, (0,0), fx=scale, fy=scale)
         rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(rgb_small, model="hog")
+        face_locations = face_recognition.face_locations(rgb_small, number_of_times_to_upsample=upsample,
+                                                         model="hog")
+        inv = 1.0 / scale  # downscaled -> full-resolution coordinates
+        scaler.record(image.shape, [tuple(int(c * inv) for c in loc) for loc in face_locations],
+                      time.perf_counter() - detect_start, scale, upsample)
         
         display_image = image.copy()
         
@@ -164,8 +175,8 @@ def Intial_data_capture(name=None, camera_id=None, run_main=True):
             if locked_face is None:
                 # First time face detection - lock it
                 face_location = face_locations[0]
-                face_center = ((face_location[1] + face_location[3]) // 2, 
-                             (face_location[0] + face_location[2]) // 2)
+                face_center = (int((face_location[1] + face_location[3]) * inv) // 2, 
+                             int((face_location[0] + face_location[2]) * inv) // 2)
                 locked_face = face_center
                 face_landmarks = face_recognition.face_landmarks(rgb_small)
                 print("Face locked! Starting registration process...")
@@ -177,8 +188,8 @@ def Intial_data_capture(name=None, camera_id=None, run_main=True):
                 min_distance = float('inf')
                 
                 for idx, face_location in enumerate(face_locations):
-                    face_center = ((face_location[1] + face_location[3]) // 2, 
-                                 (face_location[0] + face_location[2]) // 2)
+                    face_center = (int((face_location[1] + face_location[3]) * inv) // 2, 
+                                 int((face_location[0] + face_location[2]) * inv) // 2)
                     distance = np.sqrt((face_center[0] - locked_face[0])**2 + 
                                     (face_center[1] - locked_face[1])**2)
                     
@@ -193,8 +204,8 @@ def Intial_data_capture(name=None, camera_id=None, run_main=True):
                     face_landmarks = face_recognition.face_landmarks(rgb_small, [face_locations[0]])
                     
                     # Update locked face position to track movement
-                    face_center = ((face_locations[0][1] + face_locations[0][3]) // 2, 
-                                 (face_locations[0][0] + face_locations[0][2]) // 2)
+                    face_center = (int((face_locations[0][1] + face_locations[0][3]) * inv) // 2, 
+                                 int((face_locations[0][0] + face_locations[0][2]) * inv) // 2)
                     locked_face = face_center
                 else:
                     # If locked face is not found, clear all detections
@@ -205,7 +216,7 @@ def Intial_data_capture(name=None, camera_id=None, run_main=True):
             # Draw rectangle around other faces in red to show they're ignored
             if locked_face is not None:
                 for face_loc in face_locations[1:] if len(face_locations) > 1 else []:
-                    top, right, bottom, left = [coord * 4 for coord in face_loc]
+                    top, right, bottom, left = [int(coord * inv) for coord in face_loc]
                     cv2.rectangle(display_image, (left, top), (right, bottom), (0, 0, 255), 2)
                     cv2.putText(display_image, "Ignored", (left, top - 10),
                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
@@ -221,13 +232,13 @@ def Intial_data_capture(name=None, camera_id=None, run_main=True):
             for feature, points in landmarks.items():
                 scaled_points = []
                 for point in points:
-                    scaled_points.append([point[0] * 4, point[1] * 4])
+                    scaled_points.append([int(point[0] * inv), int(point[1] * inv)])
                 scaled_landmarks[feature] = scaled_points
             
             # Draw landmarks and face box for the locked face
             if len(face_locations) > 0:
                 face_loc = face_locations[0]
-                top, right, bottom, left = [coord * 4 for coord in face_loc]
+                top, right, bottom, left = [int(coord * inv) for coord in face_loc]
                 
                 # Draw green box for the locked face
                 cv2.rectangle(display_image, (left, top), (right, bottom), (0, 255, 0), 2)
@@ -424,8 +435,12 @@ def Intial_data_capture(name=None, camera_id=None, run_main=True):
             return False
     else:
         try:
+            # A running recognizer picks the new images up by itself
+            from recognition_daemon import DaemonClient
+            if run_main and DaemonClient().is_running():
+                print("\nRecognition daemon is running and will load the new images automatically.")
             # Optionally run main.py after successful capture
-            if run_main:
+            elif run_main:
                 print("\nStarting attendance system...")
                 # Get the directory where initial_data_capture.py is located
                 script_dir = os.path.dirname(os.path.abspath(__file__))
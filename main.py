@@ -14,7 +14,23 @@ import face_recognition
 from datetime import datetime
 from datetime import date
 import pytz
-import csv
+import json
+import threading
+from collections import deque
+
+from encoding_store import EncodingStore, list_gallery_images
+from gallery_watcher import LiveGallery
+from face_gallery import Gallery
+from shared_gallery import publish_gallery
+from ann_index import IVFIndex
+from pipeline import RecognitionPipeline
+from face_tracker import FaceTracker
+from motion_gate import MotionGate
+from roi_detector import ROIDetector
+from scale_controller import ScaleController, encode_still
+from recognition_profiles import PROFILES, get_profile, store_model
+from video_sources import open_source
+from metrics import MetricsRegistry, serve_metrics
 
 # Hardware acceleration configuration
 HARDWARE_CODEC = {
@@ -24,6 +40,40 @@ HARDWARE_CODEC = {
     'extra_options': {}
 }
 
+# Detector, landmark model, jitters, scale and threshold for enrollment and
+# recognition (RECOGNITION_PROFILE or --profile; see recognition_profiles.py)
+PROFILE = get_profile()
+
+
+def _encode_face(img, use_gpu=False):
+    """
+    Downscale one BGR image and return its first 128-d face encoding, or None
+    when no face is found. On CPU, detection follows PROFILE and images where
+    no face is found at its scale are retried at higher resolution (see
+    scale_controller.encode_still).
+    """
+    if use_gpu:
+        # Upload to GPU
+        gpu_img = cv2.cuda_GpuMat()
+        gpu_img.upload(img)
+
+        # Resize on GPU
+        gpu_small = cv2.cuda.resize(gpu_img, (0,0), fx=PROFILE.scale, fy=PROFILE.scale)
+
+        # Color convert on GPU
+        gpu_rgb = cv2.cuda.cvtColor(gpu_small, cv2.COLOR_BGR2RGB)
+
+        # Download for face_recognition
+        img = gpu_rgb.download()
+    else:
+        return encode_still(img, PROFILE)
+
+    encodings = face_recognition.face_encodings(img, num_jitters=PROFILE.enroll_jitters,
+                                                model=PROFILE.landmarks)
+    if len(encodings) > 0:
+        return encodings[0]
+    return None
+
 
 def identifyEncodings(images, classNames):
     '''
@@ -36,44 +86,113 @@ def identifyEncodings(images, classNames):
     '''
     
     encodeList = []
+    keptNames = []
     use_gpu = cv2.cuda.getCudaEnabledDeviceCount() > 0
     
     for img, name in zip(images, classNames):
-        if use_gpu:
-            # Upload to GPU
-            gpu_img = cv2.cuda_GpuMat()
-            gpu_img.upload(img)
-            
-            # Resize on GPU
-            gpu_small = cv2.cuda.resize(gpu_img, (0,0), fx=0.25, fy=0.25)
-            
-            # Color convert on GPU
-            gpu_rgb = cv2.cuda.cvtColor(gpu_small, cv2.COLOR_BGR2RGB)
-            
-            # Download for face_recognition
-            img = gpu_rgb.download()
-        else:
-            small_frame = cv2.resize(img, (0,0), fx=0.25, fy=0.25)
-            img = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-        
-        # Use CNN model when GPU is available, HOG for CPU
-        encodings = face_recognition.face_encodings(img, model="cnn" if use_gpu else "hog")
-        
-        if len(encodings) > 0:
-            encode = encodings[0]
+        encode = _encode_face(img, use_gpu)
+        if encode is not None:
             encodeList.append(encode)
+            keptNames.append(name)
         else:
             print(f"Warning: No face detected in image for {name}")
-            # Remove the corresponding name from classNames
-            classNames.remove(name)
-            continue
+    # Drop names without a face in place, after the loop, so indices never
+    # shift under zip() and callers' classNames stays aligned with encodeList
+    classNames[:] = keptNames
     return encodeList
 
+
+def _gallery_store(store_dir='encoding_cache'):
+    """The EncodingStore for this device and the function that fills it."""
+    use_gpu = cv2.cuda.getCudaEnabledDeviceCount() > 0
+    store = EncodingStore(store_dir, model=store_model(PROFILE, use_gpu), scale=PROFILE.scale)
+
+    def encode_path(image_path):
+        img = cv2.imread(image_path)
+        if img is None:
+            return None
+        return _encode_face(img, use_gpu)
+
+    return store, encode_path
+
+
+def _load_known_encodings(path='Attendance_data', store_dir='encoding_cache'):
+    """
+    Load encodings for every pose image in path, reusing the on-disk
+    EncodingStore so only new or changed images are decoded and encoded.
+
+    returns: (encodeListKnown, classNames)
+    """
+    store, encode_path = _gallery_store(store_dir)
+    items = list_gallery_images(path)
+    print("Found persons:", sorted({name for name, _ in items}))
+    encodeListKnown, classNames = store.sync(items, encode_path)
+    print(f"Encoding store: {store.stats['reused']} reused, "
+          f"{store.stats['encoded']} encoded, {store.stats['removed']} removed")
+    return encodeListKnown, classNames
+
+# Switch from exact matching to the IVF index once the gallery gets this big
+ANN_MIN_GALLERY = int(os.environ.get('ANN_MIN_GALLERY', 20000))
+ANN_NPROBE = int(os.environ.get('ANN_NPROBE', 8))
+# Poll Attendance_data for registrations and deletions this often (0 disables)
+GALLERY_WATCH_INTERVAL = float(os.environ.get('GALLERY_WATCH_INTERVAL', 2.0))
+
+
+def _build_matcher(encodeListKnown, classNames):
+    """
+    Exact Gallery for office-sized galleries, approximate IVFIndex for
+    campus-sized ones. The exact gallery is also published as a memory-mapped
+    file that the dashboard and other recognizers map instead of encoding
+    Attendance_data themselves. This process always matches against the
+    gallery it built: whatever is published later (another kiosk, another
+    profile or gallery path) must not change who it recognizes.
+    """
+    gallery = Gallery(encodeListKnown, classNames)
+    _publish_shared(gallery, None)
+    if len(encodeListKnown) >= ANN_MIN_GALLERY:
+        print(f"Using IVF index for {len(encodeListKnown)} encodings (nprobe={ANN_NPROBE})")
+        return IVFIndex.build(encodeListKnown, classNames, nprobe=ANN_NPROBE)
+    return gallery
+
+
+def _publish_shared(encodings, names):
+    """Publish the gallery for other processes. Returns False when that is not possible."""
+    try:
+        version = publish_gallery(encodings, names, profile=PROFILE.name)
+        print(f"Published shared gallery v{version} ({len(encodings)} encodings)")
+        return True
+    except Exception as e:
+        print(f"Warning: Could not publish shared gallery: {e}")
+        return False
+
 from attendance_tracker import AttendanceTracker
 
 # Initialize the attendance tracker (safe to keep at import time)
 attendance_tracker = AttendanceTracker()
 
+# Live counters and per-stage latency histograms, served with --metrics-port
+metrics = MetricsRegistry()
+metrics.describe('frames_read', 'Frames read from the camera or source')
+metrics.describe('frames_dropped', 'Frames discarded before recognition because workers were busy')
+metrics.describe('frames_processed', 'Frames that went through recognition')
+metrics.describe('frames_gated', 'Frames where the motion gate skipped detection')
+metrics.describe('faces_detected', 'Face boxes returned by the detector')
+metrics.describe('encodes', 'Face encodings computed')
+metrics.describe('matches', 'Faces matched to a known person')
+metrics.describe('unknown_faces', 'Encoded faces with no gallery match')
+metrics.describe('attendance_marks', 'Attendance records written')
+metrics.describe('detection_scale', 'Effective detection scale (scale x 2^upsample) of the adaptive scale controller')
+metrics.add_collector('csv_writes_suppressed', lambda: attendance_tracker.csv_writer.index.suppressed,
+                      'counter', 'Attendance rows refused as duplicates by the write index')
+metrics.add_collector('api_events_sent', lambda: attendance_tracker.sink.stats['sent'], 'counter',
+                      'Journaled attendance events delivered to the API')
+metrics.add_collector('api_events_per_second', lambda: attendance_tracker.sink.throughput(),
+                      help_text='Journal replay throughput over the last minute')
+metrics.add_collector('api_lag_events', lambda: attendance_tracker.sink.lag()['events'],
+                      help_text='Journaled attendance events not yet delivered to the API')
+metrics.add_collector('api_lag_seconds', lambda: attendance_tracker.sink.lag()['seconds'],
+                      help_text='Age of the oldest undelivered attendance event')
+
 def markAttendance(name):
     '''
     This function handles attendance marking using the AttendanceTracker
@@ -106,33 +225,261 @@ def _load_known_faces(path='Attendance_data'):
     print("Loaded persons:", names)
     print(f"Total images loaded: {len(images)} (including all poses)")
     return images, names
-def run_attendance_window():
-    """Run the OpenCV window workflow for attendance (import-safe)."""
-    # Ensure Attendance_Entry directory exists and today's file present
-    os.makedirs("Attendance_Entry", exist_ok=True)
-    current_date = datetime.now().strftime("%y_%m_%d")
-    attendance_file = f"Attendance_Entry/Attendance_{current_date}.csv"
-    if not os.path.exists(attendance_file):
-        with open(attendance_file, "w", newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(["Name", "Time", "Date"])
-        print(f"Created new attendance file for today: {attendance_file}")
+
+
+def _attendance_status(name):
+    """
+    Run the shift checks for a recognized person, mark attendance when allowed
+    and return the status text shown under their face.
+    """
+    current_shift = attendance_tracker._get_current_shift(name)
+    if not current_shift:
+        return "Outside shift hours"
+    # Validate assigned shift
+    if not attendance_tracker.has_valid_shift(name):
+        return "Invalid shift for this user"
+    if attendance_tracker.can_mark_attendance(name):
+        if markAttendance(name):
+            metrics.inc('attendance_marks')
+            return f"\u2713 {current_shift.upper()} Shift"
+        return f"{current_shift.upper()} Shift - Already Marked"
+    if attendance_tracker.already_marked(name, current_shift):
+        return f"{current_shift.upper()} Shift - Already Marked"
+    return f"{current_shift.upper()} Shift"
+
+
+def _draw_recognized(img, faceLoc, name, status, scale=1):
+    """Draw the box, name and status for a face box (full-resolution unless scale is given)."""
+    top, right, bottom, left = [int(coord * scale) for coord in faceLoc]
+    cv2.rectangle(img, (left, top), (right, bottom), (0, 255, 0), 2)
+    cv2.rectangle(img, (left, bottom - 35), (right, bottom), (0, 255, 0), cv2.FILLED)
+    cv2.putText(img, name, (left + 6, bottom - 25),
+                cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
+    cv2.putText(img, status, (left + 6, bottom - 6),
+                cv2.FONT_HERSHEY_COMPLEX, 0.6, (255, 255, 255), 1)
+
+
+def _detect_faces(img, face_detector=None, roi_detector=None, scaler=None):
+    """
+    Downscale a BGR frame and find faces in it. On CPU an ROIDetector, when
+    given, searches around the previous faces before scanning the full frame,
+    and a ScaleController, when given, picks the detection scale and upsample
+    count instead of PROFILE's fixed ones.
+
+    returns: (rgb_small, facesCurFrame, scale) with boxes in downscaled
+             coordinates (divide by scale for full resolution)
+    """
+    if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+        gpu_frame = cv2.cuda_GpuMat()
+        gpu_frame.upload(img)
+        gpu_small = cv2.cuda.resize(gpu_frame, (0, 0), fx=PROFILE.scale, fy=PROFILE.scale)
+        gpu_rgb = cv2.cuda.cvtColor(gpu_small, cv2.COLOR_BGR2RGB)
+        rgb_small = gpu_rgb.download()
+        if face_detector is not None:
+            faces = face_detector.detect(gpu_frame)
+            if faces[1] is not None:
+                facesCurFrame = [(int(face[1]), int(face[0] + face[2]),
+                                  int(face[1] + face[3]), int(face[0]))
+                                 for face in faces[1]]
+            else:
+                facesCurFrame = []
+        else:
+            facesCurFrame = face_recognition.face_locations(rgb_small, model="cnn")
+        return rgb_small, facesCurFrame, PROFILE.scale
+
+    if scaler is not None:
+        scale, upsample = scaler.choose(img.shape)
     else:
-        print(f"Using today's attendance file: {attendance_file}")
+        scale, upsample = PROFILE.scale, PROFILE.upsample
+    started = time.perf_counter()
+    if roi_detector is not None:
+        # Per-call settings: the detector may be shared by pipeline workers
+        rgb_small, facesCurFrame = roi_detector.detect(img, scale, upsample, PROFILE.detector)
+    else:
+        small_frame = cv2.resize(img, (0, 0), fx=scale, fy=scale)
+        rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        facesCurFrame = face_recognition.face_locations(
+            rgb_small, number_of_times_to_upsample=upsample, model=PROFILE.detector)
+    if scaler is not None:
+        scaler.record(img.shape, [_to_full(box, scale) for box in facesCurFrame],
+                      time.perf_counter() - started, scale, upsample)
+        metrics.set_gauge('detection_scale', scale * 2 ** upsample)
+    return rgb_small, facesCurFrame, scale
+
+
+def _to_full(box, scale):
+    """(top, right, bottom, left) on the downscaled frame -> full resolution."""
+    return tuple(int(round(c / scale)) for c in box)
+
+
+def _to_small(box, scale):
+    """(top, right, bottom, left) at full resolution -> the downscaled frame."""
+    return tuple(int(round(c * scale)) for c in box)
+
+
+# Serializes attendance marking when several recognition workers run at once
+_attendance_lock = threading.Lock()
+
+
+def _assign_tracks(tracker, pending, matches, now):
+    """Single-frame decisions: take each track's match as is and mark attendance."""
+    for track, (name, distance) in zip(pending, matches):
+        tracker.assign(track, name, distance, now)
+        track.status = None
+        if name is None:
+            metrics.inc('unknown_faces')
+            continue
+        metrics.inc('matches')
+        with _attendance_lock, metrics.time('attendance'):
+            track.status = _attendance_status(name)
+
+
+def _vote_tracks(tracker, pending, encodes, gallery, now):
+    """
+    Multi-frame decisions: add each encode to its track's evidence and mark
+    attendance only for tracks whose evidence just reached a decision.
+    """
+    with metrics.time('match'):
+        candidates = gallery.match(encodes, k=2)
+    for track, track_candidates in zip(pending, candidates):
+        if not tracker.observe(track, track_candidates, now):
+            continue
+        metrics.inc('decisions')
+        metrics.inc('frames_to_decision', track.evidence.frames)
+        track.status = None
+        if track.name is None:
+            metrics.inc('unknown_faces')
+            continue
+        metrics.inc('matches')
+        with _attendance_lock, metrics.time('attendance'):
+            track.status = _attendance_status(track.name)
+
 
-    # Load known faces and encodings
-    images, classNames = _load_known_faces('Attendance_data')
-    encodeListKnown = identifyEncodings(images, classNames)
+def _recognize_frame(img, gallery, face_detector=None, multi_face=False, tracker=None,
+                     motion_gate=None, roi_detector=None, scaler=None):
+    """
+    Detect, encode and match the faces in one frame and mark attendance.
+    Does not draw on img. With a FaceTracker, only new, stale or
+    low-confidence tracks are encoded; the rest reuse their cached identity.
+    A tracker with voting accumulates several frames per track and marks
+    attendance only once the evidence is conclusive. With a MotionGate, static frames skip detection entirely. With an
+    ROIDetector, detection looks around the previous faces first. With a
+    ScaleController, the detection resolution adapts to the face sizes seen.
+
+    returns: dict with
+        'message': (text, color) banner or None
+        'faces': list of (faceLoc, name, status) for recognized faces, with
+                 faceLoc in full-resolution coordinates
+    """
+    metrics.inc('frames_processed')
+    if motion_gate is not None and not motion_gate.should_detect(img):
+        metrics.inc('frames_gated')
+        return {'message': ("No face detected", (0, 255, 255)), 'faces': [], 'gated': True}
+
+    with metrics.time('detect'):
+        rgb_small, facesCurFrame, scale = _detect_faces(img, face_detector, roi_detector, scaler)
+    metrics.inc('faces_detected', len(facesCurFrame))
+    if motion_gate is not None:
+        motion_gate.record_detection(len(facesCurFrame))
+    result = {'message': None, 'faces': []}
+
+    if len(facesCurFrame) > 1 and not multi_face:
+        result['message'] = ("Multiple faces detected!", (0, 0, 255))
+    elif len(facesCurFrame) == 0:
+        result['message'] = ("No face detected", (0, 255, 255))
+    elif tracker is not None:
+        now = time.time()
+        # Tracks live in full-resolution coordinates so they survive scale changes
+        tracks = tracker.update([_to_full(box, scale) for box in facesCurFrame], now)
+        pending = [t for t in tracks
+                   if tracker.needs_encoding(t, now, attendance_tracker.in_cooldown)]
+        if pending and len(gallery) > 0:
+            with metrics.time('encode'):
+                encodes = face_recognition.face_encodings(
+                    rgb_small, [_to_small(t.box, scale) for t in pending],
+                    num_jitters=PROFILE.num_jitters, model=PROFILE.landmarks)
+            metrics.inc('encodes', len(encodes))
+            if tracker.voting is not None:
+                _vote_tracks(tracker, pending, encodes, gallery, now)
+            else:
+                with metrics.time('match'):
+                    matches = gallery.identify(encodes, threshold=PROFILE.threshold)
+                _assign_tracks(tracker, pending, matches, now)
+        for track in tracks:
+            if track.name is not None:
+                result['faces'].append((track.box, track.name, track.status))
+    else:
+        # One encoder call and one batched gallery query for every face in the frame
+        with metrics.time('encode'):
+            encodesCurFrame = face_recognition.face_encodings(
+                rgb_small, facesCurFrame, num_jitters=PROFILE.num_jitters, model=PROFILE.landmarks)
+        metrics.inc('encodes', len(encodesCurFrame))
+        if len(encodesCurFrame) > 0 and len(gallery) > 0:
+            with metrics.time('match'):
+                matches = gallery.identify(encodesCurFrame, threshold=PROFILE.threshold)
+            for faceLoc, (name, _) in zip(facesCurFrame, matches):
+                if name is None:
+                    metrics.inc('unknown_faces')
+                    continue
+                metrics.inc('matches')
+                with _attendance_lock, metrics.time('attendance'):
+                    status = _attendance_status(name)
+                result['faces'].append((_to_full(faceLoc, scale), name, status))
+    return result
+
+
+def _draw_result(img, result):
+    """Draw the output of _recognize_frame onto a full-size frame."""
+    if result['message'] is not None:
+        text, color = result['message']
+        cv2.putText(img, text, (10, 30), cv2.FONT_HERSHEY_COMPLEX, 0.7, color, 2)
+    for faceLoc, name, status in result['faces']:
+        _draw_recognized(img, faceLoc, name, status)
+
+
+class ThroughputMeter:
+    """Count recognized faces and report people per second over a sliding window."""
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self.events = deque()
+        self.total = 0
+        self.started = time.time()
+
+    def add(self, count=1):
+        now = time.time()
+        for _ in range(count):
+            self.events.append(now)
+        self.total += count
+
+    def rate(self):
+        now = time.time()
+        while self.events and now - self.events[0] > self.window:
+            self.events.popleft()
+        span = min(self.window, max(now - self.started, 1e-6))
+        return len(self.events) / span
+
+
+def _load_gallery(path='Attendance_data', watch_interval=0):
+    """
+    Load known faces and encodings and build the matcher for them. With a
+    watch_interval, registrations and deletions in path are applied to the
+    running gallery without a restart.
+    """
+    store, encode_path = _gallery_store()
+    gallery = LiveGallery(path, store, encode_path, _build_matcher, publish_fn=_publish_shared)
     print('Encoding Complete')
-    print(f'Successfully encoded {len(encodeListKnown)} faces')
+    print(f'Successfully encoded {len(gallery)} faces')
+    return gallery.start(watch_interval)
+
 
-    # GPU config when available
+def _init_face_detector():
+    """Configure the GPU when available and return its face detector (None on CPU)."""
     if cv2.cuda.getCudaEnabledDeviceCount() > 0:
         cv2.cuda.setDevice(0)
         print("Using GPU acceleration")
         cv2.ocl.setUseOpenCL(True)
-        stream = cv2.cuda_Stream()
-        face_detector = cv2.cuda.FaceDetectorYN_create(
+        return cv2.cuda.FaceDetectorYN_create(
             model="face_detection_yunet_2023mar.onnx",
             config="",
             size=(640, 480),
@@ -140,10 +487,172 @@ def run_attendance_window():
             nms_threshold=0.3,
             top_k=5000,
         )
-    else:
-        print("Using CPU processing")
-        stream = None
-        face_detector = None
+    print("Using CPU processing")
+    return None
+
+
+def _camera_640x480(cap):
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    return cap
+
+
+def open_camera():
+    """
+    Open the kiosk camera with better error handling for Jetson Nano: the CSI
+    camera (CAMERA_DEV GStreamer pipeline) first, then /dev/video*. On other
+    platforms camera 0.
+
+    returns: an opened cv2.VideoCapture set to 640x480, or None
+    """
+    if platform.system() == 'Linux':  # Jetson Nano
+        # Try CSI camera first (Jetson specific)
+        cap = cv2.VideoCapture(os.environ.get('CAMERA_DEV', 'nvarguscamerasrc ! video/x-raw(memory:NVMM), width=1280, height=720, format=(string)NV12, framerate=30/1 ! nvvidconv ! video/x-raw, format=(string)BGRx ! videoconvert ! video/x-raw, format=(string)BGR ! appsink'), cv2.CAP_GSTREAMER)
+        if cap is not None and cap.isOpened():
+            print("Successfully opened CSI camera")
+            return _camera_640x480(cap)
+
+        # Try V4L2 devices
+        for dev in range(10):  # Try multiple video devices
+            dev_path = f"/dev/video{dev}"
+            if os.path.exists(dev_path):
+                print(f"Trying {dev_path}...")
+                cap = cv2.VideoCapture(dev)
+                if cap is not None and cap.isOpened():
+                    print(f"Successfully opened camera at {dev_path}")
+                    return _camera_640x480(cap)
+    else:  # Windows or other platforms
+        cap = cv2.VideoCapture(0)
+        if cap is not None and cap.isOpened():
+            return _camera_640x480(cap)
+    return None
+
+
+def _start_metrics_server(port):
+    """Serve the metrics registry on a local port; None when disabled or the port is taken."""
+    if not port:
+        return None
+    try:
+        return serve_metrics(metrics, int(port))
+    except OSError as e:
+        print(f"Warning: Could not start metrics server on port {port}: {e}")
+        return None
+
+
+def run_headless(source, multi_face=False, track=False, motion_gate=False,
+                 motion_sensitivity=0.01, motion_recheck=2.0, roi=False, max_frames=None,
+                 metrics_port=None, voting=None, scaling=None):
+    """
+    Run recognition without any GUI on any frame source, as fast as frames
+    can be processed.
+
+    Prints one JSON line per recognition / attendance event and a final
+    summary with fps and per-frame latency.
+
+    args:
+    source: camera index, video file, image folder, RTSP URL or GStreamer pipeline
+    max_frames: stop after this many frames (None: until the source ends)
+    metrics_port: serve Prometheus metrics on this local port while running
+    voting: EvidenceAccumulator settings to decide identities over several frames (implies track)
+    scaling: ScaleController settings to adapt the detection resolution (None: the profile's fixed scale)
+    returns: summary dict
+    """
+    gallery = _load_gallery('Attendance_data', GALLERY_WATCH_INTERVAL)
+    face_detector = _init_face_detector()
+    tracker = FaceTracker(voting=voting) if track or voting else None
+    gate = MotionGate(sensitivity=motion_sensitivity, recheck_interval=motion_recheck) if motion_gate else None
+    roi_detector = ROIDetector() if roi else None
+    scaler = ScaleController(**scaling) if scaling is not None else None
+    cap = open_source(source)
+    metrics_server = _start_metrics_server(metrics_port)
+
+    latencies = []
+    counts = {'frames': 0, 'faces': 0, 'recognitions': 0, 'attendance_marked': 0}
+    started = time.perf_counter()
+    try:
+        while max_frames is None or counts['frames'] < max_frames:
+            success, img = cap.read()
+            if not success:
+                break
+            metrics.inc('frames_read')
+            frame_start = time.perf_counter()
+            result = _recognize_frame(img, gallery, face_detector, multi_face, tracker, gate,
+                                      roi_detector, scaler)
+            frame_seconds = time.perf_counter() - frame_start
+            metrics.observe('frame', frame_seconds)
+            latencies.append(frame_seconds * 1000.0)
+            frame_no = counts['frames']
+            counts['frames'] += 1
+            for faceLoc, name, status in result['faces']:
+                counts['recognitions'] += 1
+                event = {'event': 'recognition', 'frame': frame_no, 'name': name,
+                         'box': list(faceLoc), 'status': status}
+                print(json.dumps(event, ensure_ascii=False))
+                if status and status.startswith("\u2713"):
+                    counts['attendance_marked'] += 1
+                    print(json.dumps({'event': 'attendance', 'frame': frame_no, 'name': name,
+                                      'time': datetime.now().isoformat(timespec='seconds')}))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        gallery.stop()
+        if scaler is not None:
+            scaler.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    lat = np.array(latencies) if latencies else np.zeros(1)
+    summary = dict(counts,
+                   seconds=round(elapsed, 3),
+                   fps=round(counts['frames'] / elapsed, 2),
+                   latency_ms={'mean': round(float(lat.mean()), 2),
+                               'p50': round(float(np.percentile(lat, 50)), 2),
+                               'p95': round(float(np.percentile(lat, 95)), 2),
+                               'max': round(float(lat.max()), 2)})
+    if tracker is not None:
+        summary['tracker'] = tracker.stats
+    if gate is not None:
+        summary['motion_gate'] = gate.stats
+    if roi_detector is not None:
+        summary['roi'] = roi_detector.stats
+    if scaler is not None:
+        summary['scale'] = scaler.stats
+    summary['stages'] = metrics.snapshot()['stages']
+    print(json.dumps({'event': 'summary', **summary}))
+    return summary
+
+
+def run_attendance_window(multi_face=False, threaded=False, workers=1, track=False,
+                          motion_gate=False, motion_sensitivity=0.01, motion_recheck=2.0,
+                          roi=False, metrics_port=None, voting=None, scaling=None):
+    """
+    Run the OpenCV window workflow for attendance (import-safe).
+
+    args:
+    multi_face: recognize and mark every face in the frame instead of
+                rejecting frames with more than one face
+    threaded: run capture, recognition and display as separate stages so a
+              slow encode never stalls the camera or the window
+    workers: number of recognition worker threads in threaded mode
+    track: follow faces across frames and only encode new or stale tracks
+    motion_gate: skip face detection on frames without motion
+    motion_sensitivity: fraction of changed pixels that counts as motion
+    motion_recheck: run detection at least this often (seconds) even without motion
+    roi: search around the previous face boxes before scanning the full frame
+    metrics_port: serve Prometheus metrics on http://127.0.0.1:<port>/metrics
+    voting: EvidenceAccumulator settings; identities are decided over several
+            frames per track before attendance is marked (implies track)
+    scaling: ScaleController settings; the detection resolution follows the
+             face sizes seen instead of the profile's fixed downscale
+    """
+    # Today's file is created up front; the shared writer moves on to the
+    # next day's file by itself when the window runs past midnight
+    print(f"Using today's attendance file: {attendance_tracker.csv_writer.ensure_today()}")
+
+    gallery = _load_gallery('Attendance_data', GALLERY_WATCH_INTERVAL)
+    face_detector = _init_face_detector()
 
     # Function to check if mouse click is within button bounds
     def is_mouse_click_in_button(x, y, button_pos):
@@ -156,6 +665,8 @@ def run_attendance_window():
             button_pos = param
             if is_mouse_click_in_button(x, y, button_pos):
                 print("\nStarting registration process...")
+                if active_pipeline[0] is not None:
+                    active_pipeline[0].stop()
                 cap.release()
                 cv2.destroyAllWindows()
                 import subprocess as _sub
@@ -166,39 +677,13 @@ def run_attendance_window():
                     print(f"Error running registration: {e}")
                 nonlocal_running[0] = False
 
-    # Camera capture with better error handling for Jetson Nano
-    def init_camera():
-        # Try different camera indices and APIs
-        if platform.system() == 'Linux':  # Jetson Nano
-            # Try CSI camera first (Jetson specific)
-            cap = cv2.VideoCapture(os.environ.get('CAMERA_DEV', 'nvarguscamerasrc ! video/x-raw(memory:NVMM), width=1280, height=720, format=(string)NV12, framerate=30/1 ! nvvidconv ! video/x-raw, format=(string)BGRx ! videoconvert ! video/x-raw, format=(string)BGR ! appsink'), cv2.CAP_GSTREAMER)
-            if cap is not None and cap.isOpened():
-                print("Successfully opened CSI camera")
-                return cap
-                
-            # Try V4L2 devices
-            for dev in range(10):  # Try multiple video devices
-                dev_path = f"/dev/video{dev}"
-                if os.path.exists(dev_path):
-                    print(f"Trying {dev_path}...")
-                    cap = cv2.VideoCapture(dev)
-                    if cap is not None and cap.isOpened():
-                        print(f"Successfully opened camera at {dev_path}")
-                        return cap
-        else:  # Windows or other platforms
-            cap = cv2.VideoCapture(0)
-            if cap is not None and cap.isOpened():
-                return cap
-        
+    cap = open_camera()
+    if cap is None:
         print("Error: Could not open any camera. Please check:")
         print("1. Camera is properly connected")
         print("2. Camera permissions (try: sudo chmod 666 /dev/video*)")
         print("3. Camera is not in use by another application")
         exit(1)
-    
-    cap = init_camera()
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 
     # Create window and set mouse callback
     cv2.namedWindow('Attendance System')
@@ -209,92 +694,179 @@ def run_attendance_window():
     last_detect_time = 0
     CACHE_TIME = 2.0
     nonlocal_running = [True]
+    active_pipeline = [None]
+    throughput = ThroughputMeter()
+    tracker = FaceTracker(voting=voting) if track or voting else None
+    gate = MotionGate(sensitivity=motion_sensitivity, recheck_interval=motion_recheck) if motion_gate else None
 
-    while nonlocal_running[0]:
-        success, img = cap.read()
-        if not success:
-            break
+    roi_detector = ROIDetector() if roi else None
+    scaler = ScaleController(**scaling) if scaling is not None else None
+    metrics_server = _start_metrics_server(metrics_port)
 
+    def process_frame(frame):
+        with metrics.time('frame'):
+            result = _recognize_frame(frame, gallery, face_detector, multi_face, tracker, gate,
+                                      roi_detector, scaler)
+        throughput.add(len(result['faces']))
+        return result
+
+    def draw_frame(img, result):
         # Draw registration button
         x, y, w, h = button_pos
         cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), cv2.FILLED)
         cv2.putText(img, "Register New", (x + 5, y + 20),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        if result is not None:
+            _draw_result(img, result)
+        if multi_face:
+            cv2.putText(img, f"{throughput.rate():.1f} people/s", (img.shape[1] - 170, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
 
-        # Process image
-        if cv2.cuda.getCudaEnabledDeviceCount() > 0:
-            gpu_frame = cv2.cuda_GpuMat()
-            gpu_frame.upload(img)
-            gpu_small = cv2.cuda.resize(gpu_frame, (0, 0), fx=0.25, fy=0.25)
-            gpu_rgb = cv2.cuda.cvtColor(gpu_small, cv2.COLOR_BGR2RGB)
-            rgb_small = gpu_rgb.download()
-            if face_detector is not None:
-                faces = face_detector.detect(gpu_frame)
-                if faces[1] is not None:
-                    facesCurFrame = [(int(face[1]), int(face[0] + face[2]),
-                                      int(face[1] + face[3]), int(face[0]))
-                                     for face in faces[1]]
-                else:
-                    facesCurFrame = []
-            else:
-                facesCurFrame = face_recognition.face_locations(rgb_small, model="cnn")
-        else:
-            small_frame = cv2.resize(img, (0, 0), fx=0.25, fy=0.25)
-            rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-            facesCurFrame = face_recognition.face_locations(rgb_small, model="hog")
-
-        if len(facesCurFrame) > 1:
-            cv2.putText(img, "Multiple faces detected!",
-                        (10, 30), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 0, 255), 2)
-        elif len(facesCurFrame) == 0:
-            cv2.putText(img, "No face detected", (10, 30),
-                        cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 255), 2)
-        else:
-            encodesCurFrame = face_recognition.face_encodings(rgb_small, facesCurFrame)
-            if len(encodesCurFrame) > 0:
-                encodeFace = encodesCurFrame[0]
-                faceLoc = facesCurFrame[0]
-                name = "Unknown"
-                if len(encodeListKnown) > 0:
-                    faceDis = face_recognition.face_distance(encodeListKnown, encodeFace)
-                    matchIndex = np.argmin(faceDis)
-                    if faceDis[matchIndex] < 0.4:
-                        name = classNames[matchIndex]
-                        top, right, bottom, left = [coord * 4 for coord in faceLoc]
-                        cv2.rectangle(img, (left, top), (right, bottom), (0, 255, 0), 2)
-                        cv2.rectangle(img, (left, bottom - 35), (right, bottom), (0, 255, 0), cv2.FILLED)
-                        current_shift = attendance_tracker._get_current_shift()
-                        if current_shift:
-                            # Validate assigned shift
-                            if not attendance_tracker.has_valid_shift(name):
-                                status = "Invalid shift for this user"
-                            else:
-                                if attendance_tracker.can_mark_attendance(name):
-                                    marked = markAttendance(name)
-                                    if marked:
-                                        status = f"\u2713 {current_shift.upper()} Shift"
-                                    else:
-                                        status = f"{current_shift.upper()} Shift - Already Marked"
-                                else:
-                                    if name in attendance_tracker.marked_shifts and \
-                                       current_shift in attendance_tracker.marked_shifts[name]:
-                                        status = f"{current_shift.upper()} Shift - Already Marked"
-                                    else:
-                                        status = f"{current_shift.upper()} Shift"
-                        else:
-                            status = "Outside shift hours"
-                        cv2.putText(img, name, (left + 6, bottom - 25),
-                                    cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
-                        cv2.putText(img, status, (left + 6, bottom - 6),
-                                    cv2.FONT_HERSHEY_COMPLEX, 0.6, (255, 255, 255), 1)
-
-        cv2.imshow('Attendance System', img)
-        if cv2.waitKey(1) & 0xFF == 27:
-            break
+    if threaded:
+        pipeline = RecognitionPipeline(cap, process_frame, queue_size=2, workers=workers)
+        active_pipeline[0] = pipeline
+        # The capture thread keeps its own counts; read them at scrape time
+        metrics.add_collector('frames_read', lambda: pipeline.queue.put_count, 'counter',
+                              'Frames read from the camera or source')
+        metrics.add_collector('frames_dropped', lambda: pipeline.queue.dropped, 'counter',
+                              'Frames discarded before recognition because workers were busy')
+        metrics.add_collector('queue_depth', lambda: pipeline.queue.depth)
+        pipeline.start()
+        last_shown = 0
+        while nonlocal_running[0] and pipeline.running:
+            frame_id, frame = pipeline.latest_frame()
+            if frame is None or frame_id == last_shown:
+                # Nothing new from the camera yet; keep the window responsive
+                if cv2.waitKey(1) & 0xFF == 27:
+                    break
+                continue
+            last_shown = frame_id
+            with pipeline.display_stats.time(), metrics.time('display'):
+                # Copy: the same frame may still be in a recognition worker
+                img = frame.copy()
+                _, result = pipeline.latest_result()
+                draw_frame(img, result)
+                stats = pipeline.stats()
+                cv2.putText(img, f"q={stats['queue_depth']} rec={stats['recognition']['last_ms']:.0f}ms",
+                            (img.shape[1] - 170, img.shape[0] - 15),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+                cv2.imshow('Attendance System', img)
+            if cv2.waitKey(1) & 0xFF == 27:
+                break
+        pipeline.stop()
+        print("Pipeline stats:", pipeline.stats())
+    else:
+        while nonlocal_running[0]:
+            success, img = cap.read()
+            if not success:
+                break
+            metrics.inc('frames_read')
+
+            draw_frame(img, process_frame(img))
+
+            cv2.imshow('Attendance System', img)
+            if cv2.waitKey(1) & 0xFF == 27:
+                break
 
     cap.release()
     cv2.destroyAllWindows()
+    gallery.stop()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if roi_detector is not None:
+        print(f"ROI detector: {roi_detector.stats}")
+    if scaler is not None:
+        scaler.close()
+        print(f"Scale controller: {scaler.stats}")
+    if gate is not None:
+        print(f"Motion gate: {gate.stats}, {gate.gated_ratio():.1%} of frames skipped detection")
+    if tracker is not None:
+        elapsed = max(time.time() - throughput.started, 1e-6)
+        print(f"Tracker: {tracker.stats}, {tracker.stats['encodes'] / elapsed:.2f} encodes/s")
+        if tracker.voting is not None and tracker.stats['decisions']:
+            print(f"Voting: {tracker.stats['frames_to_decision'] / tracker.stats['decisions']:.1f} "
+                  f"frames per decision on average")
+    if multi_face:
+        print(f"Recognized {throughput.total} faces, "
+              f"{throughput.total / max(time.time() - throughput.started, 1e-6):.2f} people/s overall")
 
 
 if __name__ == "__main__":
-    run_attendance_window()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Face recognition attendance window")
+    parser.add_argument("--multi-face", action="store_true",
+                        help="Recognize every face in the frame instead of rejecting crowded frames")
+    parser.add_argument("--threaded", action="store_true",
+                        help="Run capture, recognition and display on separate threads")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Recognition worker threads in --threaded mode")
+    parser.add_argument("--track", action="store_true",
+                        help="Track faces across frames and only encode new or stale tracks")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="Skip face detection on frames without motion")
+    parser.add_argument("--motion-sensitivity", type=float, default=0.01,
+                        help="Fraction of changed pixels that counts as motion")
+    parser.add_argument("--motion-recheck", type=float, default=2.0,
+                        help="Run detection at least this often (seconds) without motion")
+    parser.add_argument("--roi", action="store_true",
+                        help="Search around the previous face boxes before scanning the full frame")
+    parser.add_argument("--headless", action="store_true",
+                        help="No window: process --source as fast as possible and print events")
+    parser.add_argument("--source", default="0",
+                        help="Headless source: camera index, video file, image folder, RTSP URL or GStreamer pipeline")
+    parser.add_argument("--max-frames", type=int, default=None,
+                        help="Headless: stop after this many frames")
+    parser.add_argument("--vote", action="store_true",
+                        help="Decide identities over several frames per track before marking (implies --track)")
+    parser.add_argument("--vote-window", type=int, default=5,
+                        help="Most frames to collect per track before deciding")
+    parser.add_argument("--vote-min-frames", type=int, default=2,
+                        help="Fewest frames a decision may be based on")
+    parser.add_argument("--vote-confidence", type=float, default=1.64,
+                        help="Confidence bound width in standard errors (higher: more frames, fewer mistakes)")
+    parser.add_argument("--adaptive-scale", action="store_true",
+                        help="Pick the detection resolution from the face sizes seen instead of the profile's fixed scale")
+    parser.add_argument("--min-face", type=int, default=None,
+                        help="Smallest face height (pixels) this camera must detect (implies --adaptive-scale, "
+                             "env MIN_FACE_PX, default 160)")
+    parser.add_argument("--detect-budget-ms", type=float, default=None,
+                        help="Detection time budget per frame; lower resolution is used to stay within it "
+                             "(implies --adaptive-scale)")
+    parser.add_argument("--scale-log", default=None,
+                        help="Append every scale decision, face sizes and detection time to this CSV "
+                             "(implies --adaptive-scale)")
+    parser.add_argument("--metrics-port", type=int, default=os.environ.get('METRICS_PORT'),
+                        help="Serve Prometheus metrics on http://127.0.0.1:<port>/metrics")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                        help="Recognition profile: detector, landmarks, jitters, scale and threshold "
+                             "(env RECOGNITION_PROFILE, default balanced)")
+    args = parser.parse_args()
+    if args.profile:
+        PROFILE = get_profile(args.profile)
+    print(f"Recognition profile: {PROFILE.name} ({PROFILE.detector}, {PROFILE.landmarks} landmarks, "
+          f"scale {PROFILE.scale}, threshold {PROFILE.threshold})")
+    voting = None
+    if args.vote:
+        voting = {'window': args.vote_window, 'min_frames': args.vote_min_frames,
+                  'z': args.vote_confidence, 'threshold': PROFILE.threshold}
+    scaling = None
+    if args.adaptive_scale or args.min_face or args.detect_budget_ms or args.scale_log:
+        scaling = {'budget_ms': args.detect_budget_ms, 'log_path': args.scale_log}
+        if args.min_face:
+            scaling['min_face'] = args.min_face
+    if args.headless:
+        run_headless(args.source, multi_face=args.multi_face, track=args.track,
+                     motion_gate=args.motion_gate,
+                     motion_sensitivity=args.motion_sensitivity,
+                     motion_recheck=args.motion_recheck,
+                     roi=args.roi, max_frames=args.max_frames,
+                     metrics_port=args.metrics_port, voting=voting, scaling=scaling)
+    else:
+        run_attendance_window(multi_face=args.multi_face, threaded=args.threaded,
+                              workers=args.workers, track=args.track,
+                              motion_gate=args.motion_gate,
+                              motion_sensitivity=args.motion_sensitivity,
+                              motion_recheck=args.motion_recheck,
+                              roi=args.roi, metrics_port=args.metrics_port, voting=voting,
+                              scaling=scaling)
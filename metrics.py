@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets, from a fast match
+# up to a slow CNN detection on a Jetson
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and per-stage latency histograms for the
+    recognition loop, rendered in the Prometheus text format.
+
+    Counters also keep a rolling window of recent increments so the current
+    per-second rate (e.g. frames processed vs camera fps) can be read without
+    a Prometheus server doing rate() over scrapes.
+
+    args:
+    prefix: prepended to every metric name
+    window: seconds covered by the rolling rates
+    """
+
+    def __init__(self, prefix='attendance', window=10.0, buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.window = window
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._recent = {}
+        self._gauges = {}
+        self._stages = {}
+        self._collectors = {}
+        self._help = {}
+        self.started = time.time()
+
+    def inc(self, name, amount=1):
+        """Add amount to a counter (created on first use)."""
+        if amount <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+            recent = self._recent.setdefault(name, deque())
+            recent.append((now, amount))
+            while recent and recent[0][0] < now - self.window:
+                recent.popleft()
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, stage, seconds):
+        """Record one stage latency in seconds."""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def add_collector(self, name, fn, kind='gauge', help_text=''):
+        """Read a value from fn() at scrape time, e.g. queue depth or a counter kept elsewhere."""
+        with self._lock:
+            self._collectors[name] = (fn, kind)
+            if help_text:
+                self._help[name] = help_text
+
+    def describe(self, name, help_text):
+        with self._lock:
+            self._help[name] = help_text
+
+    def rate(self, name):
+        """Per-second rate of a counter over the rolling window."""
+        now = time.time()
+        with self._lock:
+            recent = self._recent.get(name, ())
+            total = sum(amount for stamp, amount in recent if stamp >= now - self.window)
+        span = min(self.window, max(now - self.started, 1e-6))
+        return total / span
+
+    def snapshot(self):
+        """Plain dict of every counter, gauge, rolling rate and stage summary."""
+        rates = {name: round(self.rate(name), 3) for name in list(self._counters)}
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'rates': rates,
+                'stages': {stage: {'count': h.count,
+                                   'avg_ms': (h.sum / h.count * 1000.0) if h.count else 0.0}
+                           for stage, h in self._stages.items()},
+            }
+
+    def _collect(self):
+        values = {}
+        for name, (fn, kind) in list(self._collectors.items()):
+            try:
+                values[name] = (kind, float(fn()))
+            except Exception:
+                continue
+        return values
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        p = self.prefix
+        collected = self._collect()
+        rates = {name: self.rate(name) for name in list(self._counters)}
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = f"{p}_{name}_total"
+                if name in self._help:
+                    lines.append(f"# HELP {metric} {self._help[name]}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+            for name, value in sorted(rates.items()):
+                metric = f"{p}_{name}_per_second"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value:.6g}")
+            gauges = dict((name, ('gauge', value)) for name, value in self._gauges.items())
+            gauges.update(collected)
+            for name, (kind, value) in sorted(gauges.items()):
+                metric = f"{p}_{name}" + ("_total" if kind == 'counter' else "")
+                if name in self._help:
+                    lines.append(f"# HELP {metric} {self._help[name]}")
+                lines.append(f"# TYPE {metric} {kind}")
+                lines.append(f"{metric} {value:.6g}")
+            if self._stages:
+                metric = f"{p}_stage_seconds"
+                lines.append(f"# HELP {metric} Time spent in each recognition stage")
+                lines.append(f"# TYPE {metric} histogram")
+                for stage, histogram in sorted(self._stages.items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.count}')
+            lines.append(f"# TYPE {p}_uptime_seconds gauge")
+            lines.append(f"{p}_uptime_seconds {time.time() - self.started:.1f}")
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(registry, port=9100, host='127.0.0.1'):
+    """
+    Serve registry.render() on http://host:port/metrics from a daemon thread.
+
+    returns: the running ThreadingHTTPServer (call shutdown() to stop it)
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes every few seconds would flood the console
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap frame-differencing gate in front of the face detector.
+
+    Each frame is shrunk to a tiny grayscale thumbnail and compared with the
+    previous one. The detector only runs when enough pixels changed, when
+    faces were visible on the last detection (people standing still must
+    stay recognized), or when recheck_interval seconds passed since the last
+    detection.
+
+    args:
+    sensitivity: fraction of thumbnail pixels that must change to count as motion
+    pixel_threshold: per-pixel gray level difference that counts as a change
+    recheck_interval: force a detection at least this often (seconds)
+    size: thumbnail (width, height) used for differencing
+
+    One gate may be shared by several pipeline workers; its state is updated
+    under a lock.
+    """
+
+    def __init__(self, sensitivity=0.01, pixel_threshold=25, recheck_interval=2.0, size=(80, 60)):
+        self.sensitivity = sensitivity
+        self.pixel_threshold = pixel_threshold
+        self.recheck_interval = recheck_interval
+        self.size = size
+        self._previous = None
+        self._last_detect = 0.0
+        self._faces_present = False
+        self._lock = threading.Lock()
+        self.stats = {'frames': 0, 'gated': 0, 'motion': 0, 'rechecks': 0, 'faces_held': 0}
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _fraction(self, thumb):
+        # Caller holds the lock
+        previous, self._previous = self._previous, thumb
+        if previous is None:
+            return 1.0
+        diff = cv2.absdiff(thumb, previous)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+
+    def motion_fraction(self, frame):
+        """Fraction of thumbnail pixels that changed since the previous frame."""
+        thumb = self._thumbnail(frame)
+        with self._lock:
+            return self._fraction(thumb)
+
+    def should_detect(self, frame, now=None):
+        """Return True when the detector should run on this frame."""
+        now = time.time() if now is None else now
+        thumb = self._thumbnail(frame)
+        with self._lock:
+            self.stats['frames'] += 1
+            fraction = self._fraction(thumb)
+            if fraction >= self.sensitivity:
+                self.stats['motion'] += 1
+            elif self._faces_present:
+                self.stats['faces_held'] += 1
+            elif now - self._last_detect >= self.recheck_interval:
+                self.stats['rechecks'] += 1
+            else:
+                self.stats['gated'] += 1
+                return False
+            self._last_detect = now
+            return True
+
+    def record_detection(self, face_count):
+        """Tell the gate how many faces the detector found on the last pass."""
+        with self._lock:
+            self._faces_present = face_count > 0
+
+    def gated_ratio(self):
+        return self.stats['gated'] / self.stats['frames'] if self.stats['frames'] else 0.0
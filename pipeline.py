@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class DropOldestQueue:
+    """
+    Bounded queue that never blocks the producer: when full, the oldest item
+    is discarded so consumers always work on recent frames.
+    """
+
+    def __init__(self, maxsize=2):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest queued item, or None on timeout / after close()."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+
+class StageStats:
+    """Thread-safe per-stage timing counters."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            self.max = max(self.max, seconds)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'avg_ms': (self.total / self.count * 1000.0) if self.count else 0.0,
+                'last_ms': self.last * 1000.0,
+                'max_ms': self.max * 1000.0,
+            }
+
+
+class RecognitionPipeline:
+    """
+    Staged capture -> recognition -> display pipeline.
+
+    - a capture thread reads the camera as fast as it delivers and feeds a
+      bounded drop-oldest queue, so a slow encode never leaves stale frames
+      sitting in the camera buffer
+    - one or more recognition workers run process_fn(frame) on queued frames
+      (dlib releases the GIL during detection and encoding)
+    - the caller's display loop pulls latest_frame() and latest_result() and
+      times itself with display_stats
+
+    process_fn must be thread-safe when workers > 1.
+    """
+
+    def __init__(self, cap, process_fn, queue_size=2, workers=1):
+        self.cap = cap
+        self.process_fn = process_fn
+        self.queue = DropOldestQueue(queue_size)
+        self.workers = workers
+        self.capture_stats = StageStats('capture')
+        self.recognition_stats = StageStats('recognition')
+        self.display_stats = StageStats('display')
+        self.running = False
+        self._threads = []
+        self._lock = threading.Lock()
+        self._frame = (0, None)
+        self._result = (0, None)
+        self.capture_failed = False
+
+    def start(self):
+        self.running = True
+        self._threads = [threading.Thread(target=self._capture_loop, name='capture', daemon=True)]
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._recognition_loop,
+                                                  name=f'recognition-{i}', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.queue.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2.0)
+        self._threads = []
+
+    def _capture_loop(self):
+        frame_id = 0
+        while self.running:
+            start = time.perf_counter()
+            success, frame = self.cap.read()
+            if not success:
+                self.capture_failed = True
+                self.running = False
+                self.queue.close()
+                break
+            frame_id += 1
+            self.capture_stats.record(time.perf_counter() - start)
+            with self._lock:
+                self._frame = (frame_id, frame)
+            self.queue.put((frame_id, frame))
+
+    def _recognition_loop(self):
+        while self.running:
+            item = self.queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_id, frame = item
+            with self.recognition_stats.time():
+                result = self.process_fn(frame)
+            with self._lock:
+                # Workers can finish out of order; never replace a newer result
+                if frame_id > self._result[0]:
+                    self._result = (frame_id, result)
+
+    def latest_frame(self):
+        """(frame_id, frame) for the freshest captured frame."""
+        with self._lock:
+            return self._frame
+
+    def latest_result(self):
+        """(frame_id, result) for the most recent recognition output."""
+        with self._lock:
+            return self._result
+
+    def stats(self):
+        """Queue depth, drop count and per-stage timings."""
+        return {
+            'queue_depth': self.queue.depth,
+            'frames_captured': self.queue.put_count,
+            'frames_dropped': self.queue.dropped,
+            'capture': self.capture_stats.snapshot(),
+            'recognition': self.recognition_stats.snapshot(),
+            'display': self.display_stats.snapshot(),
+        }
@@ -0,0 +1,459 @@
+"""
+Long-running recognition daemon.
+
+Loads the face detector and the gallery once and keeps them in memory, so
+the API and the dashboard no longer pay for a fresh Python + dlib start and
+a full gallery encode on every request. Both talk to it over a small JSON
+control interface bound to localhost:
+
+    GET  /status            camera state, gallery size, last recognition, counters
+    POST /camera/start      {"source": "0", "window": true}  start continuous recognition
+    POST /camera/stop       stop continuous recognition and release the camera
+    POST /recognize         {"timeout": 5}  recognize the people in front of the camera now
+    POST /gallery/reload    apply Attendance_data changes now (also polled in the background)
+    GET  /metrics           Prometheus metrics of the recognition loop
+
+Usage:
+    python recognition_daemon.py [--port 8765] [--start-camera] [--window]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import fcntl
+except ImportError:  # Windows: the daemon's port bind still refuses duplicates
+    fcntl = None
+
+from recognition_profiles import PROFILES
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = int(os.environ.get('DAEMON_PORT', 8765))
+DEFAULT_URL = os.environ.get('DAEMON_URL', f"http://127.0.0.1:{DEFAULT_PORT}")
+WINDOW_NAME = 'Attendance System'
+
+
+def _faces_to_json(result):
+    if result is None:
+        return []
+    return [{'name': name, 'status': status, 'box': [int(c) for c in faceLoc]}
+            for faceLoc, name, status in result['faces']]
+
+
+class RecognitionDaemon:
+    """
+    Holds the models, gallery and (optionally) a running camera pipeline.
+
+    args:
+    multi_face / track / motion_gate / roi / voting / scaling: same meaning as in main.py,
+        used for continuous recognition while the camera is started
+    workers: recognition worker threads for the camera pipeline
+    """
+
+    def __init__(self, multi_face=False, track=False, motion_gate=False, roi=False, workers=1,
+                 voting=None, scaling=None):
+        # Imported here so the client half of this module stays dependency-free
+        import main
+        self.main = main
+        if voting is not None:
+            # Decide with the same threshold as single-frame matching
+            voting = dict({'threshold': main.PROFILE.threshold}, **voting)
+        self.options = {'multi_face': multi_face, 'track': track or voting is not None,
+                        'motion_gate': motion_gate, 'roi': roi, 'voting': voting,
+                        'scaling': scaling}
+        self.workers = workers
+        self.started = time.time()
+        self._lock = threading.RLock()
+        self.face_detector = main._init_face_detector()
+        self.gallery = main._load_gallery('Attendance_data', main.GALLERY_WATCH_INTERVAL)
+        self.pipeline = None
+        self.cap = None
+        self.source = None
+        self.window = False
+        self.last_recognition = None
+        self.requests = 0
+
+    # -- camera control -------------------------------------------------
+
+    def _open(self, source):
+        if source is None or source == '':
+            return self.main.open_camera()
+        return self.main.open_source(source)
+
+    def start_camera(self, source=None, window=False):
+        """Start continuous recognition. Returns (ok, message)."""
+        main = self.main
+        with self._lock:
+            if self.pipeline is not None and self.pipeline.running:
+                self.window = self.window or window
+                return False, "Camera is already running"
+            try:
+                cap = self._open(source)
+            except IOError as e:
+                return False, str(e)
+            if cap is None:
+                return False, "Could not open any camera"
+            tracker = main.FaceTracker(voting=self.options['voting']) if self.options['track'] else None
+            gate = main.MotionGate() if self.options['motion_gate'] else None
+            roi_detector = main.ROIDetector() if self.options['roi'] else None
+            scaling = self.options['scaling']
+            scaler = main.ScaleController(**scaling) if scaling is not None else None
+            gallery = self.gallery
+            face_detector = self.face_detector
+            multi_face = self.options['multi_face']
+
+            def process_frame(frame):
+                with main.metrics.time('frame'):
+                    return main._recognize_frame(frame, gallery, face_detector, multi_face,
+                                                 tracker, gate, roi_detector, scaler)
+
+            self.cap = cap
+            self.source = source
+            self.window = window
+            self.pipeline = main.RecognitionPipeline(cap, process_frame, queue_size=2,
+                                                     workers=self.workers)
+            pipeline = self.pipeline
+            main.metrics.add_collector('frames_read', lambda: pipeline.queue.put_count, 'counter')
+            main.metrics.add_collector('frames_dropped', lambda: pipeline.queue.dropped, 'counter')
+            main.metrics.add_collector('queue_depth', lambda: pipeline.queue.depth)
+            pipeline.start()
+            print(f"Camera started ({source or 'default camera'})")
+            return True, "Camera started"
+
+    def stop_camera(self):
+        """Stop continuous recognition and release the camera. Returns (ok, message)."""
+        with self._lock:
+            if self.pipeline is None:
+                return False, "Camera is not running"
+            self.pipeline.stop()
+            self.cap.release()
+            self.pipeline = None
+            self.cap = None
+            self.window = False
+            print("Camera stopped")
+            return True, "Camera stopped"
+
+    @property
+    def camera_running(self):
+        pipeline = self.pipeline
+        return pipeline is not None and pipeline.running
+
+    # -- requests -------------------------------------------------------
+
+    def recognize_once(self, timeout=5.0, source=None, warmup_frames=5):
+        """
+        Recognize whoever is in front of the camera and mark their attendance.
+
+        With the camera running this waits for the next recognition result
+        (one frame of latency). Otherwise the camera is opened, a few frames
+        are skipped while exposure settles, and one frame is recognized.
+
+        returns: dict with 'faces' (name/status/box), 'message' and 'elapsed_ms'
+        """
+        started = time.perf_counter()
+        self.requests += 1
+        result = None
+        if self.camera_running:
+            pipeline = self.pipeline
+            wanted = pipeline.latest_frame()[0]
+            deadline = time.time() + timeout
+            while time.time() < deadline and pipeline.running:
+                result_id, result = pipeline.latest_result()
+                if result_id > wanted:
+                    break
+                time.sleep(0.01)
+            else:
+                result = None
+        else:
+            with self._lock:
+                try:
+                    cap = self._open(source)
+                except IOError as e:
+                    return {'faces': [], 'message': str(e), 'error': True}
+                if cap is None:
+                    return {'faces': [], 'message': "Could not open any camera", 'error': True}
+                try:
+                    frame = None
+                    deadline = time.time() + timeout
+                    for _ in range(warmup_frames):
+                        success, img = cap.read()
+                        if success:
+                            frame = img
+                        if time.time() > deadline:
+                            break
+                finally:
+                    cap.release()
+                if frame is not None:
+                    result = self.main._recognize_frame(frame, self.gallery, self.face_detector,
+                                                        self.options['multi_face'])
+
+        response = {
+            'faces': _faces_to_json(result),
+            'message': result['message'][0] if result and result['message'] else None,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 1),
+        }
+        if result is None:
+            response['message'] = "No frame recognized before timeout"
+            response['error'] = True
+        self.last_recognition = dict(response, time=time.time())
+        return response
+
+    def reload_gallery(self):
+        """Apply Attendance_data changes now instead of waiting for the next poll."""
+        changes = self.gallery.refresh()
+        return dict(changes, encodings=len(self.gallery), identities=self.gallery.num_identities)
+
+    def status(self):
+        pipeline = self.pipeline
+        return {
+            'camera_running': self.camera_running,
+            'source': self.source,
+            'window': self.window,
+            'profile': self.main.PROFILE.name,
+            'gallery': dict(self.gallery.stats, encodings=len(self.gallery),
+                            identities=self.gallery.num_identities),
+            'pipeline': pipeline.stats() if pipeline is not None else None,
+            'last_recognition': self.last_recognition,
+            'requests': self.requests,
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'pid': os.getpid(),
+            'metrics': self.main.metrics.snapshot(),
+        }
+
+    # -- main thread ----------------------------------------------------
+
+    def run_display(self, stop_event):
+        """
+        Main-thread loop: OpenCV windows must be driven from the main thread,
+        so the live view for window=True runs here while HTTP requests are
+        handled on server threads.
+        """
+        import cv2
+        shown = False
+        last_shown = 0
+        while not stop_event.is_set():
+            pipeline = self.pipeline
+            if pipeline is not None and not pipeline.running and pipeline.capture_failed:
+                print("Camera stopped delivering frames")
+                self.stop_camera()
+                continue
+            if pipeline is None or not self.window:
+                if shown:
+                    cv2.destroyAllWindows()
+                    shown = False
+                time.sleep(0.05)
+                continue
+            frame_id, frame = pipeline.latest_frame()
+            if frame is None or frame_id == last_shown:
+                if cv2.waitKey(1) & 0xFF == 27:
+                    self.stop_camera()
+                continue
+            last_shown = frame_id
+            img = frame.copy()
+            _, result = pipeline.latest_result()
+            if result is not None:
+                self.main._draw_result(img, result)
+            cv2.imshow(WINDOW_NAME, img)
+            shown = True
+            if cv2.waitKey(1) & 0xFF == 27:
+                self.stop_camera()
+        if shown:
+            cv2.destroyAllWindows()
+
+
+def _make_handler(daemon):
+
+    class ControlHandler(BaseHTTPRequestHandler):
+        def _send(self, code, payload, content_type='application/json'):
+            if content_type == 'application/json':
+                body = json.dumps(payload, default=str).encode('utf-8')
+            else:
+                body = payload.encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            try:
+                return json.loads(self.rfile.read(length).decode('utf-8')) or {}
+            except ValueError:
+                return {}
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/status':
+                self._send(200, daemon.status())
+            elif path == '/metrics':
+                self._send(200, daemon.main.metrics.render(), 'text/plain; version=0.0.4')
+            else:
+                self._send(404, {'error': f"Unknown path {path}"})
+
+        def do_POST(self):
+            path = self.path.split('?')[0]
+            body = self._body()
+            try:
+                if path == '/camera/start':
+                    ok, message = daemon.start_camera(body.get('source'), bool(body.get('window')))
+                    self._send(200 if ok else 409, {'ok': ok, 'message': message})
+                elif path == '/camera/stop':
+                    ok, message = daemon.stop_camera()
+                    self._send(200 if ok else 409, {'ok': ok, 'message': message})
+                elif path == '/recognize':
+                    result = daemon.recognize_once(float(body.get('timeout', 5.0)), body.get('source'))
+                    self._send(503 if result.get('error') else 200, result)
+                elif path == '/gallery/reload':
+                    self._send(200, daemon.reload_gallery())
+                else:
+                    self._send(404, {'error': f"Unknown path {path}"})
+            except Exception as e:
+                print(f"Error handling {path}: {e}")
+                self._send(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ControlHandler
+
+
+def serve(port=DEFAULT_PORT, host='127.0.0.1', start_camera=False, source=None, window=False,
+          **options):
+    """Run the daemon until interrupted."""
+    # Bind before loading anything: a second daemon (e.g. two clients starting
+    # one at once) fails here instead of after loading and publishing the gallery
+    try:
+        server = ThreadingHTTPServer((host, port), BaseHTTPRequestHandler)
+    except OSError as e:
+        print(f"Recognition daemon not started: {host}:{port} is in use ({e})")
+        return
+    try:
+        daemon = RecognitionDaemon(**options)
+    except BaseException:
+        server.server_close()
+        raise
+    server.RequestHandlerClass = _make_handler(daemon)
+    threading.Thread(target=server.serve_forever, name='daemon-http', daemon=True).start()
+    print(f"Recognition daemon listening on http://{host}:{port}")
+    if start_camera:
+        print(daemon.start_camera(source, window)[1])
+    stop_event = threading.Event()
+    try:
+        daemon.run_display(stop_event)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        if daemon.pipeline is not None:
+            daemon.stop_camera()
+        server.shutdown()
+
+
+class DaemonClient:
+    """
+    Client for the daemon's control interface (stdlib only, usable from the
+    API and the dashboard without importing cv2 or dlib).
+    """
+
+    def __init__(self, url=DEFAULT_URL, timeout=10.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None, timeout=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            # Conflicts and recognition misses still carry a JSON body
+            return json.loads(e.read().decode('utf-8') or '{}')
+
+    def is_running(self):
+        try:
+            self._request('GET', '/status', timeout=1.0)
+            return True
+        except Exception:
+            return False
+
+    def status(self):
+        return self._request('GET', '/status')
+
+    def start_camera(self, source=None, window=False):
+        return self._request('POST', '/camera/start', {'source': source, 'window': window})
+
+    def stop_camera(self):
+        return self._request('POST', '/camera/stop', {})
+
+    def recognize_once(self, timeout=5.0):
+        return self._request('POST', '/recognize', {'timeout': timeout}, timeout=timeout + 5.0)
+
+    def reload_gallery(self):
+        return self._request('POST', '/gallery/reload', {}, timeout=300.0)
+
+    def ensure_running(self, startup_timeout=120.0):
+        """
+        Start the daemon in the background if nothing answers at self.url.
+        Only the very first call pays for loading dlib and the gallery.
+
+        returns: True once the daemon answers
+        """
+        if self.is_running():
+            return True
+        port = self.url.rsplit(':', 1)[-1]
+        # One spawner at a time per port: concurrent callers wait here and
+        # then find the daemon the first one started
+        with open(os.path.join(ROOT_DIR, f'.recognition_daemon_{port}.lock'), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.is_running():
+                return True
+            subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, 'recognition_daemon.py'),
+                              '--port', port], cwd=ROOT_DIR)
+            deadline = time.time() + startup_timeout
+            while time.time() < deadline:
+                if self.is_running():
+                    return True
+                time.sleep(0.5)
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-running face recognition daemon")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--host", default='127.0.0.1',
+                        help="Control interface address (keep it local, it has no authentication)")
+    parser.add_argument("--start-camera", action="store_true", help="Start recognition right away")
+    parser.add_argument("--source", default=None, help="Video source instead of the default camera")
+    parser.add_argument("--window", action="store_true", help="Show the live OpenCV window")
+    parser.add_argument("--multi-face", action="store_true")
+    parser.add_argument("--track", action="store_true")
+    parser.add_argument("--motion-gate", action="store_true")
+    parser.add_argument("--roi", action="store_true")
+    parser.add_argument("--vote", action="store_true",
+                        help="Decide identities over several frames per track (default window 5)")
+    parser.add_argument("--min-face", type=int, default=None,
+                        help="Adapt the detection resolution to faces of at least this height (pixels)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                        help="Recognition profile fast / balanced / accurate (env RECOGNITION_PROFILE)")
+    args = parser.parse_args()
+    if args.profile:
+        # main reads the profile from the environment when the daemon imports it
+        os.environ['RECOGNITION_PROFILE'] = args.profile
+    serve(args.port, args.host, args.start_camera, args.source, args.window,
+          multi_face=args.multi_face, track=args.track, motion_gate=args.motion_gate,
+          roi=args.roi, workers=args.workers,
+          voting={'window': 5, 'min_frames': 2} if args.vote else None,
+          scaling={'min_face': args.min_face} if args.min_face else None)
@@ -0,0 +1,44 @@
+import os
+from collections import namedtuple
+
+# detector:       face_recognition face_locations model ("hog" on CPU, "cnn" needs dlib with CUDA to be fast)
+# landmarks:      face_encodings landmark model: "small" (5 points, faster) or "large" (68 points)
+# num_jitters:    re-samples per live encode (each one costs a full encode)
+# enroll_jitters: re-samples per gallery image; paid once per image, so it can be higher
+# upsample:       HOG/CNN upsample passes on the downscaled frame
+# scale:          downscale factor before detection (the starting scale for still images)
+# threshold:      largest match distance accepted as the same person
+RecognitionProfile = namedtuple('RecognitionProfile', [
+    'name', 'detector', 'landmarks', 'num_jitters', 'enroll_jitters', 'upsample', 'scale',
+    'threshold'])
+
+PROFILES = {
+    # Faces of roughly 210 px and up (80 px HOG window / 0.375), 5-point alignment
+    'fast': RecognitionProfile('fast', 'hog', 'small', 1, 1, 0, 0.375, 0.4),
+    # The original settings: 0.25 downscale with one upsample (faces of 160 px and up)
+    'balanced': RecognitionProfile('balanced', 'hog', 'large', 1, 1, 1, 0.25, 0.4),
+    # CNN detector at half resolution, jittered encodings and a stricter threshold,
+    # since averaged encodings vary less between images of the same person
+    'accurate': RecognitionProfile('accurate', 'cnn', 'large', 2, 10, 1, 0.5, 0.38),
+}
+
+
+def get_profile(name=None):
+    """
+    The RecognitionProfile called name (default: RECOGNITION_PROFILE or "balanced").
+
+    raises ValueError for unknown names
+    """
+    name = name or os.environ.get('RECOGNITION_PROFILE', 'balanced')
+    if name not in PROFILES:
+        raise ValueError(f"Unknown recognition profile {name!r}, choose from {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def store_model(profile, use_gpu=False):
+    """
+    Model key for the EncodingStore: encodings from different detectors,
+    landmark models or jitter counts are not interchangeable.
+    """
+    detector = "cnn" if use_gpu else profile.detector
+    return f"{detector}/{profile.landmarks}/j{profile.enroll_jitters}"
@@ -0,0 +1,118 @@
+import threading
+
+import cv2
+import face_recognition
+
+
+class ROIDetector:
+    """
+    HOG face detection that searches around the previous face boxes first.
+
+    When faces were found recently, the union of their boxes (expanded by
+    `expand` box sizes on each side) is cropped from the full-resolution
+    frame and scanned at roi_scale, which is finer than the full-frame scale
+    so small faces are easier to find. The ROI scale is capped so a ROI scan
+    never costs more pixels than a full-frame scan. A full-frame scan runs
+    every full_scan_interval frames and whenever the ROI comes up empty.
+
+    Boxes are always returned in the coordinates of the downscaled frame
+    (the same ones face_locations on rgb_small would give), so overlays and
+    face_encodings(rgb_small, boxes) work unchanged.
+
+    scale, upsample (the HOG upsample count of full-frame scans) and model
+    may be given per call to detect, e.g. by a ScaleController, instead of
+    changing the detector's defaults. One detector may be shared by several
+    pipeline workers: the ROI state is updated under a lock and the scans
+    themselves run outside it.
+    """
+
+    def __init__(self, scale=0.25, roi_scale=0.5, expand=0.5, full_scan_interval=15, model="hog",
+                 upsample=1):
+        self.scale = scale
+        self.upsample = upsample
+        self.roi_scale = roi_scale
+        self.expand = expand
+        self.full_scan_interval = full_scan_interval
+        self.model = model
+        self._last_boxes = []  # full-resolution (top, right, bottom, left)
+        self._since_full = 0
+        self._lock = threading.Lock()
+        self.stats = {'full_scans': 0, 'roi_scans': 0, 'roi_hits': 0, 'roi_misses': 0}
+
+    def _roi(self, shape, last_boxes):
+        """Expanded union of last_boxes, clipped to the frame: (top, right, bottom, left)."""
+        height, width = shape[:2]
+        top = min(b[0] for b in last_boxes)
+        right = max(b[1] for b in last_boxes)
+        bottom = max(b[2] for b in last_boxes)
+        left = min(b[3] for b in last_boxes)
+        pad_y = int((bottom - top) * self.expand)
+        pad_x = int((right - left) * self.expand)
+        return (max(0, top - pad_y), min(width, right + pad_x),
+                min(height, bottom + pad_y), max(0, left - pad_x))
+
+    def _scan_roi(self, img, last_boxes, scale, upsample, model):
+        top, right, bottom, left = self._roi(img.shape, last_boxes)
+        roi_area = max(1, (right - left) * (bottom - top))
+        frame_area = img.shape[0] * img.shape[1]
+        # Never spend more pixels on the ROI than a full-frame scan would: HOG
+        # sees (scale * 2^upsample)^2 pixels per frame pixel, and the ROI scan
+        # uses the same upsample
+        full_cost = scale * 2 ** upsample * (frame_area / roi_area) ** 0.5
+        roi_scale = min(self.roi_scale, full_cost / 2 ** upsample)
+        crop = img[top:bottom, left:right]
+        small_crop = cv2.resize(crop, (0, 0), fx=roi_scale, fy=roi_scale)
+        rgb_crop = cv2.cvtColor(small_crop, cv2.COLOR_BGR2RGB)
+        found = face_recognition.face_locations(rgb_crop, number_of_times_to_upsample=upsample,
+                                                model=model)
+        # Map crop coordinates back to full resolution
+        return [(int(t / roi_scale) + top, int(r / roi_scale) + left,
+                 int(b / roi_scale) + top, int(l / roi_scale) + left)
+                for t, r, b, l in found]
+
+    def detect(self, img, scale=None, upsample=None, model=None):
+        """
+        Find faces in a full-resolution BGR frame.
+
+        args:
+        scale, upsample, model: this call's detection settings (default the detector's own)
+        returns: (rgb_small, boxes) with boxes in downscaled-frame coordinates
+        """
+        scale = self.scale if scale is None else scale
+        upsample = self.upsample if upsample is None else upsample
+        model = model or self.model
+        small_frame = cv2.resize(img, (0, 0), fx=scale, fy=scale)
+        rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+
+        with self._lock:
+            last_boxes = self._last_boxes
+            try_roi = bool(last_boxes) and self._since_full < self.full_scan_interval
+            if try_roi:
+                self.stats['roi_scans'] += 1
+
+        full_boxes = []
+        if try_roi:
+            full_boxes = self._scan_roi(img, last_boxes, scale, upsample, model)
+            with self._lock:
+                if full_boxes:
+                    self.stats['roi_hits'] += 1
+                    self._since_full += 1
+                else:
+                    self.stats['roi_misses'] += 1
+
+        if not full_boxes:
+            with self._lock:
+                self.stats['full_scans'] += 1
+                self._since_full = 0
+            found = face_recognition.face_locations(rgb_small,
+                                                    number_of_times_to_upsample=upsample,
+                                                    model=model)
+            full_boxes = [tuple(int(c / scale) for c in box) for box in found]
+
+        with self._lock:
+            self._last_boxes = full_boxes
+        small_h, small_w = rgb_small.shape[:2]
+        boxes = [(max(0, int(t * scale)), min(small_w, int(r * scale)),
+                  min(small_h, int(b * scale)), max(0, int(l * scale)))
+                 for t, r, b, l in full_boxes]
+        return rgb_small, boxes
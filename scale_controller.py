@@ -0,0 +1,202 @@
+import csv
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import face_recognition
+
+# dlib's HOG detector slides an 80x80 window: faces smaller than this (in
+# detection-image pixels) are missed unless the image is upsampled
+HOG_FACE_PX = 80
+# Detection scales the controller may pick; a short list keeps resizes predictable
+SCALES = (0.125, 0.1875, 0.25, 0.375, 0.5, 0.75, 1.0)
+# Ladder for still images (enrollment, dashboard snapshots): cheapest first
+STILL_SCALES = (0.25, 0.5, 1.0)
+# The old fixed setting (fx=0.25 with face_locations' default upsample of 1)
+# finds faces down to 80 / (0.25 * 2) = 160 px, so that is the default target
+DEFAULT_MIN_FACE = int(os.environ.get('MIN_FACE_PX', 160))
+
+
+def still_scales(start=0.25):
+    """The still-image ladder beginning at start (e.g. an EncodingStore's scale)."""
+    return (start,) + tuple(s for s in STILL_SCALES if s > start)
+
+
+def locate_faces(img, scales=STILL_SCALES, model="hog", upsample=1):
+    """
+    Find faces in a still BGR image, trying the cheapest scale first and only
+    moving to larger ones when nothing was found.
+
+    returns: (rgb_small, boxes, scale) with boxes in rgb_small coordinates
+    """
+    rgb_small, boxes, scale = None, [], scales[0]
+    for scale in scales:
+        small = img if scale == 1.0 else cv2.resize(img, (0, 0), fx=scale, fy=scale)
+        rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        boxes = face_recognition.face_locations(rgb_small, number_of_times_to_upsample=upsample,
+                                                model=model)
+        if boxes:
+            break
+    return rgb_small, boxes, scale
+
+
+def encode_still(img, profile):
+    """
+    First 128-d face encoding of a still BGR image with a RecognitionProfile's
+    detector, landmark model and enrollment jitters, or None when no face is found.
+    """
+    rgb_small, boxes, _ = locate_faces(img, still_scales(profile.scale), model=profile.detector,
+                                       upsample=profile.upsample)
+    if not boxes:
+        return None
+    encodings = face_recognition.face_encodings(rgb_small, boxes[:1],
+                                                num_jitters=profile.enroll_jitters,
+                                                model=profile.landmarks)
+    return encodings[0] if len(encodings) > 0 else None
+
+
+class ScaleController:
+    """
+    Picks the HOG detection scale and upsample count for each video frame.
+
+    - baseline: just enough resolution to find faces of min_face pixels
+      (full-resolution height), the per-camera target
+    - observed: while faces are in view, only enough for the smallest of the
+      recently seen faces (with `margin` headroom), which is much cheaper
+      when people stand close; any frame without faces, and every
+      baseline_interval frames, goes back to the baseline so newcomers
+      further away are not missed
+    - budget: when budget_ms is set and the predicted detection time (from
+      a running ms-per-pixel estimate) is over it, step down to the largest
+      configuration that fits, trading small-face recall for frame rate
+
+    Every decision can be appended to a CSV log (log_path) together with the
+    faces found and the detection time, to measure recall against CPU cost.
+
+    args:
+    min_face: smallest face height (full-resolution px) that must be detectable
+    budget_ms: detection time budget per frame, None for no limit
+    margin: headroom on observed face sizes (0.8: keep faces 20% smaller detectable)
+    history: number of recent detections with faces considered
+    baseline_interval: force a baseline-scale detection at least this often (frames)
+    max_upsample: most HOG upsampling passes for faces smaller than the frame allows
+    min_scale: never detect below this scale (e.g. when landmarks need detail)
+    """
+
+    def __init__(self, min_face=DEFAULT_MIN_FACE, budget_ms=None, margin=0.8, history=15,
+                 baseline_interval=30, max_upsample=2, min_scale=None, log_path=None):
+        self.min_face = min_face
+        self.scales = tuple(s for s in SCALES if min_scale is None or s >= min_scale) or (1.0,)
+        self.budget_ms = budget_ms
+        self.margin = margin
+        self.baseline_interval = baseline_interval
+        self.max_upsample = max_upsample
+        self._recent = deque(maxlen=history)
+        self._since_baseline = 0
+        self._ms_per_px = None
+        # Recognition workers may share one controller: the configuration a
+        # detection used is passed back to record() by the caller, and only
+        # the log's reason column is kept per thread
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'frames': 0, 'baseline': 0, 'observed': 0, 'budget': 0,
+                      'faces': 0, 'detect_ms_total': 0.0, 'pixels_total': 0}
+        self._log_file = None
+        self._log = None
+        if log_path:
+            new_file = not os.path.exists(log_path)
+            self._log_file = open(log_path, 'a', newline='')
+            self._log = csv.writer(self._log_file)
+            if new_file:
+                self._log.writerow(['time', 'width', 'height', 'scale', 'upsample', 'reason',
+                                    'faces', 'min_face_px', 'max_face_px', 'detect_ms'])
+
+    def _config(self, effective):
+        """(scale, upsample) for an effective scale (scale * 2**upsample)."""
+        if effective <= 1.0:
+            for scale in self.scales:
+                if scale >= effective:
+                    return scale, 0
+            return 1.0, 0
+        upsample = min(self.max_upsample, int(math.ceil(math.log2(effective))))
+        return 1.0, upsample
+
+    @staticmethod
+    def _pixels(shape, scale, upsample):
+        return int(shape[0] * scale) * int(shape[1] * scale) * (4 ** upsample)
+
+    def predicted_ms(self, shape, scale, upsample):
+        if self._ms_per_px is None:
+            return 0.0
+        return self._ms_per_px * self._pixels(shape, scale, upsample)
+
+    def choose(self, shape):
+        """(scale, upsample) for a frame of the given shape."""
+        with self._lock:
+            return self._choose(shape)
+
+    def _choose(self, shape):
+        self.stats['frames'] += 1
+        self._since_baseline += 1
+        effective = HOG_FACE_PX / float(self.min_face)
+        reason = 'baseline'
+        if self._recent and self._since_baseline < self.baseline_interval:
+            observed = HOG_FACE_PX / (self.margin * min(self._recent))
+            if observed < effective:
+                effective, reason = observed, 'observed'
+        if reason == 'baseline':
+            self._since_baseline = 0
+        scale, upsample = self._config(effective)
+
+        if self.budget_ms is not None and self.predicted_ms(shape, scale, upsample) > self.budget_ms:
+            # Largest configuration that still fits the budget
+            options = [(1.0, u) for u in range(upsample - 1, 0, -1)] if upsample else []
+            options += [(s, 0) for s in reversed(self.scales) if s < scale or upsample]
+            for scale, upsample in options:
+                if self.predicted_ms(shape, scale, upsample) <= self.budget_ms:
+                    break
+            reason = 'budget'
+        self.stats[reason] += 1
+        self._local.reason = reason
+        return scale, upsample
+
+    def record(self, shape, boxes_full, seconds, scale, upsample):
+        """
+        Feed back one detection.
+
+        args:
+        boxes_full: detected (top, right, bottom, left) boxes in full-resolution pixels
+        seconds: time the detection took
+        scale, upsample: the configuration choose() returned for this detection
+        """
+        reason = getattr(self._local, 'reason', '')
+        with self._lock:
+            self._record(shape, boxes_full, seconds, scale, upsample, reason)
+
+    def _record(self, shape, boxes_full, seconds, scale, upsample, reason):
+        heights = [bottom - top for top, _, bottom, _ in boxes_full]
+        if heights:
+            self._recent.append(min(heights))
+        else:
+            # Nobody in view: the next person may be further away
+            self._recent.clear()
+        pixels = self._pixels(shape, scale, upsample)
+        if pixels and seconds > 0:
+            rate = seconds * 1000.0 / pixels
+            self._ms_per_px = rate if self._ms_per_px is None else 0.8 * self._ms_per_px + 0.2 * rate
+        self.stats['faces'] += len(heights)
+        self.stats['detect_ms_total'] += seconds * 1000.0
+        self.stats['pixels_total'] += pixels
+        if self._log is not None:
+            self._log.writerow([round(time.time(), 3), shape[1], shape[0], scale, upsample, reason,
+                                len(heights), min(heights) if heights else '',
+                                max(heights) if heights else '', round(seconds * 1000.0, 2)])
+
+    def close(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+            self._log = None
@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from face_gallery import Gallery
+
+# Absolute, so main.py, the API and the dashboard (which run from different
+# working directories) all find the same published gallery
+SHARED_GALLERY_DIR = os.environ.get(
+    'SHARED_GALLERY_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'encoding_cache', 'shared'))
+POINTER = 'current.json'
+
+
+def publish_gallery(encodings, names, directory=SHARED_GALLERY_DIR, keep=3, profile=None):
+    """
+    Publish a gallery for other processes to memory-map.
+
+    Each version is a directory of .npy files (matrix grouped by identity,
+    squared norms, identity id per row) plus index.json with the identity
+    names. The current.json pointer is swapped with os.replace only after the
+    version is complete, so readers never see a half-written gallery.
+    Older versions beyond `keep` are deleted; processes that still map them
+    keep working (POSIX) and switch on their next check. profile names the
+    recognition profile the encodings were made with, so readers can encode
+    their probes the same way.
+
+    returns: the new version number
+    """
+    gallery = encodings if isinstance(encodings, Gallery) else Gallery(encodings, names)
+    os.makedirs(directory, exist_ok=True)
+    current = read_pointer(directory)
+    version = (current['version'] + 1) if current else 1
+    # Another publisher may have claimed this number since we read the pointer
+    while os.path.exists(os.path.join(directory, f"v{version:06d}")):
+        version += 1
+    version_dir = os.path.join(directory, f"v{version:06d}")
+    tmp_dir = version_dir + f".tmp{os.getpid()}"
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'matrix.npy'), np.asarray(gallery.matrix, dtype=np.float32))
+    np.save(os.path.join(tmp_dir, 'sq_norms.npy'), np.asarray(gallery.sq_norms, dtype=np.float32))
+    np.save(os.path.join(tmp_dir, 'ids.npy'), np.asarray(gallery.ids, dtype=np.int32))
+    with open(os.path.join(tmp_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'count': len(gallery),
+                   'identities': gallery.identities, 'created': time.time(),
+                   'profile': profile}, f)
+    os.replace(tmp_dir, version_dir)
+
+    pointer_tmp = os.path.join(directory, POINTER + f".tmp{os.getpid()}")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'path': os.path.basename(version_dir)}, f)
+    os.replace(pointer_tmp, os.path.join(directory, POINTER))
+
+    versions = sorted(d for d in os.listdir(directory)
+                      if d.startswith('v') and '.tmp' not in d)
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return version
+
+
+def read_pointer(directory=SHARED_GALLERY_DIR):
+    """The current {'version', 'path'} pointer, or None when nothing is published."""
+    try:
+        with open(os.path.join(directory, POINTER), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _map_version(directory, pointer):
+    version_dir = os.path.join(directory, pointer['path'])
+    with open(os.path.join(version_dir, 'index.json'), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    matrix = np.load(os.path.join(version_dir, 'matrix.npy'), mmap_mode='r')
+    sq_norms = np.load(os.path.join(version_dir, 'sq_norms.npy'), mmap_mode='r')
+    ids = np.load(os.path.join(version_dir, 'ids.npy'), mmap_mode='r')
+    gallery = Gallery.from_grouped(matrix.reshape(-1, 128), ids, index['identities'], sq_norms)
+    return gallery, index.get('profile')
+
+
+class SharedGallery:
+    """
+    Read-only view of the published gallery, memory-mapped so every process
+    shares the same page-cache copy of the encodings.
+
+    Checks the pointer file at most every check_interval seconds and maps
+    the new version when it changed; the swap is a single attribute
+    assignment, so concurrent matches see either the old or the new gallery.
+    Exposes the same match / best_match / identify API as Gallery.
+    """
+
+    def __init__(self, directory=SHARED_GALLERY_DIR, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.version = None
+        self.profile = None
+        self._gallery = Gallery()
+        self._pointer_mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @classmethod
+    def open(cls, directory=SHARED_GALLERY_DIR, check_interval=1.0):
+        """A SharedGallery for directory, or None when no gallery was published there."""
+        if read_pointer(directory) is None:
+            return None
+        return cls(directory, check_interval)
+
+    def refresh(self):
+        """Map the published version if it changed. Returns True when a new version was mapped."""
+        with self._lock:
+            self._checked = time.time()
+            try:
+                mtime = os.stat(os.path.join(self.directory, POINTER)).st_mtime_ns
+            except OSError:
+                return False
+            if mtime == self._pointer_mtime:
+                return False
+            pointer = read_pointer(self.directory)
+            if pointer is None or pointer['version'] == self.version:
+                self._pointer_mtime = mtime
+                return False
+            try:
+                gallery, profile = _map_version(self.directory, pointer)
+            except (OSError, ValueError, KeyError) as e:
+                # Version pruned between reading the pointer and mapping it; retry next check
+                print(f"Warning: Could not map shared gallery v{pointer['version']}: {e}")
+                return False
+            self._gallery = gallery
+            self.profile = profile
+            self.version = pointer['version']
+            self._pointer_mtime = mtime
+            return True
+
+    @property
+    def gallery(self):
+        if time.time() - self._checked >= self.check_interval:
+            self.refresh()
+        return self._gallery
+
+    def __len__(self):
+        return len(self.gallery)
+
+    @property
+    def num_identities(self):
+        return self.gallery.num_identities
+
+    @property
+    def matrix(self):
+        return self.gallery.matrix
+
+    @property
+    def names(self):
+        return self.gallery.names
+
+    def match(self, probes, k=1):
+        return self.gallery.match(probes, k)
+
+    def best_match(self, probe, threshold=0.4):
+        return self.gallery.best_match(probe, threshold)
+
+    def identify(self, probes, threshold=0.4):
+        return self.gallery.identify(probes, threshold)
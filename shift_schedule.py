@@ -0,0 +1,307 @@
+"""
+Shift schedule shared by every module that classifies attendance times.
+
+The schedule is data: shift windows (start, end, grace period, early check-in
+and checkout windows) plus a calendar of which shifts run on which weekdays
+and which dates are holidays, optionally overridden per site. It is loaded
+once and compiled into a sorted minute-of-day interval table, so classifying
+a time is one bisect instead of parsing time strings on every check.
+
+Shifts whose end is not after their start run overnight (e.g. 22:00-06:00);
+times after midnight belong to the shift that started the day before, which
+is also the day the calendar is checked against.
+
+Schedule file (SHIFT_SCHEDULE, default shift_schedule.json next to this file),
+every key optional:
+
+    {
+      "shifts": {
+        "morning": {"start": "08:00", "end": "17:00", "grace": 15, "early": 180,
+                    "checkout_before": 60, "checkout_after": 15},
+        "night":   {"start": "17:00", "end": "22:00", "grace": 15, "early": 60}
+      },
+      "calendar": {"days": {"sun": []}, "holidays": ["2026-12-25"]},
+      "sites": {
+        "warehouse": {"shifts": {"night": {"start": "22:00", "end": "06:00"}},
+                      "calendar": {"days": {"sat": ["morning"]}}}
+      }
+    }
+
+Shifts are listed in priority order: where two windows overlap, the first
+one wins. The site comes from ATTENDANCE_SITE unless given explicitly.
+"""
+import bisect
+import json
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+SCHEDULE_PATH = os.environ.get(
+    'SHIFT_SCHEDULE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shift_schedule.json'))
+
+# grace: minutes after start that still count as on time
+# early: minutes before start from which check-in is accepted
+# checkout_before / checkout_after: checkout window around the end of the shift
+DEFAULT_SHIFTS = {
+    'morning': {'start': '08:00', 'end': '17:00', 'grace': 15, 'early': 180,
+                'checkout_before': 60, 'checkout_after': 15},
+    'night': {'start': '17:00', 'end': '22:00', 'grace': 15, 'early': 60,
+              'checkout_before': 60, 'checkout_after': 15},
+}
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _as_datetime(when):
+    """datetime for now / a datetime / a bare time (taken as today)."""
+    if when is None:
+        return datetime.now()
+    if isinstance(when, datetime):
+        return when
+    if isinstance(when, time):
+        return datetime.combine(date.today(), when)
+    raise TypeError(f"Expected datetime or time, got {type(when).__name__}")
+
+
+class Shift:
+    """One shift window in minutes of the shift's own day (end may exceed 24h)."""
+
+    def __init__(self, name, start, end, grace=15, early=0, checkout_before=60, checkout_after=15):
+        self.name = name
+        self.start = _minutes(start)
+        end = _minutes(end)
+        # Overnight: the end is on the next day
+        self.end = end if end > self.start else end + MINUTES_PER_DAY
+        self.grace = int(grace)
+        self.early = int(early)
+        self.checkout_before = int(checkout_before)
+        self.checkout_after = int(checkout_after)
+
+    @property
+    def overnight(self):
+        return self.end > MINUTES_PER_DAY
+
+    def __repr__(self):
+        return (f"Shift({self.name!r}, {self.start // 60:02d}:{self.start % 60:02d}-"
+                f"{self.end // 60 % 24:02d}:{self.end % 60:02d})")
+
+
+class ShiftCalendar:
+    """Which shifts run on which weekdays, and holidays when none run."""
+
+    def __init__(self, days=None, holidays=()):
+        self.days = {day: (None if shifts is None else frozenset(shifts))
+                     for day, shifts in (days or {}).items()}
+        self.holidays = frozenset(holidays)
+
+    def runs(self, shift_name, day):
+        if day.isoformat() in self.holidays:
+            return False
+        shifts = self.days.get(WEEKDAYS[day.weekday()])
+        # Weekdays not listed run every shift
+        return shifts is None or shift_name in shifts
+
+
+class ShiftSchedule:
+    """
+    Compiled schedule for one site.
+
+    Two interval tables are built, each a sorted list of boundaries (minute
+    of day) with, per segment, the shifts covering it in priority order
+    together with the day offset from the clock date to the shift's date:
+    - core: start <= t < end
+    - checkin: start - early <= t < end, where core windows take priority
+      over early check-in windows
+    - closing: start <= t <= end + checkout_after, where core windows take
+      priority over checkout windows
+    """
+
+    def __init__(self, shifts, calendar=None, site=None):
+        self.site = site
+        self.shifts = {shift.name: shift for shift in shifts}
+        self.shift_names = tuple(self.shifts)
+        self.calendar = calendar or ShiftCalendar()
+        core = [(shift, shift.start, shift.end) for shift in shifts]
+        early = [(shift, shift.start - shift.early, shift.start) for shift in shifts if shift.early]
+        self._core = self._compile(core)
+        self._checkin = self._compile(core + early)
+        # Minute resolution: + 1 keeps the last minute of the checkout window
+        closing = [(shift, shift.end, shift.end + shift.checkout_after + 1) for shift in shifts]
+        self._closing = self._compile(core + closing)
+
+    @staticmethod
+    def _compile(intervals):
+        """(boundaries, segments) for [(shift, start, end)] in shift-day minutes."""
+        pieces = []  # (clock_start, clock_end, priority, name, day_offset)
+        for priority, (shift, start, end) in enumerate(intervals):
+            # Shift-day minutes before 0 fall on the previous clock day (the
+            # shift is tomorrow's), past 24h on the next one (it was yesterday's)
+            for offset, low in ((1, -MINUTES_PER_DAY), (0, 0), (-1, MINUTES_PER_DAY)):
+                a, b = max(start, low), min(end, low + MINUTES_PER_DAY)
+                if a < b:
+                    pieces.append((a - low, b - low, priority, shift.name, offset))
+        boundaries = sorted({0, MINUTES_PER_DAY} | {p[0] for p in pieces} | {p[1] for p in pieces})
+        segments = []
+        for left in boundaries[:-1]:
+            covering = sorted((p[2], p[3], p[4]) for p in pieces if p[0] <= left < p[1])
+            segments.append(tuple((name, offset) for _, name, offset in covering))
+        return boundaries[:-1], segments
+
+    def _matches(self, table, when):
+        """(shift name, shift date) of every running shift covering when, in priority order."""
+        when = _as_datetime(when)
+        boundaries, segments = table
+        minute = when.hour * 60 + when.minute
+        for name, offset in segments[bisect.bisect_right(boundaries, minute) - 1]:
+            shift_date = when.date() + timedelta(days=offset)
+            if self.calendar.runs(name, shift_date):
+                yield name, shift_date
+
+    def _lookup(self, table, when):
+        return next(self._matches(table, when), (None, None))
+
+    def shift_at(self, when=None, early=False):
+        """
+        Name of the shift running at when (datetime, time or None for now),
+        or None outside every shift. With early, early check-in windows count too.
+        """
+        return self._lookup(self._checkin if early else self._core, when)[0]
+
+    def shifts_at(self, when=None, checkout=False):
+        """
+        Names of all shifts running at when, in priority order. With checkout,
+        a shift also counts through its checkout window after the end, so a
+        person can still check out of a shift that has just finished.
+        """
+        seen = []
+        for name, _ in self._matches(self._closing if checkout else self._core, when):
+            if name not in seen:
+                seen.append(name)
+        return seen
+
+    def locate(self, when=None, early=False):
+        """(shift name, date the shift started) at when, or (None, None)."""
+        return self._lookup(self._checkin if early else self._core, when)
+
+    def _relative(self, shift, when):
+        """
+        (minutes since the start, shift date) for the occurrence of shift
+        whose early-to-checkout window contains when, else the nearest start.
+        """
+        when = _as_datetime(when)
+        options = []
+        for days in (0, -1, 1):
+            shift_date = when.date() + timedelta(days=days)
+            start = datetime.combine(shift_date, time()) + timedelta(minutes=shift.start)
+            rel = (when - start).total_seconds() / 60.0
+            if -shift.early <= rel <= shift.end - shift.start + shift.checkout_after:
+                return rel, shift_date
+            options.append((abs(rel), rel, shift_date))
+        _, rel, shift_date = min(options)
+        return rel, shift_date
+
+    def in_shift(self, shift_name, when=None, early=False):
+        """Whether when falls inside shift_name's window on a day the shift runs."""
+        shift = self.shifts.get(shift_name)
+        if shift is None:
+            return False
+        rel, shift_date = self._relative(shift, when)
+        low = -shift.early if early else 0
+        return low <= rel < shift.end - shift.start and self.calendar.runs(shift_name, shift_date)
+
+    def status(self, shift_name, when=None):
+        """
+        Where when falls relative to shift_name:
+        'early' (early check-in window), 'on_time' (within grace of the start),
+        'checkout' (checkout window around the end), 'late' (rest of the shift)
+        or 'invalid' (outside all of these, an unknown shift or a day it does not run).
+        """
+        shift = self.shifts.get(shift_name)
+        if shift is None:
+            return 'invalid'
+        rel, shift_date = self._relative(shift, when)
+        if not self.calendar.runs(shift_name, shift_date):
+            return 'invalid'
+        duration = shift.end - shift.start
+        if -shift.early <= rel < 0:
+            return 'early'
+        if 0 <= rel <= shift.grace:
+            return 'on_time'
+        if duration - shift.checkout_before <= rel <= duration + shift.checkout_after:
+            return 'checkout'
+        if 0 <= rel < duration:
+            return 'late'
+        return 'invalid'
+
+    def shift_end(self, shift_name, checkin):
+        """datetime at which the shift occurrence containing checkin ends, or None."""
+        shift = self.shifts.get(shift_name)
+        if shift is None:
+            return None
+        _, shift_date = self._relative(shift, checkin)
+        return datetime.combine(shift_date, time()) + timedelta(minutes=shift.end)
+
+
+def _build(data, site=None):
+    # Overrides merge key by key, so e.g. a new night start keeps its grace,
+    # early and checkout windows; a shift not in the defaults is added whole
+    shifts = {name: dict(spec) for name, spec in DEFAULT_SHIFTS.items()}
+    for name, override in (data.get('shifts') or {}).items():
+        shifts[name] = dict(shifts.get(name, {}), **override)
+    calendar = dict(data.get('calendar') or {})
+    if site is not None:
+        site_data = (data.get('sites') or {}).get(site)
+        if site_data is None:
+            print(f"Warning: No shift schedule for site {site!r}, using the default one")
+        else:
+            for name, override in (site_data.get('shifts') or {}).items():
+                shifts[name] = dict(shifts.get(name, {}), **override)
+            site_calendar = site_data.get('calendar') or {}
+            if 'days' in site_calendar:
+                calendar['days'] = dict(calendar.get('days') or {}, **site_calendar['days'])
+            if 'holidays' in site_calendar:
+                calendar['holidays'] = list(calendar.get('holidays') or []) + list(site_calendar['holidays'])
+    return ShiftSchedule([Shift(name, **spec) for name, spec in shifts.items()],
+                         ShiftCalendar(calendar.get('days'), calendar.get('holidays') or ()),
+                         site)
+
+
+def load_schedule(path=None, site=None):
+    """Read and compile the schedule file (defaults when it does not exist)."""
+    path = path or SCHEDULE_PATH
+    data = {}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read shift schedule {path} ({e}), using defaults")
+    return _build(data, site)
+
+
+_schedules = {}
+_schedules_lock = threading.Lock()
+
+
+def get_schedule(site=None, path=None):
+    """The compiled schedule for site (default ATTENDANCE_SITE), loaded once per process."""
+    site = site or os.environ.get('ATTENDANCE_SITE') or None
+    key = (path or SCHEDULE_PATH, site)
+    schedule = _schedules.get(key)
+    if schedule is None:
+        with _schedules_lock:
+            schedule = _schedules.get(key)
+            if schedule is None:
+                schedule = _schedules[key] = load_schedule(path, site)
+    return schedule
+
+
+def reload_schedules():
+    """Forget compiled schedules so the next get_schedule() reads the file again."""
+    with _schedules_lock:
+        _schedules.clear()
@@ -0,0 +1,182 @@
+"""
+Shared access to attendance.db for the API (api/database.py, api/auth.py)
+and the recognition API (app.py).
+
+- one schema, created here and nowhere else
+- one connection per thread, opened on first use and kept: endpoints that
+  touch the database are plain def (or hand it to run_in_threadpool), so
+  they run on FastAPI's thread pool and never block the event loop, and
+  each worker thread reuses its connection and that connection's
+  prepared-statement cache across requests instead of connecting, parsing
+  and closing per call
+- WAL journal mode with synchronous=NORMAL, so readers never wait for a
+  writer and commits do not fsync (a power cut can lose the last commits,
+  a crash cannot)
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+DB_PATH = os.environ.get('ATTENDANCE_DB', str(Path(__file__).parent / 'attendance.db'))
+# Prepared statements kept per connection (sqlite3's default is 128)
+STATEMENT_CACHE = 256
+
+ATTENDANCE_COLUMNS = '''(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_name TEXT,
+    date DATE,
+    check_in TIME,
+    check_out TIME,
+    shift TEXT,
+    status TEXT,
+    device_id TEXT
+)'''
+# Columns the API reads from users, added to tables created by older app.py
+USER_COLUMNS = (('full_name', 'TEXT'), ('hashed_password', 'TEXT'), ('role', 'TEXT'),
+                ('shift', 'TEXT'), ('is_active', 'BOOLEAN'))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    full_name TEXT,
+    hashed_password TEXT,
+    role TEXT,
+    shift TEXT,
+    is_active BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS attendance ''' + ATTENDANCE_COLUMNS + ''';
+CREATE INDEX IF NOT EXISTS attendance_by_employee ON attendance (employee_name, date, shift);
+CREATE INDEX IF NOT EXISTS attendance_by_date ON attendance (date);
+
+-- Journaled recognizer events already applied, keyed by their event_id
+CREATE TABLE IF NOT EXISTS attendance_events (
+    event_id TEXT PRIMARY KEY,
+    device_id TEXT,
+    employee_name TEXT,
+    event_time TIMESTAMP,
+    received TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS devices (
+    device_id TEXT PRIMARY KEY,
+    name TEXT,
+    location TEXT,
+    last_active TIMESTAMP,
+    status TEXT
+);
+'''
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _needs_migration(conn):
+    attendance = _columns(conn, 'attendance')
+    users = _columns(conn, 'users')
+    legacy_attendance = 'timestamp' in attendance and 'check_in' not in attendance
+    missing_users = [(name, kind) for name, kind in USER_COLUMNS if users and name not in users]
+    return legacy_attendance, missing_users
+
+
+def _migrate_legacy(conn):
+    """
+    Bring a database first created by app.py up to the shared schema, in one
+    transaction: attendance(id, employee_name, timestamp, status) rows are
+    copied into the shared layout, and users(username, password) gets the
+    columns the API reads. Such users have no hashed_password, so they
+    cannot log in until one is set.
+    """
+    if _needs_migration(conn) == (False, []):
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Another process may have migrated while we waited for the lock
+        legacy_attendance, missing_users = _needs_migration(conn)
+        if legacy_attendance:
+            conn.execute('CREATE TABLE attendance_migrated ' + ATTENDANCE_COLUMNS)
+            conn.execute('''
+                INSERT INTO attendance_migrated (employee_name, date, check_in, status, device_id)
+                SELECT employee_name, date(timestamp), time(timestamp), status, 'api'
+                FROM attendance ORDER BY id
+            ''')
+            conn.execute('DROP TABLE attendance')
+            conn.execute('ALTER TABLE attendance_migrated RENAME TO attendance')
+        for name, kind in missing_users:
+            conn.execute(f'ALTER TABLE users ADD COLUMN {name} {kind}')
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    if legacy_attendance or missing_users:
+        print("Migrated attendance.db to the shared schema")
+
+
+class Storage:
+    """
+    Thread-local pooled connections to one SQLite database.
+
+    args:
+    path: database file (default ATTENDANCE_DB or attendance.db in the project root)
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or DB_PATH)
+        self._local = threading.local()
+        self.connections = 0
+        conn = self.connection()
+        _migrate_legacy(conn)
+        conn.executescript(SCHEMA)
+
+    def connection(self):
+        """This thread's connection (opened on first use; do not close it)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, cached_statements=STATEMENT_CACHE)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self.connections += 1
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Cursor on this thread's connection; commits on success, rolls back on error."""
+        conn = self.connection()
+        # IMMEDIATE takes the write lock up front: a read-then-write transaction
+        # (check-in or check-out) cannot lose a lock upgrade to another writer
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def query(self, sql, params=()):
+        """Rows of a read-only statement."""
+        return self.connection().execute(sql, params).fetchall()
+
+    def close(self):
+        """Close the calling thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_storages = {}
+_storages_lock = threading.Lock()
+
+
+def get_storage(path=None):
+    """The process-wide Storage for path (default DB_PATH), schema created on first use."""
+    key = str(path or DB_PATH)
+    with _storages_lock:
+        storage = _storages.get(key)
+        if storage is None:
+            storage = _storages[key] = Storage(key)
+        return storage
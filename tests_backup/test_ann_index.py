@@ -0,0 +1,63 @@
+"""
+Tests for the IVF approximate index (ann_index.py)
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Project root, where ann_index.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ann_index import IVFIndex
+from face_gallery import Gallery
+
+
+def _people(count=200, poses=3, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(count, 128)).astype(np.float32)
+    encodings = np.repeat(centers, poses, axis=0) + rng.normal(scale=0.01, size=(count * poses, 128))
+    names = [f"person_{i}" for i in range(count) for _ in range(poses)]
+    return centers, encodings.astype(np.float32), names
+
+
+def test_recall_against_exact_gallery():
+    centers, encodings, names = _people()
+    index = IVFIndex.build(encodings, names, nlist=16, nprobe=4)
+    exact = Gallery(encodings, names)
+    approx = [name for name, _ in index.identify(centers, threshold=10.0)]
+    truth = [name for name, _ in exact.identify(centers, threshold=10.0)]
+    recall = np.mean([a == t for a, t in zip(approx, truth)])
+    assert recall >= 0.95
+
+
+def test_remove_and_readd_reuses_identity_slot():
+    centers, encodings, names = _people(count=20)
+    index = IVFIndex.build(encodings, names, nlist=4)
+    slots = len(index.identities)
+    for _ in range(10):
+        index = index.copy()
+        assert index.remove("person_3") == 3
+        index.add(encodings[9:12], ["person_3"] * 3)
+    assert len(index.identities) == slots
+    assert index.num_identities == 20
+    assert index.best_match(centers[3], threshold=10.0)[0] == "person_3"
+
+
+def test_copy_leaves_original_untouched():
+    centers, encodings, names = _people(count=10)
+    index = IVFIndex.build(encodings, names, nlist=2)
+    updated = index.copy()
+    updated.remove("person_0")
+    assert index.best_match(centers[0], threshold=10.0)[0] == "person_0"
+    assert updated.best_match(centers[0], threshold=10.0)[0] != "person_0"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    centers, encodings, names = _people(count=10)
+    index = IVFIndex.build(encodings, names, nlist=2)
+    index.remove("person_1")
+    index.save(str(tmp_path / "index.npz"))
+    loaded = IVFIndex.load(str(tmp_path / "index.npz"))
+    assert loaded.num_identities == 9
+    assert loaded.best_match(centers[5], threshold=10.0)[0] == "person_5"
@@ -0,0 +1,89 @@
+"""
+Tests for the buffered attendance CSV writer (attendance_csv.py)
+"""
+import csv
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Project root, where attendance_csv.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+from attendance_csv import SCHEMA, AttendanceCSVWriter, attendance_path
+from tracker_state import WriteIndex
+
+
+def _rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_rows_go_to_their_own_day(tmp_path):
+    writer = AttendanceCSVWriter(tmp_path, flush_interval=0)
+    before, after = datetime(2026, 10, 14, 23, 59, 50), datetime(2026, 10, 15, 0, 0, 5)
+    assert writer.write('ares', before, 'night', 'on_time')
+    assert writer.write('ares', after, 'night', 'checkout', event='checkout')
+    writer.close()
+    assert _rows(attendance_path(before, tmp_path)) == [
+        list(SCHEMA), ['ares', '23:59:50', '2026-10-14', 'night', 'on_time']]
+    assert _rows(attendance_path(after, tmp_path))[1][0:2] == ['ares', '00:00:05']
+
+
+def test_buffered_rows_are_one_commit(tmp_path):
+    writer = AttendanceCSVWriter(tmp_path, flush_interval=60)
+    when = datetime(2026, 10, 14, 9, 0)
+    for name in ('ares', 'bea', 'cyd'):
+        writer.write(name, when, 'morning', 'on_time')
+    assert not attendance_path(when, tmp_path).exists()
+    writer.flush()
+    assert (writer.rows_written, writer.commits) == (3, 1)
+    assert [row[0] for row in _rows(attendance_path(when, tmp_path))[1:]] == ['ares', 'bea', 'cyd']
+    writer.close()
+
+
+def test_legacy_header_is_kept(tmp_path):
+    when = datetime(2026, 10, 14, 9, 0)
+    attendance_path(when, tmp_path).write_text('Name,Time,Date\n', encoding='utf-8')
+    writer = AttendanceCSVWriter(tmp_path, flush_interval=0)
+    writer.write('ares', when, 'morning', 'on_time')
+    writer.close()
+    assert _rows(attendance_path(when, tmp_path)) == [
+        ['Name', 'Time', 'Date'], ['ares', '09:00:00', '2026-10-14']]
+
+
+def test_duplicates_are_refused(tmp_path):
+    index = WriteIndex(str(tmp_path / 'state.db'))
+    writer = AttendanceCSVWriter(tmp_path, flush_interval=0, index=index)
+    when = datetime.now()
+    assert writer.write('ares', when, 'morning', 'on_time')
+    assert not writer.write('ares', when, 'morning', 'late')
+    assert writer.write('ares', when, 'morning', 'checkout', event='checkout')
+    writer.close()
+    assert len(_rows(attendance_path(when, tmp_path))) == 3
+    assert index.suppressed == 1
+
+
+def test_failed_flush_keeps_rows_and_keys(tmp_path, monkeypatch):
+    index = WriteIndex(str(tmp_path / 'state.db'))
+    writer = AttendanceCSVWriter(tmp_path, flush_interval=60, index=index)
+    when = datetime.now()
+    writer.write('ares', when, 'morning', 'on_time')
+    rotate = writer._rotate
+
+    def fail(day):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(writer, '_rotate', fail)
+    with pytest.raises(OSError):
+        writer.flush()
+    assert writer.rows_written == 0
+    # Still reserved by this writer, but not confirmed as written
+    assert not writer.write('ares', when, 'morning', 'late')
+    monkeypatch.setattr(writer, '_rotate', rotate)
+    writer.flush()
+    writer.close()
+    assert [row[0] for row in _rows(attendance_path(when, tmp_path))[1:]] == ['ares']
+    committed = index._conn.execute('SELECT committed FROM written_events').fetchall()
+    assert committed == [(1,)]
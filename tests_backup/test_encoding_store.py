@@ -0,0 +1,94 @@
+"""
+Tests for the persistent encoding store (encoding_store.py)
+"""
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Project root, where encoding_store.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+import encoding_store
+from encoding_store import EncodingStore, list_gallery_images
+
+
+def _gallery(root, people=('ares', 'bea')):
+    for name in people:
+        (root / name).mkdir(parents=True)
+        for pose in encoding_store.POSES:
+            (root / name / pose).write_bytes(f"{name}-{pose}".encode())
+    (root / '.hidden').mkdir()
+    return list_gallery_images(str(root))
+
+
+class _Encoder:
+    """Fake encode_fn: a vector derived from the file content, counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, image_path):
+        self.calls += 1
+        data = Path(image_path).read_bytes()
+        if data.startswith(b'noface'):
+            return None
+        return np.full(128, sum(data) / 1000.0)
+
+
+def test_list_gallery_images(tmp_path):
+    items = _gallery(tmp_path / 'data')
+    assert [name for name, _ in items] == ['ares'] * 3 + ['bea'] * 3
+    assert items[0][1].endswith(os.path.join('ares', 'center.png'))
+
+
+def test_second_sync_reuses_everything(tmp_path):
+    items = _gallery(tmp_path / 'data')
+    encoder = _Encoder()
+    store = EncodingStore(str(tmp_path / 'cache'))
+    encodings, names = store.sync(items, encoder)
+    assert len(encodings) == 6 and names[0] == 'ares'
+    assert encoder.calls == 6
+    again = EncodingStore(str(tmp_path / 'cache'))
+    encodings_again, names_again = again.sync(items, encoder)
+    assert encoder.calls == 6
+    assert again.stats == {'reused': 6, 'encoded': 0, 'removed': 0}
+    assert names_again == names
+    assert all(np.array_equal(a, b) for a, b in zip(encodings, encodings_again))
+
+
+def test_changed_missing_and_faceless_images(tmp_path):
+    items = _gallery(tmp_path / 'data')
+    encoder = _Encoder()
+    EncodingStore(str(tmp_path / 'cache')).sync(items, encoder)
+    Path(items[0][1]).write_bytes(b'noface, longer than before')
+    store = EncodingStore(str(tmp_path / 'cache'))
+    encodings, names = store.sync(items[:-1], encoder)
+    assert store.stats == {'reused': 4, 'encoded': 1, 'removed': 1}
+    assert names == ['ares', 'ares', 'bea', 'bea']
+    assert len(encodings) == 4
+
+
+def test_touched_image_is_hashed_once(tmp_path, monkeypatch):
+    items = _gallery(tmp_path / 'data')
+    encoder = _Encoder()
+    EncodingStore(str(tmp_path / 'cache')).sync(items, encoder)
+    stat = os.stat(items[0][1])
+    os.utime(items[0][1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    hashes = []
+    sha1 = encoding_store._file_sha1
+    monkeypatch.setattr(encoding_store, '_file_sha1', lambda path: hashes.append(path) or sha1(path))
+    EncodingStore(str(tmp_path / 'cache')).sync(items, encoder)
+    EncodingStore(str(tmp_path / 'cache')).sync(items, encoder)
+    assert encoder.calls == 6
+    assert hashes == [items[0][1]]
+
+
+def test_settings_change_rebuilds(tmp_path):
+    items = _gallery(tmp_path / 'data')
+    encoder = _Encoder()
+    EncodingStore(str(tmp_path / 'cache'), scale=0.25).sync(items, encoder)
+    EncodingStore(str(tmp_path / 'cache'), scale=0.5).sync(items, encoder)
+    assert encoder.calls == 12
+    assert not any(name.endswith('.tmp.npz') for name in os.listdir(tmp_path / 'cache'))
@@ -0,0 +1,48 @@
+"""
+Tests for the local attendance event journal (event_journal.py)
+"""
+import sys
+from pathlib import Path
+
+# Project root, where event_journal.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+from event_journal import EventJournal
+
+
+def test_append_and_read_in_order(tmp_path):
+    journal = EventJournal(str(tmp_path / 'journal.db'))
+    ids = [journal.append('/attendance/batch', {'name': f"person_{i}"}) for i in range(5)]
+    assert len(set(ids)) == 5
+    events = journal.read(0)
+    assert [event['event_id'] for event in events] == ids
+    assert events[2]['payload'] == {'name': 'person_2'}
+    assert [event['event_id'] for event in journal.read(events[1]['seq'], limit=2)] == ids[2:4]
+
+
+def test_checkpoint_survives_restart_and_never_moves_back(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    journal = EventJournal(path)
+    for i in range(4):
+        journal.append('/attendance/batch', {'i': i})
+    assert journal.checkpoint('api') == 0
+    assert journal.lag('api')['events'] == 4
+    journal.commit('api', 3)
+    journal.close()
+    reopened = EventJournal(path)
+    assert reopened.checkpoint('api') == 3
+    reopened.commit('api', 1)
+    assert reopened.checkpoint('api') == 3
+    assert [event['payload']['i'] for event in reopened.read(reopened.checkpoint('api'))] == [3]
+    assert reopened.lag('api')['events'] == 1
+    assert reopened.checkpoint('other') == 0
+
+
+def test_prune_keeps_undelivered_events(tmp_path):
+    journal = EventJournal(str(tmp_path / 'journal.db'))
+    for i in range(4):
+        journal.append('/attendance/batch', {'i': i})
+    journal.commit('api', 2)
+    assert journal.prune('api', retention_days=1) == 0
+    assert journal.prune('api', retention_days=-1) == 2
+    assert [event['payload']['i'] for event in journal.read(0)] == [2, 3]
@@ -0,0 +1,51 @@
+"""
+Tests for the vectorized Gallery matcher (face_gallery.py)
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Project root, where face_gallery.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+from face_gallery import Gallery
+
+
+def _people(count=20, poses=3, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(count, 128))
+    encodings, names = [], []
+    for i, center in enumerate(centers):
+        for _ in range(poses):
+            encodings.append(center + rng.normal(scale=0.01, size=128))
+            names.append(f"person_{i}")
+    return centers, encodings, names
+
+
+def test_best_match_matches_brute_force():
+    centers, encodings, names = _people()
+    gallery = Gallery(encodings, names)
+    for i, probe in enumerate(centers):
+        distances = np.linalg.norm(np.array(encodings) - probe, axis=1)
+        name, distance = gallery.best_match(probe, threshold=10.0)
+        assert name == names[int(distances.argmin())] == f"person_{i}"
+        assert np.isclose(distance, distances.min(), atol=1e-3)
+
+
+def test_threshold_and_empty_gallery():
+    centers, encodings, names = _people(count=2)
+    gallery = Gallery(encodings, names)
+    assert gallery.best_match(centers[0] + 5.0, threshold=0.4)[0] is None
+    assert Gallery().best_match(centers[0]) == (None, float('inf'))
+
+
+def test_identify_and_top_k():
+    centers, encodings, names = _people(count=5)
+    gallery = Gallery(encodings, names)
+    assert [name for name, _ in gallery.identify(centers, threshold=10.0)] == \
+        [f"person_{i}" for i in range(5)]
+    top = gallery.match(centers[0], k=3)[0]
+    assert len(top) == 3 and top[0][0] == "person_0"
+    assert [d for _, d in top] == sorted(d for _, d in top)
+    assert gallery.num_identities == 5
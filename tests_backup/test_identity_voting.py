@@ -0,0 +1,54 @@
+"""
+Tests for multi-frame identity voting (identity_voting.py)
+"""
+import sys
+from pathlib import Path
+
+# Project root, where identity_voting.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+from identity_voting import EvidenceAccumulator
+
+
+def test_confident_match_after_min_frames():
+    votes = EvidenceAccumulator(window=5, min_frames=2, threshold=0.4)
+    votes.add([('ares', 0.2), ('bea', 0.5)])
+    assert votes.decision()[0] is False
+    votes.add([('ares', 0.21), ('bea', 0.5)])
+    decided, name, mean = votes.decision()
+    assert decided and name == 'ares'
+    assert abs(mean - 0.205) < 1e-9
+
+
+def test_clear_unknown():
+    votes = EvidenceAccumulator(window=5, min_frames=2, threshold=0.4)
+    votes.add([('ares', 0.8)])
+    votes.add([('ares', 0.82)])
+    assert votes.decision()[:2] == (True, None)
+
+
+def test_borderline_waits_for_full_window():
+    votes = EvidenceAccumulator(window=4, min_frames=2, threshold=0.4)
+    for distance in (0.38, 0.39, 0.38):
+        votes.add([('ares', distance)])
+        assert votes.decision()[0] is False
+    votes.add([('ares', 0.39)])
+    assert votes.decision()[:2] == (True, 'ares')
+
+
+def test_missing_candidate_counts_against_it():
+    votes = EvidenceAccumulator(window=5, min_frames=2, threshold=0.4)
+    votes.add([('ares', 0.2), ('bea', 0.25)])
+    votes.add([('bea', 0.25)])
+    scores = votes.scores()
+    assert abs(scores['ares'][0] - 0.3) < 1e-9
+    assert votes.decision()[:2] == (True, 'bea')
+
+
+def test_reset_and_empty_gallery():
+    votes = EvidenceAccumulator(window=3, min_frames=2)
+    votes.add([])
+    votes.add([])
+    assert votes.decision() == (True, None, float('inf'))
+    votes.reset()
+    assert votes.frames == 0 and votes.decision()[0] is False
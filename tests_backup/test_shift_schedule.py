@@ -0,0 +1,86 @@
+"""
+Tests for the compiled shift schedule (shift_schedule.py)
+"""
+import json
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Project root, where shift_schedule.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+from shift_schedule import Shift, ShiftCalendar, ShiftSchedule, load_schedule
+
+# 2026-10-14 is a Wednesday
+WED = date(2026, 10, 14)
+
+
+def _at(day, hhmm):
+    hours, minutes = map(int, hhmm.split(':'))
+    return datetime(day.year, day.month, day.day, hours, minutes)
+
+
+def _overnight():
+    return ShiftSchedule([
+        Shift('morning', '08:00', '17:00', early=60),
+        Shift('night', '22:00', '06:00', grace=10, early=30, checkout_before=60, checkout_after=15),
+    ])
+
+
+def test_default_schedule(tmp_path):
+    schedule = load_schedule(str(tmp_path / 'missing.json'))
+    assert schedule.shift_at(_at(WED, '09:00')) == 'morning'
+    assert schedule.shift_at(_at(WED, '18:00')) == 'night'
+    assert schedule.shift_at(_at(WED, '23:00')) is None
+    assert schedule.status('morning', _at(WED, '08:10')) == 'on_time'
+    assert schedule.status('morning', _at(WED, '10:00')) == 'late'
+    assert schedule.status('morning', _at(WED, '07:00')) == 'early'
+    assert schedule.status('morning', _at(WED, '16:30')) == 'checkout'
+    assert schedule.status('unknown', _at(WED, '09:00')) == 'invalid'
+
+
+def test_overnight_shift_belongs_to_previous_day():
+    schedule = _overnight()
+    assert schedule.locate(_at(WED, '23:00')) == ('night', WED)
+    assert schedule.locate(_at(date(2026, 10, 15), '03:00')) == ('night', WED)
+    assert schedule.shift_at(_at(WED, '21:40'), early=True) == 'night'
+    assert schedule.shift_at(_at(WED, '21:40')) is None
+    assert schedule.status('night', _at(WED, '22:05')) == 'on_time'
+    assert schedule.status('night', _at(date(2026, 10, 15), '02:00')) == 'late'
+    assert schedule.status('night', _at(date(2026, 10, 15), '06:10')) == 'checkout'
+    assert schedule.shift_end('night', _at(WED, '22:05')) == _at(date(2026, 10, 15), '06:00')
+
+
+def test_checkout_window_after_end():
+    schedule = _overnight()
+    after_end = _at(date(2026, 10, 15), '06:15')
+    assert schedule.shifts_at(after_end) == []
+    assert schedule.shifts_at(after_end, checkout=True) == ['night']
+    assert schedule.shifts_at(_at(date(2026, 10, 15), '06:16'), checkout=True) == []
+
+
+def test_calendar_follows_shift_date():
+    calendar = ShiftCalendar({'wed': ['morning']}, holidays=['2026-10-16'])
+    schedule = ShiftSchedule(_overnight().shifts.values(), calendar)
+    # Wednesday night does not run, so early Thursday is not covered either
+    assert schedule.shift_at(_at(date(2026, 10, 15), '03:00')) is None
+    assert schedule.shift_at(_at(date(2026, 10, 16), '03:00')) == 'night'
+    assert schedule.shift_at(_at(date(2026, 10, 16), '09:00')) is None
+    assert schedule.status('morning', _at(date(2026, 10, 16), '09:00')) == 'invalid'
+
+
+def test_overrides_merge_per_key(tmp_path):
+    path = tmp_path / 'schedule.json'
+    path.write_text(json.dumps({
+        'shifts': {'night': {'start': '16:00'}},
+        'sites': {'warehouse': {'shifts': {'night': {'start': '22:00', 'end': '06:00'}},
+                                'calendar': {'holidays': ['2026-10-14']}}},
+    }))
+    schedule = load_schedule(str(path))
+    night = schedule.shifts['night']
+    assert (night.start, night.end, night.grace, night.early) == (16 * 60, 22 * 60, 15, 60)
+    site = load_schedule(str(path), site='warehouse')
+    assert site.shifts['night'].overnight
+    assert site.shifts['night'].early == 60
+    assert site.shift_at(_at(WED, '09:00')) is None
+    assert site.shift_at(_at(date(2026, 10, 15), '09:00')) == 'morning'
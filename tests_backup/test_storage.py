@@ -0,0 +1,74 @@
+"""
+Tests for the shared attendance.db storage layer (storage.py)
+"""
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+# Project root, where storage.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+from storage import Storage
+
+
+def _legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE users (username TEXT PRIMARY KEY, password TEXT);
+        CREATE TABLE attendance (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                 employee_name TEXT, timestamp TIMESTAMP, status TEXT);
+        INSERT INTO users VALUES ('ares', 'secret');
+        INSERT INTO attendance (employee_name, timestamp, status)
+            VALUES ('ares', '2026-10-14 08:05:00', 'present'),
+                   ('bea', '2026-10-14 08:20:00', 'present');
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def test_new_database_gets_shared_schema(tmp_path):
+    storage = Storage(tmp_path / 'attendance.db')
+    tables = {row[0] for row in storage.query("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'users', 'attendance', 'attendance_events', 'devices'} <= tables
+    assert storage.query('PRAGMA journal_mode')[0][0] == 'wal'
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    path = tmp_path / 'attendance.db'
+    _legacy_db(str(path))
+    storage = Storage(path)
+    assert storage.query('SELECT employee_name, date, check_in, status, device_id FROM attendance '
+                         'ORDER BY id') == [
+        ('ares', '2026-10-14', '08:05:00', 'present', 'api'),
+        ('bea', '2026-10-14', '08:20:00', 'present', 'api')]
+    assert storage.query('SELECT username, password, hashed_password FROM users') == [
+        ('ares', 'secret', None)]
+    # Opening it again is a no-op
+    Storage(path)
+    assert len(storage.query('SELECT * FROM attendance')) == 2
+
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    storage = Storage(tmp_path / 'attendance.db')
+    try:
+        with storage.transaction() as cur:
+            cur.execute("INSERT INTO devices (device_id) VALUES ('door-1')")
+            raise RuntimeError('abort')
+    except RuntimeError:
+        pass
+    assert storage.query('SELECT * FROM devices') == []
+    with storage.transaction() as cur:
+        cur.execute("INSERT INTO devices (device_id) VALUES ('door-1')")
+    assert storage.query('SELECT device_id FROM devices') == [('door-1',)]
+
+
+def test_one_connection_per_thread(tmp_path):
+    storage = Storage(tmp_path / 'attendance.db')
+    assert storage.connection() is storage.connection()
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(storage.connection()))
+    thread.start()
+    thread.join()
+    assert seen[0] is not storage.connection()
+    assert storage.connections == 2
@@ -0,0 +1,77 @@
+"""
+Tests for the shared tracker state and write index (tracker_state.py)
+"""
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Project root, where tracker_state.py lives
+sys.path.append(str(Path(__file__).parent.parent))
+
+import tracker_state
+from tracker_state import TrackerState, WriteIndex
+
+
+def test_cooldown_and_once_per_shift(tmp_path):
+    state = TrackerState('main', str(tmp_path / 'state.db'))
+    now = datetime.now()
+    assert state.last_mark('ares') is None
+    assert state.try_mark('ares', shift='morning', now=now, cooldown=3600)
+    assert not state.try_mark('ares', now=now + timedelta(minutes=5), cooldown=3600)
+    assert state.try_mark('ares', now=now + timedelta(hours=2), cooldown=3600)
+    assert state.marked_shifts('ares') == {'morning'}
+    assert not state.try_mark('ares', shift='morning', now=now, once_per_shift=True)
+    assert state.try_mark('ares', shift='night', now=now, once_per_shift=True)
+    assert state.last_mark('ares') == now.timestamp()
+
+
+def test_scopes_are_separate(tmp_path):
+    path = str(tmp_path / 'state.db')
+    main, dashboard = TrackerState('main', path), TrackerState('dashboard', path)
+    assert main.try_mark('ares', cooldown=3600)
+    assert dashboard.try_mark('ares', cooldown=3600)
+    assert TrackerState('other', path).last_mark('ares') is None
+
+
+def test_marks_from_other_connections_are_seen(tmp_path):
+    path = str(tmp_path / 'state.db')
+    door, other_door = TrackerState('main', path), TrackerState('main', path)
+    assert door.last_mark('ares') is None
+    assert other_door.try_mark('ares', shift='morning', cooldown=3600)
+    # Neither the negative lookup nor the cache hides the other process's mark
+    assert door.last_mark('ares') is not None
+    assert door.marked_shifts('ares') == {'morning'}
+    assert not door.try_mark('ares', cooldown=3600)
+    # State survives a restart
+    assert TrackerState('main', path).marked_shifts('ares') == {'morning'}
+
+
+def test_write_index_claim_confirm_release(tmp_path):
+    path = str(tmp_path / 'state.db')
+    index = WriteIndex(path)
+    key = ('ares', date.today(), 'morning', 'checkin')
+    assert index.claim(*key)
+    assert not index.claim(*key)
+    assert not WriteIndex(path).claim(*key)
+    index.release(*key)
+    assert index.claim(*key)
+    index.confirm([key])
+    restarted = WriteIndex(path)
+    assert not restarted.claim(*key)
+    assert restarted.claim('ares', date.today(), 'morning', 'checkout')
+    assert index.suppressed == 1 and restarted.suppressed == 1
+
+
+def test_stale_reservation_can_be_taken_over(tmp_path, monkeypatch):
+    path = str(tmp_path / 'state.db')
+    key = ('ares', date.today(), 'morning', 'checkin')
+    crashed = WriteIndex(path)
+    assert crashed.claim(*key)
+    # Still within the timeout: the other writer must wait
+    assert not WriteIndex(path).claim(*key)
+    monkeypatch.setattr(tracker_state, 'RESERVATION_TIMEOUT', -1.0)
+    retry = WriteIndex(path)
+    assert retry.claim(*key)
+    retry.confirm([key])
+    # Confirmed keys are final whatever the timeout
+    assert not WriteIndex(path).claim(*key)
@@ -0,0 +1,343 @@
+"""
+Persistent AttendanceTracker state: when each person was last marked and
+which shifts they have been marked for, per day.
+
+The state lives in a small SQLite file in WAL mode, so it survives restarts
+and is shared by every recognizer on the machine (several doors, the
+dashboard). Each process keeps a read-through cache for the per-frame
+checks (cooldown, already marked), dropped whenever another connection
+has committed (PRAGMA data_version); the decision to mark is made by
+try_mark in a single IMMEDIATE transaction, so two processes recognizing
+the same person at the same moment cannot both mark them.
+
+State is namespaced by scope: trackers with different rules (the main
+recognizer's hourly cooldown, the dashboard's once-per-shift marking) keep
+separate records.
+
+The same file holds the WriteIndex, which keeps every writer of the
+attendance CSVs from writing the same check-in or checkout twice.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+STATE_PATH = os.environ.get(
+    'TRACKER_STATE_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tracker_state.db'))
+# Marked shifts older than this are pruned when the state is opened
+RETENTION_DAYS = 7
+# A claimed row not confirmed as written within this many seconds belongs to
+# a writer that died before flushing it; the key may then be claimed again
+RESERVATION_TIMEOUT = 60.0
+
+
+def _connect(path):
+    """Autocommit connection in WAL mode, usable from any thread (callers lock)."""
+    conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class TrackerState:
+    """
+    Cooldown and marked-shift records for one scope.
+
+    args:
+    scope: namespace shared by all trackers that follow the same rules
+    path: SQLite file (created on first use)
+    """
+
+    def __init__(self, scope, path=None):
+        self.scope = scope
+        self.path = path or STATE_PATH
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS last_marks (
+                scope TEXT NOT NULL,
+                name TEXT NOT NULL,
+                ts REAL NOT NULL,
+                PRIMARY KEY (scope, name)
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS marked_shifts (
+                scope TEXT NOT NULL,
+                name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                shift TEXT NOT NULL,
+                PRIMARY KEY (scope, name, day, shift)
+            )
+        ''')
+        # name -> epoch seconds of the last mark (people never marked are not cached)
+        self.last_marks = {}
+        # name -> shifts marked on self._day
+        self._shifts = {}
+        self._day = None
+        self._version = None
+        self.hydrate()
+
+    def hydrate(self):
+        """Load this scope's records into the cache (one query per table)."""
+        today = datetime.now().date().isoformat()
+        cutoff = (datetime.now() - timedelta(days=RETENTION_DAYS)).date().isoformat()
+        with self._lock:
+            self._conn.execute('DELETE FROM marked_shifts WHERE scope = ? AND day < ?',
+                               (self.scope, cutoff))
+            last_marks = dict(self._conn.execute(
+                'SELECT name, ts FROM last_marks WHERE scope = ?', (self.scope,)).fetchall())
+            shifts = {}
+            for name, shift in self._conn.execute(
+                    'SELECT name, shift FROM marked_shifts WHERE scope = ? AND day = ?',
+                    (self.scope, today)):
+                shifts.setdefault(name, set()).add(shift)
+            self.last_marks, self._shifts, self._day = last_marks, shifts, today
+            self._version = self._data_version()
+
+    def _data_version(self):
+        # Changes whenever another connection (any process) commits to the file
+        return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _sync(self):
+        """Drop the cache if another process wrote since it was filled (caller holds the lock)."""
+        version = self._data_version()
+        if version != self._version:
+            self.last_marks = {}
+            self._shifts = {}
+            self._version = version
+
+    def _roll_day(self, day):
+        # Caller holds the lock; yesterday's marked shifts no longer matter
+        if day != self._day:
+            self._shifts = {}
+            self._day = day
+
+    def last_mark(self, name):
+        """Epoch seconds of name's last mark in this scope, or None."""
+        with self._lock:
+            self._sync()
+            if name in self.last_marks:
+                return self.last_marks[name]
+            row = self._conn.execute('SELECT ts FROM last_marks WHERE scope = ? AND name = ?',
+                                     (self.scope, name)).fetchone()
+            if row is None:
+                # Not cached: another process may mark name at any moment
+                return None
+            self.last_marks[name] = row[0]
+            return row[0]
+
+    def marked_shifts(self, name, day=None):
+        """Set of shifts name has been marked for on day (default today)."""
+        day = (day or datetime.now().date()).isoformat()
+        with self._lock:
+            self._sync()
+            self._roll_day(datetime.now().date().isoformat())
+            if day == self._day and name in self._shifts:
+                return self._shifts[name]
+            shifts = {row[0] for row in self._conn.execute(
+                'SELECT shift FROM marked_shifts WHERE scope = ? AND name = ? AND day = ?',
+                (self.scope, name, day))}
+            if day == self._day:
+                self._shifts[name] = shifts
+        return shifts
+
+    def try_mark(self, name, shift=None, now=None, cooldown=0, once_per_shift=False):
+        """
+        Atomically check the rules and record a mark.
+
+        args:
+        name: person to mark
+        shift: shift being marked (recorded when given)
+        now: datetime of the mark (default now)
+        cooldown: seconds that must have passed since name's last mark
+        once_per_shift: refuse when name is already marked for shift today
+        returns: True when the mark was recorded, False when a rule refused it
+        """
+        now = now or datetime.now()
+        ts = now.timestamp()
+        day = now.date().isoformat()
+        with self._lock:
+            self._roll_day(datetime.now().date().isoformat())
+            c = self._conn
+            # IMMEDIATE takes the write lock up front, so the checks below and
+            # the writes are one step for every process sharing the file
+            c.execute('BEGIN IMMEDIATE')
+            try:
+                row = c.execute('SELECT ts FROM last_marks WHERE scope = ? AND name = ?',
+                                (self.scope, name)).fetchone()
+                last = row[0] if row else None
+                cooling = bool(cooldown) and last is not None and ts - last < cooldown
+                marked = bool(once_per_shift and shift) and c.execute(
+                    'SELECT 1 FROM marked_shifts WHERE scope = ? AND name = ? AND day = ? AND shift = ?',
+                    (self.scope, name, day, shift)).fetchone() is not None
+                if cooling or marked:
+                    c.execute('ROLLBACK')
+                    # Another process may have marked name since we cached it
+                    if last is not None:
+                        self.last_marks[name] = last
+                    if marked and day == self._day:
+                        self._shifts.setdefault(name, set()).add(shift)
+                    return False
+                c.execute('INSERT OR REPLACE INTO last_marks (scope, name, ts) VALUES (?, ?, ?)',
+                          (self.scope, name, ts))
+                if shift:
+                    c.execute('INSERT OR IGNORE INTO marked_shifts (scope, name, day, shift) '
+                              'VALUES (?, ?, ?, ?)', (self.scope, name, day, shift))
+                c.execute('COMMIT')
+            except Exception:
+                c.execute('ROLLBACK')
+                raise
+            self.last_marks[name] = ts
+            if shift and day == self._day:
+                self._shifts.setdefault(name, set()).add(shift)
+        return True
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class WriteIndex:
+    """
+    Write-side deduplication of attendance rows, keyed by
+    (person, day, shift, event type), e.g. ('ares', 2025-10-21, 'morning', 'checkin').
+
+    The first claim of a key wins and every later one is refused and counted
+    in suppressed, so however often a person is recognized, each check-in or
+    checkout is written once. Recent keys are held in memory; the table in
+    the state file makes the index survive restarts and shared by all
+    processes (a key claimed elsewhere is refused by the INSERT).
+
+    A claim is a reservation until the writer confirms the row reached the
+    file (confirm); a reservation left unconfirmed for RESERVATION_TIMEOUT
+    seconds, e.g. by a writer that crashed, can be claimed again, so a row
+    lost before its write does not block its retries.
+
+    args:
+    path: SQLite file (default the tracker state file)
+    """
+
+    def __init__(self, path=None):
+        self.path = path or STATE_PATH
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS written_events (
+                name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                shift TEXT NOT NULL,
+                event TEXT NOT NULL,
+                written REAL NOT NULL,
+                committed INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (name, day, shift, event)
+            )
+        ''')
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(written_events)')}
+        if 'committed' not in columns:
+            self._conn.execute('ALTER TABLE written_events ADD COLUMN committed INTEGER NOT NULL DEFAULT 1')
+        self.claimed = 0
+        self.suppressed = 0
+        self._keys = set()
+        self._since = None
+        self.hydrate()
+
+    def hydrate(self):
+        """Prune old keys and load yesterday's and today's (overnight shifts span both)."""
+        self._since = (datetime.now() - timedelta(days=1)).date().isoformat()
+        cutoff = (datetime.now() - timedelta(days=RETENTION_DAYS)).date().isoformat()
+        with self._lock:
+            self._conn.execute('DELETE FROM written_events WHERE day < ?', (cutoff,))
+            # Reservations are not cached: they may still expire
+            self._keys = set(self._conn.execute(
+                'SELECT name, day, shift, event FROM written_events WHERE day >= ? AND committed = 1',
+                (self._since,)).fetchall())
+
+    def claim(self, name, day, shift, event):
+        """
+        Reserve the key for one write.
+
+        returns: True when the row should be written, False for a duplicate
+        """
+        key = (name, day.isoformat(), shift or '', event)
+        with self._lock:
+            since = (datetime.now() - timedelta(days=1)).date().isoformat()
+            if since != self._since:
+                # Keep the in-memory index to the last two days
+                self._keys = {k for k in self._keys if k[1] >= since}
+                self._since = since
+            if key in self._keys:
+                self.suppressed += 1
+                return False
+            now = time.time()
+            inserted = self._conn.execute(
+                'INSERT OR IGNORE INTO written_events (name, day, shift, event, written, committed) '
+                'VALUES (?, ?, ?, ?, ?, 0)', key + (now,)).rowcount
+            if not inserted:
+                # Take over a reservation whose writer never confirmed it
+                inserted = self._conn.execute(
+                    'UPDATE written_events SET written = ? WHERE name = ? AND day = ? AND shift = ? '
+                    'AND event = ? AND committed = 0 AND written < ?',
+                    (now,) + key + (now - RESERVATION_TIMEOUT,)).rowcount
+            if not inserted:
+                row = self._conn.execute(
+                    'SELECT committed FROM written_events WHERE name = ? AND day = ? AND shift = ? '
+                    'AND event = ?', key).fetchone()
+                if row is not None and row[0]:
+                    self._keys.add(key)
+                self.suppressed += 1
+                return False
+            self._keys.add(key)
+            self.claimed += 1
+            return True
+
+    def confirm(self, keys):
+        """Mark claimed keys as written: they are final from now on."""
+        keys = [(name, day.isoformat(), shift or '', event) for name, day, shift, event in keys]
+        if not keys:
+            return
+        with self._lock:
+            self._conn.executemany('UPDATE written_events SET committed = 1 WHERE name = ? AND day = ? '
+                                   'AND shift = ? AND event = ?', keys)
+
+    def release(self, name, day, shift, event):
+        """Give back a key claimed for a write that did not happen."""
+        key = (name, day.isoformat(), shift or '', event)
+        with self._lock:
+            if key in self._keys:
+                self._keys.discard(key)
+                self.claimed -= 1
+            self._conn.execute('DELETE FROM written_events WHERE name = ? AND day = ? '
+                               'AND shift = ? AND event = ?', key)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_states = {}
+_states_lock = threading.Lock()
+_write_index = None
+
+
+def get_tracker_state(scope):
+    """The process-wide TrackerState for scope, hydrated on first use."""
+    with _states_lock:
+        state = _states.get(scope)
+        if state is None:
+            start = time.perf_counter()
+            state = _states[scope] = TrackerState(scope)
+            print(f"Loaded {scope} tracker state ({len(state.last_marks)} people) in "
+                  f"{(time.perf_counter() - start) * 1000.0:.1f} ms")
+        return state
+
+
+def get_write_index():
+    """The process-wide WriteIndex, loaded on first use."""
+    global _write_index
+    with _states_lock:
+        if _write_index is None:
+            _write_index = WriteIndex()
+        return _write_index
@@ -0,0 +1,67 @@
+import os
+
+import cv2
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class ImageFolderCapture:
+    """cv2.VideoCapture look-alike that yields the images of a folder in name order."""
+
+    def __init__(self, folder, loop=False):
+        self.folder = folder
+        self.loop = loop
+        self.files = sorted(
+            os.path.join(folder, f) for f in os.listdir(folder)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self._index = 0
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+    def read(self):
+        while self._index < len(self.files) or (self.loop and self.files):
+            if self._index >= len(self.files):
+                self._index = 0
+            file_path = self.files[self._index]
+            self._index += 1
+            frame = cv2.imread(file_path)
+            if frame is not None:
+                return True, frame
+            print(f"Warning: Could not read {file_path}, skipping")
+        return False, None
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        return 0.0
+
+    def release(self):
+        self.files = []
+
+
+def open_source(source, loop=False):
+    """
+    Open any frame source headless code can read from.
+
+    args:
+    source: camera index ("0"), video file, image folder, RTSP/HTTP URL or a
+            GStreamer pipeline string (anything containing "!")
+    loop: restart image folders from the beginning when they run out
+    returns: an opened capture object with read()/release()
+    """
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        cap = cv2.VideoCapture(int(source))
+    elif os.path.isdir(source):
+        cap = ImageFolderCapture(source, loop=loop)
+    elif '!' in source:
+        cap = cv2.VideoCapture(source, cv2.CAP_GSTREAMER)
+    else:
+        cap = cv2.VideoCapture(source)
+    if cap is None or not cap.isOpened():
+        raise IOError(f"Could not open video source: {source}")
+    return cap